@@ -7,11 +7,15 @@
     :license: MIT, see LICENSE for details.
 """
 
-from .events import Event
+from .events import Event, LazyEvent
 from .enums import *
 from .errors import *
+from .dispatch import Dispatcher, ConcurrentDispatcher, Supervisor
 from .server import Server, DefaultServer
 from .client import DefaultClient
+from .pool import ConnectionPool
+from .reconnect import Backoff, ReconnectManager
+from .cache import ResponseCache
 from .bot import *
 
 __title__ = "airc"
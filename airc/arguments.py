@@ -0,0 +1,286 @@
+"""
+    Command arguments for the AIRC. Splits a command's text into arguments, and binds them to the
+    parameters of its callback, converted to the types the callback's annotations ask for.
+"""
+
+import re
+import typing
+import inspect
+import logging
+
+from .client import User, Channel
+from .errors import ArgumentError
+
+
+__all__ = ("split_args", "register_converter", "Binder")
+
+
+log = logging.getLogger("airc.arguments")
+
+
+# A run of anything but whitespace, where a backslash escapes whatever follows it
+_word = re.compile(r"(?:[^\s\\]+|\\.?)+", re.S)
+_escape = re.compile(r"\\(.)", re.S)
+_empty = inspect.Parameter.empty
+
+
+def _unescape(text):
+    # Splitting at escapes keeps the escaped characters and drops the backslashes, faster than sub
+    return "".join(_escape.split(text))
+
+
+def _escaped_quote(piece):
+    # Whether the quote after piece is escaped, by an odd number of backslashes before it
+    return (len(piece) - len(piece.rstrip("\\"))) & 1
+
+
+def split_args(content):
+    """
+        Split text into arguments at whitespace. Double quotes group words into one argument, and a
+        backslash escapes the character after it
+    """
+    if "\"" not in content:
+        if "\\" not in content:
+            return content.split()
+        return [_unescape(word) for word in _word.findall(content)]
+
+    pieces = content.split("\"")
+    if "\\" in content:
+        # Put escaped quotes back, so every other piece is still quoted
+        merged = []
+        last = pieces[0]
+        for piece in pieces[1:]:
+            if last[-1:] == "\\" and _escaped_quote(last):
+                last += "\"" + piece
+            else:
+                merged.append(last)
+                last = piece
+        merged.append(last)
+        pieces = merged
+
+    args = []
+    for index, piece in enumerate(pieces):
+        if "\\" in piece:
+            if index & 1:
+                args.append(_unescape(piece))
+            else:
+                # Only the pieces with escapes need the regex, for escaped whitespace
+                args.extend(_unescape(word) for word in _word.findall(piece))
+        elif index & 1:
+            args.append(piece)
+        else:
+            args.extend(piece.split())
+    return args
+
+
+_true = frozenset(("yes", "y", "true", "t", "1", "on", "enable"))
+_false = frozenset(("no", "n", "false", "f", "0", "off", "disable"))
+
+
+def _to_bool(argument):
+    lowered = argument.lower()
+    if lowered in _true:
+        return True
+    if lowered in _false:
+        return False
+    raise ValueError(f"'{argument}' isn't yes or no")
+
+
+def _to_user(ctx, argument):
+    name = argument.lstrip("@")
+    channel = ctx.channel
+    get_user = getattr(channel, "get_user", None)
+    user = get_user(name) if get_user is not None else None
+    if user is None:
+        user = User(getattr(channel, "server", None), name)
+    return user
+
+
+def _to_channel(ctx, argument):
+    get_channel = getattr(ctx.bot, "get_channel", None)
+    channel = get_channel(argument) if get_channel is not None else None
+    if channel is None:
+        channel = Channel(getattr(ctx.channel, "server", None), argument)
+    return channel
+
+
+# Annotation to (converter, whether it takes the context), str needs no conversion
+_converters = {
+    str: (None, False),
+    int: (int, False),
+    float: (float, False),
+    bool: (_to_bool, False),
+    User: (_to_user, True),
+    Channel: (_to_channel, True)
+}
+
+
+def register_converter(annotation, converter, *, context=False):
+    """
+        Convert arguments of parameters annotated with annotation using converter. It's called with the
+        argument, or with the Context and the argument if context is True, and may be a coroutine
+        function. It should raise ValueError or ArgumentError for arguments it can't convert
+    """
+    _converters[annotation] = (converter, context)
+
+
+def _converter_for(annotation):
+    if annotation is _empty:
+        return None, False
+    try:
+        return _converters[annotation]
+    except (KeyError, TypeError):
+        pass
+
+    # Optional[X] converts to X, a missing argument already falls back to the default
+    args = getattr(annotation, "__args__", ())
+    if getattr(annotation, "__origin__", None) is typing.Union and len(args) == 2 and type(None) in args:
+        return _converter_for(args[0] if args[1] is type(None) else args[1])
+
+    # Classes can convert for themselves, with a convert(ctx, argument) method
+    convert = getattr(annotation, "convert", None)
+    if callable(convert):
+        return convert, True
+    if callable(annotation):
+        return annotation, False
+    raise TypeError(f"Can't convert arguments to {annotation!r}")
+
+
+class _Param:
+
+    __slots__ = ("name", "type_name", "converter", "context", "is_async", "direct", "default")
+
+    def __init__(self, param, annotation):
+        self.name = param.name
+        self.type_name = getattr(annotation, "__name__", None) or repr(annotation)
+        self.converter, self.context = _converter_for(annotation)
+        self.is_async = inspect.iscoroutinefunction(self.converter)
+        # Converters that can be called with just the argument, inline in Binder.bind
+        self.direct = self.converter is not None and not self.context and not self.is_async
+        self.default = param.default
+
+    def _failed(self, argument):
+        return ArgumentError(f"Couldn't convert '{argument}' to {self.type_name} for {self.name}")
+
+    def convert(self, ctx, argument):
+        converter = self.converter
+        if converter is None:
+            return argument
+        if self.is_async:
+            return self._convert_async(ctx, argument)
+        try:
+            if self.context:
+                return converter(ctx, argument)
+            return converter(argument)
+        except (ValueError, TypeError) as e:
+            raise self._failed(argument) from e
+
+    async def _convert_async(self, ctx, argument):
+        try:
+            if self.context:
+                return await self.converter(ctx, argument)
+            return await self.converter(argument)
+        except (ValueError, TypeError) as e:
+            raise self._failed(argument) from e
+
+
+class Binder:
+    """
+        The argument layout of a command callback, worked out once when the command is made. The first
+        parameter gets the context. Positional parameters get one argument each, or their default if
+        there are too few, and extra arguments are ignored unless there's a *args parameter to take
+        them. The first keyword only parameter gets every remaining argument joined by spaces.
+        Arguments are converted by the annotation of their parameter.
+    """
+
+    __slots__ = ("positional", "varargs", "rest", "is_async", "plain")
+
+    def __init__(self, callback):
+        try:
+            hints = typing.get_type_hints(callback)
+        except Exception:
+            hints = {}
+        params = list(inspect.signature(callback).parameters.values())[1:]
+
+        positional = []
+        self.varargs = None
+        self.rest = None
+        for param in params:
+            compiled = _Param(param, hints.get(param.name, param.annotation))
+            if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+                positional.append(compiled)
+            elif param.kind is param.VAR_POSITIONAL:
+                self.varargs = compiled
+            elif param.kind is param.KEYWORD_ONLY:
+                if self.rest is None:
+                    self.rest = compiled
+                elif param.default is _empty:
+                    raise TypeError(f"Only the first keyword only parameter of a command can be filled, "
+                                    f"{param.name} needs a default")
+        self.positional = tuple(positional)
+
+        steps = self.positional + tuple(param for param in (self.varargs, self.rest) if param is not None)
+        self.is_async = any(param.is_async for param in steps)
+        # Nothing to convert, arguments can be passed as they are
+        self.plain = all(param.converter is None for param in steps)
+
+    def bind(self, ctx, tokens):
+        """
+            Get the args and kwargs to call the callback with, after the context. If any converter is a
+            coroutine function, the converted values are coroutines, use bind_async instead
+        """
+        count = len(tokens)
+        positional = self.positional
+        if self.plain and count >= len(positional):
+            args = tokens[:len(positional)] if self.varargs is None else list(tokens)
+            used = count if self.varargs is not None else len(positional)
+        else:
+            args = []
+            param = arg = None
+            try:
+                for param, arg in zip(positional, tokens):
+                    if param.direct:
+                        args.append(param.converter(arg))
+                    else:
+                        args.append(param.convert(ctx, arg))
+                used = len(args)
+                for param in positional[used:]:
+                    if param.default is _empty:
+                        raise ArgumentError(f"Missing argument {param.name}")
+                    args.append(param.default)
+                param = self.varargs
+                if param is not None:
+                    if param.direct:
+                        converter = param.converter
+                        for arg in tokens[used:]:
+                            args.append(converter(arg))
+                    else:
+                        for arg in tokens[used:]:
+                            args.append(param.convert(ctx, arg))
+                    used = count
+            except (ValueError, TypeError) as e:
+                raise param._failed(arg) from e
+
+        kwargs = {}
+        rest = self.rest
+        if rest is not None:
+            if used < count:
+                kwargs[rest.name] = rest.convert(ctx, " ".join(tokens[used:]))
+            elif rest.default is not _empty:
+                kwargs[rest.name] = rest.default
+            else:
+                kwargs[rest.name] = rest.convert(ctx, "")
+        return args, kwargs
+
+    async def bind_async(self, ctx, tokens):
+        """
+            Like bind, but waits for coroutine converters
+        """
+        args, kwargs = self.bind(ctx, tokens)
+        for index, value in enumerate(args):
+            if inspect.isawaitable(value):
+                args[index] = await value
+        for name, value in kwargs.items():
+            if inspect.isawaitable(value):
+                kwargs[name] = await value
+        return args, kwargs
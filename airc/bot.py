@@ -2,20 +2,29 @@
     Basic bot implementation for AIRC. Uses a command handler, only override handlers if necessary.
 """
 
+import time
 import asyncio
 import inspect
 import logging
+import functools
+import importlib
 
 from .abstracts import Messageable
+from .arguments import Binder, split_args
+from .cache import ResponseCache
 from .client import DefaultClient
-from .errors import HandlerError, CheckFailure
+from .errors import CheckFailure, MaxConcurrencyReached
 from .events import Event
-from .utils import Cooldown
-from .enums import EventType
+from .executors import ExecutorPool
+from .utils import Cooldown, CooldownMapping, ConcurrencyLimit, LatencyHistogram, PrefixMatcher, SortedHandler, is_async
+from .enums import EventType, BucketType
 
 
 _log = logging.getLogger("airc.bot")
 
+# Python 3.11 can time out a command in its own task, rather than wrapping it in a new one
+_timeout = getattr(asyncio, "timeout", None)
+
 
 async def empty_handler(*args): pass
 
@@ -23,42 +32,39 @@ async def empty_handler(*args): pass
 def empty_handler_sync(*args): pass
 
 
-def _split_args(content):
-    quotes = False
-    escape = False
-    args = []
-    cur = ""
-    for char in content:
-        if escape:
-            cur += char
-            escape = False
-        elif char == "\\":
-            escape = True
-        elif char == "\"":
-            quotes = not quotes
-            args.append(cur)
-            cur = ""
-        elif not quotes and char == " ":
-            args.append(cur)
-            cur = ""
-        else:
-            cur += char
-    if cur is not "":
-        args.append(cur)
-    return args
+def _spread_handler(handler):
+    # Command events pass their target and arguments to handlers, rather than the event
+    if isinstance(handler, SortedHandler):
+        inline, handler = handler.inline, handler.handler
+    else:
+        inline = None
+    if is_async(handler):
+        @functools.wraps(handler)
+        async def spread(event):
+            await handler(event.target, *event.arguments)
+        return spread
+
+    @functools.wraps(handler)
+    def spread(event):
+        handler(event.target, *event.arguments)
+    return SortedHandler(spread, inline=inline)
 
 
 class DefaultBot(DefaultClient):
 
-    def __init__(self, prefix, uris=None, *, loop=None):
-        super().__init__(uris, loop=loop)
+    def __init__(self, prefix, uris=None, *, loop=None, command_timeout=None, **kwargs):
+        self._channel_prefixes = {}
+        super().__init__(uris, loop=loop, **kwargs)
 
         self.prefix = prefix
+        # Seconds a command may run for, unless it sets its own timeout
+        self.command_timeout = command_timeout
         self.all_commands = {}
         self.cogs = {}
         self.events = {}
         self._checks = []
         self.extensions = []
+        self.executors = {}
 
     def add_check(self, predicate):
         if not (asyncio.iscoroutine(predicate) or callable(predicate)):
@@ -126,6 +132,8 @@ class DefaultBot(DefaultClient):
                     self.events[event_name] = []
                 self.events[event_name].append(member)
 
+        self.invalidate_handlers()
+
     def remove_cog(self, name):
         cog = self.cogs.pop(name, None)
         if cog is None:
@@ -141,6 +149,8 @@ class DefaultBot(DefaultClient):
                 event_name = name[3:]
                 self.events[event_name].remove(member)
 
+        self.invalidate_handlers()
+
         try:
             check = getattr(cog, f"_{cog.__class__.__name__}__global_check")
         except AttributeError:
@@ -158,6 +168,43 @@ class DefaultBot(DefaultClient):
 
         del cog
 
+    def add_executor(self, name, pool):
+        """
+            Register an ExecutorPool for commands to run in, by name. The 'thread' and 'process' pools
+            exist by default, registering those names replaces them
+        """
+        if not isinstance(pool, ExecutorPool):
+            raise TypeError("Executor must be an ExecutorPool")
+        old = self.executors.get(name)
+        self.executors[name] = pool
+        if old is not None and old is not pool:
+            old.shutdown(wait=False)
+
+    def get_executor(self, name):
+        pool = self.executors.get(name)
+        if pool is None:
+            if name not in ("thread", "process"):
+                raise ValueError(f"No executor named '{name}'")
+            pool = self.executors[name] = ExecutorPool(name)
+        return pool
+
+    def executor_stats(self):
+        """
+            Get the counters of every executor pool, by name
+        """
+        return {name: pool.stats.as_dict() for name, pool in self.executors.items()}
+
+    def command_stats(self):
+        """
+            Get the counters and latencies of every command, by name
+        """
+        commands = {id(command): command for command in self.all_commands.values()}
+        return {command.name: command.stats.as_dict() for command in commands.values()}
+
+    def shutdown_executors(self, wait=True):
+        for pool in self.executors.values():
+            pool.shutdown(wait)
+
     def load_extension(self, name):
         import importlib
         try:
@@ -174,6 +221,22 @@ class DefaultBot(DefaultClient):
         except Exception as e:
             print(e)
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "prefix":
+            self._prefixes = None if callable(value) else PrefixMatcher(value)
+            self.invalidate_prefix()
+
+    def invalidate_prefix(self, channel=None):
+        """
+            Forget the prefixes found by a callable prefix for one channel, or for every channel, so
+            they're looked up again on the next message
+        """
+        if channel is None:
+            self._channel_prefixes.clear()
+        else:
+            self._channel_prefixes.pop(channel, None)
+
     async def get_prefix(self, message):
         prefix = ret = self.prefix
         if callable(prefix):
@@ -188,45 +251,47 @@ class DefaultBot(DefaultClient):
 
         return ret
 
-    async def _dispatch(self, event):
-        if event.type.startswith("command"):
-            handler = getattr(self, "handle_" + event.type, empty_handler_sync)
-            try:
-                handler(event.target, *event.arguments)
-            except Exception as e:
-                raise HandlerError(e)
-            handler = getattr(self, "on_" + event.type, empty_handler)
-            try:
-                await handler(event.target, *event.arguments)
-                for event in self.events[event.type]:
-                    await event(event.target, *event.arguments)
-            except Exception as e:
-                raise HandlerError(e)
-        else:
-            await super()._dispatch(event)
+    def _handlers_for(self, name):
+        handlers = super()._handlers_for(name)
+        handlers.extend(self.events.get(name, ()))
+        if name.startswith("command"):
+            handlers = [_spread_handler(handler) for handler in handlers]
+        return handlers
 
     async def _handle_command(self, event):
+        # Most messages aren't commands, reject those before looking anything up. A callable prefix
+        # isn't known for a channel until its first message has been through build_context
+        matcher = self._prefixes or self._channel_prefixes.get(event.target)
+        if matcher is not None and matcher.match(event.arguments[0]) is None:
+            return
         ctx = await self.build_context(event)
         if ctx.command is not None:
             await self.invoke_command(ctx)
 
+    async def prefix_matcher(self, message):
+        """
+            Get the PrefixMatcher for a message. A callable prefix is called once per channel, and its
+            result kept until invalidate_prefix is called for the channel
+        """
+        if self._prefixes is not None:
+            return self._prefixes
+        channel = getattr(message.channel, "name", None)
+        matcher = self._channel_prefixes.get(channel)
+        if matcher is None:
+            matcher = self._channel_prefixes[channel] = PrefixMatcher(await self.get_prefix(message))
+        return matcher
+
     async def build_context(self, event):
         channel = self.get_channel(event.target)
         user = channel.get_user(event.prefix.nick)
         message = Message(event, channel, user)
         ctx = Context(self, message)
 
-        prefix = await self.get_prefix(message)
-        if isinstance(prefix, (list, tuple)):
-            for pref in prefix:
-                if message.content.startswith(pref):
-                    ctx.invoked_prefix = pref
-                    break
-        elif message.content.startswith(prefix):
-                ctx.invoked_prefix = prefix
+        matcher = await self.prefix_matcher(message)
+        ctx.invoked_prefix = matcher.match(message.content)
 
         if ctx.invoked_prefix:
-            raw_list = _split_args(message.content)
+            raw_list = split_args(message.content)
             ctx.invoker = raw_list[0][len(ctx.invoked_prefix):]
             ctx.args = raw_list[1:]
 
@@ -269,7 +334,7 @@ class Message:
 
 class Context(Messageable):
 
-    __slots__ = ("bot", "message", "invoked_prefix", "args", "invoker", "command")
+    __slots__ = ("bot", "message", "invoked_prefix", "args", "invoker", "command", "replies")
 
     def __init__(self, bot, message):
         self.bot = bot
@@ -280,6 +345,8 @@ class Context(Messageable):
         self.invoker = None
 
         self.command = None
+        # Set to a list by a ResponseCache while it records what the command sends
+        self.replies = None
 
     @property
     def channel(self):
@@ -298,12 +365,96 @@ class Context(Messageable):
         return self.bot.server
 
     async def send(self, message):
+        if self.replies is not None:
+            self.replies.append(message)
         await self.channel.send(message)
 
 
+class ContextData:
+    """
+        The plain data of a Context, which can be sent to another thread or process. Commands run in an
+        executor get this instead of the Context
+    """
+
+    __slots__ = ("command", "invoker", "prefix", "args", "content", "channel", "author")
+
+    def __init__(self, ctx):
+        self.command = ctx.command.name if ctx.command is not None else None
+        self.invoker = ctx.invoker
+        self.prefix = ctx.invoked_prefix
+        self.args = list(ctx.args)
+        self.content = ctx.message.content
+        self.channel = getattr(ctx.channel, "name", None)
+        self.author = getattr(ctx.author, "name", None)
+
+    def __repr__(self):
+        return f"ContextData(command: '{self.command}', channel: '{self.channel}', author: '{self.author}')"
+
+
+class _CallbackRef:
+    # Process pools pickle functions by name, but the name of a command's function is taken by the
+    # Command made from it. This finds the function through the Command in the other process instead
+
+    __slots__ = ("module", "qualname")
+
+    def __init__(self, func):
+        self.module = func.__module__
+        self.qualname = func.__qualname__
+
+    def __call__(self, *args, **kwargs):
+        obj = getattr(importlib.import_module(self.module), self.qualname)
+        if isinstance(obj, Command):
+            obj = obj.callback
+        return obj(*args, **kwargs)
+
+
+class CommandStats:
+    """
+        Outcome counters and a latency histogram for one command. Latency is from the callback starting
+        to it finishing, wait is how long invocations queued for a concurrency slot
+    """
+
+    __slots__ = ("name", "succeeded", "failed", "timed_out", "rejected", "running", "peak_running", "queued",
+                 "total_wait", "max_wait", "latency", "last_error")
+
+    def __init__(self, name):
+        self.name = name
+        self.succeeded = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.running = 0
+        self.peak_running = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.latency = LatencyHistogram()
+        self.last_error = None
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.queued if self.queued else 0.0
+
+    def as_dict(self):
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "running": self.running,
+            "peak_running": self.peak_running,
+            "queued": self.queued,
+            "mean_wait": self.mean_wait,
+            "max_wait": self.max_wait,
+            "latency": self.latency.as_dict(),
+            "last_error": self.last_error
+        }
+
+
 class Command:  # TODO: add command groups
 
-    __slots__ = ("name", "callback", "active", "hidden", "aliases", "help", "params", "checks", "cooldowns")
+    __slots__ = ("name", "callback", "active", "hidden", "aliases", "help", "params", "binder", "checks",
+                 "cooldowns", "executor", "timeout", "cache", "concurrency", "stats")
 
     def __init__(self, name, callback, **options):
         if not isinstance(name, str):
@@ -311,50 +462,123 @@ class Command:  # TODO: add command groups
         self.name = name
         self.callback = callback
 
+        self.executor = options.get("executor")
+        self.timeout = options.get("timeout")
+        if self.executor is not None:
+            if asyncio.iscoroutinefunction(callback):
+                raise TypeError("Commands run in an executor must be synchronous functions")
+            # The other process finds the function by name and calls it with a ContextData, a method of a
+            # cog would get that in place of self
+            if self.executor == "process" and (inspect.ismethod(callback) or "<" in callback.__qualname__
+                                               or "." in callback.__qualname__):
+                raise TypeError("Commands run in a process must be functions defined at the top level of a "
+                                "module, not methods")
+
         self.checks = options.get("checks", [])
         self.cooldowns = options.get("cooldowns", [])
+        self.cache = options.get("cache")
+        self.concurrency = options.get("concurrency")
+        self.stats = CommandStats(name)
         self.active = options.get("active", True)
         self.hidden = options.get("hidden", False)
         self.aliases = options.get("aliases", [])
         self.help = options.get("help")
         signature = inspect.signature(callback)
         self.params = signature.parameters.copy()
+        self.binder = Binder(callback)
 
     def _parse_arguments(self, ctx):
-        # Quick notes: one arg per variable, except for positional only or keyword only.
-        # Error if missing when required, keyword only it will fill with empty string.
-        args = []
-        kwargs = {}
-        i = 0
-        for param in self.params:
-            if param == "ctx":
-                continue
-            fparam = self.params[param]
-            if fparam.kind is inspect.Parameter.POSITIONAL_OR_KEYWORD:
-                try:
-                    args.append(ctx.args[i])  # TODO: annotation cast
-                    i += 1
-                except IndexError:
-                    if fparam.default == fparam.empty:
-                        raise  # TODO: module errors
-                    args.append(fparam.default)
-            if fparam.kind is inspect.Parameter.VAR_POSITIONAL:
-                for arg in ctx.args[i:]:
-                    args.append(arg)
-                break
-            if fparam.kind is inspect.Parameter.KEYWORD_ONLY:
-                kwargs[param] = ' '.join(ctx.args[i:])
-                break
-        return args, kwargs
+        return self.binder.bind(ctx, ctx.args)
 
     async def invoke(self, ctx):
         if not await self.can_run(ctx):
             raise CheckFailure("Command check failed")
+        # Bad arguments are the invoker's mistake, so they're raised to be dispatched as a command_error
+        if self.binder.is_async:
+            args, kwargs = await self.binder.bind_async(ctx, ctx.args)
+        else:
+            args, kwargs = self.binder.bind(ctx, ctx.args)
+
+        stats = self.stats
+        limit = self.concurrency
+        if limit is not None:
+            key = await self._acquire(ctx, limit)
+        stats.running += 1
+        if stats.running > stats.peak_running:
+            stats.peak_running = stats.running
+        start = time.perf_counter()
         try:
-            args, kwargs = self._parse_arguments(ctx)
-            await self.callback(ctx, *args, **kwargs)
+            if self.cache is None:
+                await self._invoke_callback(ctx, args, kwargs)
+            else:
+                await self.cache.invoke(ctx, lambda ctx: self._invoke_callback(ctx, args, kwargs))
+        except asyncio.TimeoutError as e:
+            stats.timed_out += 1
+            stats.last_error = repr(e)
+            raise
         except Exception as e:
-            _log.warning(e)
+            stats.failed += 1
+            stats.last_error = repr(e)
+            raise
+        else:
+            stats.succeeded += 1
+        finally:
+            stats.latency.record(time.perf_counter() - start)
+            stats.running -= 1
+            if limit is not None:
+                limit.release(key)
+
+    async def _acquire(self, ctx, limit):
+        # Being turned away is raised to be dispatched as a command_error, like a failed check
+        stats = self.stats
+        try:
+            if not limit.wait:
+                return await limit.acquire(ctx)
+            start = time.perf_counter()
+            key = await limit.acquire(ctx)
+        except MaxConcurrencyReached as e:
+            stats.rejected += 1
+            raise MaxConcurrencyReached(f"Command {self.name} is busy. {e}") from None
+        waited = time.perf_counter() - start
+        stats.queued += 1
+        stats.total_wait += waited
+        if waited > stats.max_wait:
+            stats.max_wait = waited
+        return key
+
+    def get_timeout(self, ctx):
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(ctx.bot, "command_timeout", None)
+
+    async def _invoke_callback(self, ctx, args, kwargs):
+        if self.executor is not None:
+            await self._invoke_in_executor(ctx, args, kwargs)
+            return
+        timeout = self.get_timeout(ctx)
+        if timeout is None:
+            await self.callback(ctx, *args, **kwargs)
+            return
+        try:
+            if _timeout is not None:
+                async with _timeout(timeout):
+                    await self.callback(ctx, *args, **kwargs)
+            else:
+                await asyncio.wait_for(self.callback(ctx, *args, **kwargs), timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"Command {self.name} took longer than {timeout} seconds")
+
+    async def _invoke_in_executor(self, ctx, args, kwargs):
+        pool = ctx.bot.get_executor(self.executor)
+        callback = _CallbackRef(self.callback) if pool.kind == "process" else self.callback
+        timeout = self.get_timeout(ctx)
+        try:
+            reply = await pool.run(callback, (ContextData(ctx), *args), kwargs, timeout=timeout)
+        except asyncio.TimeoutError:
+            timeout = timeout if timeout is not None else pool.timeout
+            raise asyncio.TimeoutError(f"Command {self.name} took longer than {timeout} seconds")
+        if reply is not None:
+            await ctx.send(str(reply))
 
     async def can_run(self, ctx):
 
@@ -370,6 +594,10 @@ class Command:  # TODO: add command groups
 
         mark = True
         for cooldown in self.cooldowns:
+            if isinstance(cooldown, CooldownMapping):
+                if cooldown.can_run(ctx):
+                    mark = False
+                continue
             name = cooldown.name
             result = 0
             if name == "":
@@ -403,6 +631,18 @@ def command(name=None, cls=Command, **attrs):
         except AttributeError:
             cooldowns = []
 
+        try:
+            attrs.setdefault("cache", func.__command_cache__)
+            del func.__command_cache__
+        except AttributeError:
+            pass
+
+        try:
+            attrs.setdefault("concurrency", func.__command_concurrency__)
+            del func.__command_concurrency__
+        except AttributeError:
+            pass
+
         help_doc = attrs.get('help')
         if help_doc is not None:
             help_doc = inspect.cleandoc(help_doc)
@@ -445,15 +685,57 @@ def subscriber_only():
     return check(lambda x: x.author.subscriber)
 
 
-def cooldown(per, time, target=""):
-
+def cooldown(per, time, target="", *, max_buckets=None):
+    """
+        Let a command be used per times every time seconds. target is the name of a channel or user
+        the cooldown applies to, or empty for everyone. It may also be a BucketType or a function
+        taking a Context, for a separate cooldown per user, channel, or other key
+    """
     def decorator(func):
+        if isinstance(target, str):
+            cooldown = Cooldown(per, time, target)
+        else:
+            cooldown = CooldownMapping(per, time, target, max_buckets=max_buckets)
+
         if isinstance(func, Command):
-            func.cooldowns.append(Cooldown(per, time, target))
+            func.cooldowns.append(cooldown)
         else:
             if not hasattr(func, "__cooldowns__"):
                 func.__cooldowns__ = []
-            func.__cooldowns__.append(Cooldown(per, time, target))
+            func.__cooldowns__.append(cooldown)
+
+        return func
+    return decorator
+
+
+def cached(ttl, key=None, *, maxsize=256, collapse=False):
+    """
+        Keep the replies of a command for ttl seconds per channel, and share one run of it between
+        invocations with the same key that arrive while it's running. key is a function taking a
+        Context, by default the command's arguments. Only replies sent through ctx.send are kept. With
+        collapse, invocations answered from the cache send nothing
+    """
+    def decorator(func):
+        cache = ResponseCache(ttl, key, maxsize=maxsize, collapse=collapse)
+        if isinstance(func, Command):
+            func.cache = cache
+        else:
+            func.__command_cache__ = cache
+        return func
+    return decorator
 
+
+def max_concurrency(number, per=BucketType.GLOBAL, *, wait=False):
+    """
+        Let at most number copies of a command run at once, for everyone or per user, channel, or
+        other key. per is a BucketType or a function taking a Context. Invocations over the limit wait
+        their turn if wait is set, otherwise they fail with MaxConcurrencyReached
+    """
+    def decorator(func):
+        limit = ConcurrencyLimit(number, per, wait=wait)
+        if isinstance(func, Command):
+            func.concurrency = limit
+        else:
+            func.__command_concurrency__ = limit
         return func
     return decorator
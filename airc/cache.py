@@ -0,0 +1,177 @@
+"""
+    Response caching for the AIRC. Lets identical command invocations share one run of the callback,
+    and replays the replies it sent to everyone who asked.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+
+__all__ = ("CacheStats", "ResponseCache")
+
+
+log = logging.getLogger("airc.cache")
+
+
+def _args_key(ctx):
+    return tuple(ctx.args)
+
+
+class CacheStats:
+    """
+        Counters for one response cache. Joined invocations arrived while the callback was already
+        running for the same key, collapsed ones were answered without sending anything
+    """
+
+    __slots__ = ("hits", "misses", "joined", "collapsed", "failed", "evicted")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.joined = 0
+        self.collapsed = 0
+        self.failed = 0
+        self.evicted = 0
+
+    def as_dict(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "joined": self.joined,
+            "collapsed": self.collapsed,
+            "failed": self.failed,
+            "evicted": self.evicted
+        }
+
+
+class ResponseCache:
+    """
+        The replies of a command, kept for ttl seconds per channel and key. key is a function taking a
+        Context, by default the command's arguments. Invocations with the same channel and key while
+        the callback is running wait for it instead of running it again. At most maxsize replies are
+        kept, the oldest are dropped first. With collapse, an invocation answered from the cache sends
+        nothing, the channel already saw the reply
+    """
+
+    __slots__ = ("ttl", "maxsize", "collapse", "stats", "_key", "_entries", "_inflight")
+
+    def __init__(self, ttl, key=None, *, maxsize=256, collapse=False):
+        if ttl <= 0:
+            raise ValueError("Cache ttl must be positive")
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("Cache maxsize must be at least 1")
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.collapse = collapse
+        self.stats = CacheStats()
+        self._key = key or _args_key
+        # Key to (expires, replies). Every entry lives for ttl, so insertion order is expiry order
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_key(self, ctx):
+        return getattr(ctx.channel, "name", None), self._key(ctx)
+
+    def get(self, key, now=None):
+        """
+            Get the replies cached for a key, or None if there are none or they've expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        if entry[0] <= now:
+            self.expire(now)
+            return None
+        return entry[1]
+
+    def put(self, key, replies, now=None):
+        if now is None:
+            now = time.monotonic()
+        entries = self._entries
+        entries.pop(key, None)
+        entries[key] = (now + self.ttl, tuple(replies))
+        if self.maxsize is not None:
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.stats.evicted += 1
+
+    def expire(self, now=None):
+        """
+            Drop every entry whose time has passed
+        """
+        if now is None:
+            now = time.monotonic()
+        entries = self._entries
+        while entries:
+            key = next(iter(entries))
+            if entries[key][0] > now:
+                break
+            del entries[key]
+
+    def invalidate(self, channel=None):
+        """
+            Forget the replies cached for one channel, or for every channel
+        """
+        if channel is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == channel]:
+            del self._entries[key]
+
+    async def invoke(self, ctx, run):
+        """
+            Answer ctx from the cache, from a run already in flight for the same key, or by awaiting
+            run(ctx) and keeping what it sent with ctx.send. If the run fails, everyone waiting on it
+            gets the error and nothing is cached
+        """
+        key = self.get_key(ctx)
+        stats = self.stats
+        replies = self.get(key)
+        if replies is not None:
+            stats.hits += 1
+            await self._replay(ctx, replies)
+            return
+
+        future = self._inflight.get(key)
+        if future is not None:
+            stats.joined += 1
+            # Shielded so one waiter being cancelled doesn't cancel the run for the others
+            replies = await asyncio.shield(future)
+            await self._replay(ctx, replies)
+            return
+
+        stats.misses += 1
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        ctx.replies = []
+        try:
+            await run(ctx)
+        except BaseException as e:
+            stats.failed += 1
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Nobody may have joined, don't warn about the exception never being retrieved
+                future.exception()
+            raise
+        else:
+            replies = tuple(ctx.replies)
+            self.put(key, replies)
+            future.set_result(replies)
+        finally:
+            ctx.replies = None
+            del self._inflight[key]
+
+    async def _replay(self, ctx, replies):
+        if self.collapse:
+            self.stats.collapsed += 1
+            return
+        for reply in replies:
+            await ctx.send(reply)
@@ -7,6 +7,12 @@ import logging
 
 from . import server
 from .abstracts import Messageable
+from .enums import EventType
+from .dispatch import Supervisor
+from .events import Event
+from .pool import ConnectionPool
+from .reconnect import ReconnectManager
+from .utils import SortedHandler, insort, is_async
 
 
 __all__ = ("User", "Channel", "DefaultClient")
@@ -21,6 +27,13 @@ async def empty_handler(event): pass
 def empty_handler_sync(event): pass
 
 
+def _as_handler(handler):
+    # Plain functions are wrapped so the supervisor knows to run them in a thread
+    if isinstance(handler, SortedHandler) or is_async(handler):
+        return handler
+    return SortedHandler(handler)
+
+
 class User(Messageable):
 
     def __init__(self, server, name):
@@ -43,59 +56,176 @@ class Channel(Messageable):
 
 class DefaultClient:
 
-    __slots__ = ("loop", "server_type", "connections", "handlers")
+    __slots__ = ("loop", "server_type", "connections", "handlers", "connect_timeout", "max_connecting", "supervisor",
+                 "reconnector", "_readers", "_dispatch_table")
 
-    def __init__(self, uris=None, *, server_type=server.DefaultServer, loop=None):
+    def __init__(self, uris=None, *, server_type=server.DefaultServer, loop=None, connect_timeout=30,
+                 max_connecting=10, supervisor=None, reconnect=None):
 
+        self._dispatch_table = {}
+        self.supervisor = supervisor if supervisor is not None else Supervisor()
         self.loop = loop or asyncio.get_event_loop()
         self.server_type = server_type
+        self.connect_timeout = connect_timeout
+        self.max_connecting = max_connecting
 
         self.connections = []
         self.handlers = {}
+        self._readers = {}
+
+        # reconnect may be True for a ReconnectManager with the default settings
+        if reconnect is True:
+            reconnect = ReconnectManager()
+        self.reconnector = reconnect or None
+        if self.reconnector is not None:
+            self.reconnector.attach(self)
 
         # self.add_handler("ping", _ponger)
 
-        if not isinstance(uris, (list, tuple)):
+        if uris is None:
+            uris = ()
+        elif not isinstance(uris, (list, tuple)):
             uris = (uris,)
         for uri in uris:
             self.server(uri)
 
-    def server(self, uri):
-        server = self.server_type(uri, self, loop=self.loop)
+    def server(self, uri, **kwargs):
+        server = self.server_type(uri, self, loop=self.loop, **kwargs)
         self.connections.append(server)
         return server
 
+    def pool(self, uri, username, password="", *, max_channels=100, **kwargs):
+        """
+            Create a ConnectionPool to uri, which opens connections of this client as its channels need
+        """
+        return ConnectionPool(self, uri, username, password, max_channels=max_channels, **kwargs)
+
     def run(self, *args, **kwargs):
         task = self.loop.create_task(self.start(*args, **kwargs))
         if not self.loop.is_running():
             self.loop.run_until_complete(task)
 
     async def start(self, *args, **kwargs):
-        tasks = []
-        names = kwargs.get("names", [])
-        passwds = kwargs.get("passwds", [])
+        await self.connect_all(kwargs.get("names", []), kwargs.get("passwds", []))
+        while True:
+            tasks = tuple(self._readers.values())
+            if self.reconnector is not None:
+                # A server that's reconnecting has no read loop for a while
+                tasks += self.reconnector.running()
+            if not tasks:
+                break
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+    async def connect_all(self, names, passwds):
+        """
+            Connect every server that isn't connected yet, concurrently. At most max_connecting
+            connections are opened at once, and each one has connect_timeout seconds to finish. Connected
+            servers start reading right away, failures are dispatched as connect_failed events.
+        """
+        limit = asyncio.Semaphore(self.max_connecting)
+        pending = []
         for server in self.connections:
             if not server.connected:
-                # TODO: handle failed connection?
-                await server.connect(names.pop(0), password=passwds.pop(0))
-            tasks.append(self.loop.create_task(server.process_data()))
-        while len(tasks) > 0:
-            for task in tasks:
-                if task.done():
-                    tasks.remove(task)
-                    server = await task
-                    tasks.append(self.loop.create_task(server.process_data()))
-                elif task.cancelled():
-                    tasks.remove(task)
-            await asyncio.sleep(1)
-
-    async def _dispatch(self, event):
-        all_handler = getattr(self, "on_all_events", None)
-        if all_handler is not None:
-            await all_handler(event)
-        event_handler = getattr(self, "on_" + event.command, None)
-        if event_handler is not None:
-            await event_handler(event)
+                pending.append(self._connect(server, names.pop(0), passwds.pop(0), limit))
+            else:
+                self.supervise(server)
+        results = await asyncio.gather(*pending)
+        return results.count(True)
+
+    async def _connect(self, server, name, password, limit):
+        async with limit:
+            try:
+                await asyncio.wait_for(server.connect(name, password=password), self.connect_timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    e = asyncio.TimeoutError(f"Connecting took longer than {self.connect_timeout} seconds")
+                log.error(f"Failed to connect to {server._uri}: {e!r}")
+                if server.connected:
+                    await server.disconnect()
+                await self._dispatch(Event(server, EventType.CLIENT, "connect_failed", [None, e]))
+                return False
+        self.supervise(server)
+        return True
+
+    def supervise(self, server):
+        """
+            Start the read loop of a connected server, if it isn't already running. Lines are processed
+            as soon as they arrive, until the server disconnects.
+        """
+        task = self._readers.get(server)
+        if task is None or task.done():
+            task = self.loop.create_task(self._read_loop(server))
+            self._readers[server] = task
+        return task
+
+    async def _read_loop(self, server):
+        try:
+            while server.connected:
+                await server.process_data()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"Connection to {server._uri} failed: {e!r}")
+            await self._dispatch(Event(server, EventType.CLIENT, "connection_lost", [None, e]))
+            if self.reconnector is not None:
+                self.reconnector.dropped(server, e)
+        finally:
+            if self._readers.get(server) is asyncio.current_task():
+                del self._readers[server]
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name.startswith(("on_", "handle_")) or name == "supervisor":
+            self.invalidate_handlers()
+
+    def add_global_handler(self, event, handler, priority=0):
+        handler = SortedHandler(handler, priority)
+        li = self.handlers.setdefault(event, [])
+        insort(li, handler)
+        self.invalidate_handlers()
+
+    def remove_global_handler(self, event, handler):
+        handlers = self.handlers.get(event, [])
+        for h in handlers:
+            if h.handler == handler:
+                handlers.remove(h)
+                break
+        self.invalidate_handlers()
+
+    def invalidate_handlers(self):
+        """
+            Forget the resolved handlers for every event. Called whenever handlers are added or removed
+        """
+        self._dispatch_table.clear()
+
+    def _handlers_for(self, name):
+        """
+            Find the handlers for one event name, in the order they should run. handle_ methods are
+            synchronous, and run inline before the on_ method for the same event
+        """
+        handlers = []
+        handler = getattr(self, "handle_" + name, None)
+        if handler is not None:
+            handlers.append(SortedHandler(handler, inline=True))
+        handler = getattr(self, "on_" + name, None)
+        if handler is not None:
+            handlers.append(handler)
+        handlers.extend(self.handlers.get(name, ()))
+        return handlers
+
+    def _resolve_handlers(self, command):
+        # Each handler is kept with its counters, so dispatching doesn't look them up again
+        resolve = self.supervisor.resolve
+        return tuple(resolve(_as_handler(handler))
+                     for handler in self._handlers_for("all_events") + self._handlers_for(command))
+
+    def _dispatch(self, event):
+        # Not a coroutine itself, the supervisor's is returned to be awaited, saving a frame per event
+        try:
+            handlers = self._dispatch_table[event.command]
+        except KeyError:
+            handlers = self._dispatch_table[event.command] = self._resolve_handlers(event.command)
+        return self.supervisor.run_all(handlers, event)
 
     async def on_ping(self, event):
         await event.server.pong(event.target)
@@ -0,0 +1,346 @@
+"""
+    Event dispatchers for the AIRC. A dispatcher decides where and when a server runs the handlers
+    for each event it receives.
+"""
+
+import time
+import asyncio
+import logging
+import collections
+
+from .enums import Backpressure
+from .executors import ExecutorPool
+from .utils import SortedHandler
+
+
+__all__ = ("Dispatcher", "ConcurrentDispatcher", "Supervisor", "HandlerStats")
+
+
+log = logging.getLogger("airc.dispatch")
+
+
+def _target_key(event):
+    return event.target
+
+
+class Dispatcher:
+    """
+        Runs the handlers for each event inline, before the server reads its next line
+    """
+
+    __slots__ = ()
+
+    inline = True
+
+    async def submit(self, event, callback):
+        await callback(event)
+
+    async def join(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class _Lane:
+
+    __slots__ = ("queue", "spill", "task")
+
+    def __init__(self, maxsize):
+        self.queue = asyncio.Queue(maxsize)
+        self.spill = collections.deque()
+        self.task = None
+
+
+class ConcurrentDispatcher(Dispatcher):
+    """
+        Runs handlers on a bounded pool of worker tasks, so the server can keep reading while they run.
+        Events are assigned to a worker by key, by default the event target, so events with the same key
+        are always handled in the order they arrived while different keys are handled in parallel.
+        Each worker queues up to maxsize events, and policy decides what happens when a queue is full.
+    """
+
+    __slots__ = ("workers", "key", "maxsize", "policy", "dropped", "spilled", "_lanes")
+
+    inline = False
+
+    def __init__(self, workers=8, *, key=_target_key, maxsize=256, policy=Backpressure.BLOCK):
+        if workers < 1:
+            raise ValueError("ConcurrentDispatcher needs at least one worker")
+        self.workers = workers
+        self.key = key
+        self.maxsize = maxsize
+        self.policy = Backpressure(policy)
+        self.dropped = 0
+        self.spilled = 0
+        self._lanes = None
+
+    def _start(self):
+        self._lanes = [_Lane(self.maxsize) for _ in range(self.workers)]
+        for lane in self._lanes:
+            lane.task = asyncio.ensure_future(self._work(lane))
+
+    async def _work(self, lane):
+        queue = lane.queue
+        while True:
+            event, callback = await queue.get()
+            try:
+                await callback(event)
+            except Exception:
+                log.exception(f"Unhandled error while handling {event.command}")
+            finally:
+                while lane.spill and queue.qsize() < self.maxsize:
+                    queue.put_nowait(lane.spill.popleft())
+                queue.task_done()
+
+    async def submit(self, event, callback):
+        if self._lanes is None:
+            self._start()
+        lane = self._lanes[hash(self.key(event)) % self.workers]
+        queue = lane.queue
+        item = (event, callback)
+
+        if self.policy is Backpressure.BLOCK:
+            await queue.put(item)
+        elif self.policy is Backpressure.DROP_OLDEST:
+            if queue.full():
+                queue.get_nowait()
+                queue.task_done()
+                self.dropped += 1
+            queue.put_nowait(item)
+        elif lane.spill or queue.full():
+            lane.spill.append(item)
+            self.spilled += 1
+        else:
+            queue.put_nowait(item)
+
+    def pending(self):
+        """
+            Number of events waiting to be handled, across all workers
+        """
+        if self._lanes is None:
+            return 0
+        return sum(lane.queue.qsize() + len(lane.spill) for lane in self._lanes)
+
+    async def join(self):
+        """
+            Wait until every submitted event has been handled
+        """
+        if self._lanes is None:
+            return
+        for lane in self._lanes:
+            await lane.queue.join()
+
+    async def close(self):
+        """
+            Stop all workers, dropping any events still waiting
+        """
+        if self._lanes is None:
+            return
+        lanes, self._lanes = self._lanes, None
+        for lane in lanes:
+            lane.task.cancel()
+        await asyncio.gather(*(lane.task for lane in lanes), return_exceptions=True)
+
+
+def _handler_key(handler):
+    handler = getattr(handler, "handler", handler)
+    return getattr(handler, "__wrapped__", handler)
+
+
+def _handler_name(handler):
+    return getattr(handler, "__qualname__", None) or repr(handler)
+
+
+class HandlerStats:
+    """
+        Call, error and timing counters for a single handler. Only timed calls count towards the times
+    """
+
+    __slots__ = ("name", "calls", "errors", "timed", "total_time", "max_time", "threaded", "total_wait", "max_wait",
+                 "last_error", "disabled", "suppressed", "_streak", "_streak_call", "_window_start",
+                 "_window_reports")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.timed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.threaded = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_error = None
+        self.disabled = False
+        self.suppressed = 0
+        self._streak = 0
+        self._streak_call = 0
+        self._window_start = 0.0
+        self._window_reports = 0
+
+    @property
+    def consecutive_errors(self):
+        # Successes don't reset the streak, which saves a write on every call. It only counts while the
+        # latest call is the one that failed
+        return self._streak if self._streak_call == self.calls else 0
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.timed if self.timed else 0.0
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.threaded if self.threaded else 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "timed": self.timed,
+            "mean_time": self.mean_time,
+            "max_time": self.max_time,
+            "threaded": self.threaded,
+            "mean_wait": self.mean_wait,
+            "max_wait": self.max_wait,
+            "last_error": self.last_error,
+            "disabled": self.disabled
+        }
+
+
+class Supervisor:
+    """
+        Runs handlers so that one failing can't stop the others, or the connection it's handling events
+        for. Errors are counted per handler and reported to the log at most report_limit times every
+        report_interval seconds. A handler that fails max_failures times in a row is disabled until it's
+        enabled again, a max_failures of 0 never disables handlers.
+
+        Synchronous handlers not marked inline run in executor, a thread pool of max_threads threads by
+        default, and the time each waited for a thread is counted. They run one at a time like any
+        other handler, but shouldn't touch the event loop except through its thread safe methods.
+
+        Threaded handlers are always timed. Timing the others costs more than running most of them, so
+        it's only done with timing set.
+    """
+
+    __slots__ = ("max_failures", "report_limit", "report_interval", "executor", "timing", "stats")
+
+    def __init__(self, *, max_failures=10, report_limit=5, report_interval=60, executor=None, max_threads=8,
+                 timing=False):
+        self.max_failures = max_failures
+        self.report_limit = report_limit
+        self.report_interval = report_interval
+        self.executor = executor if executor is not None else ExecutorPool("thread", max_workers=max_threads)
+        self.timing = timing
+        self.stats = {}
+
+    def _get_stats(self, handler):
+        key = _handler_key(handler)
+        try:
+            return self.stats[key]
+        except KeyError:
+            stats = self.stats[key] = HandlerStats(_handler_name(key))
+            return stats
+
+    def resolve(self, handler):
+        """
+            Look up the counters for a handler, and whether it runs in a thread, so callers that look
+            handlers up once can pass the result to run_all
+        """
+        threaded = handler.__class__ is SortedHandler and handler.sync and not handler.inline
+        return handler, self._get_stats(handler), threaded
+
+    async def run(self, handler, event):
+        await self.run_all((self.resolve(handler),), event)
+
+    async def run_all(self, handlers, event):
+        """
+            Run resolved handlers one after another on an event
+        """
+        for handler, stats, threaded in handlers:
+            if stats.disabled:
+                continue
+            stats.calls += 1
+            if threaded:
+                await self._run_threaded(handler, event, stats)
+                continue
+            if self.timing:
+                await self._run_timed(handler, event, stats)
+                continue
+            try:
+                await handler(event)
+            except Exception as e:
+                self._failed(stats, event, e)
+
+    async def _run_timed(self, handler, event, stats):
+        start = time.perf_counter()
+        try:
+            await handler(event)
+        except Exception as e:
+            self._failed(stats, event, e)
+        finally:
+            self._timed(stats, time.perf_counter() - start)
+
+    async def _run_threaded(self, handler, event, stats):
+        # The executor times the call in its thread, so threaded handlers are always timed
+        try:
+            wait, elapsed, _ = await self.executor.run_timed(handler.handler, (event,))
+        except Exception as e:
+            self._failed(stats, event, e)
+            return
+        stats.threaded += 1
+        stats.total_wait += wait
+        if wait > stats.max_wait:
+            stats.max_wait = wait
+        self._timed(stats, elapsed)
+
+    @staticmethod
+    def _timed(stats, elapsed):
+        stats.total_time += elapsed
+        stats.timed += 1
+        if elapsed > stats.max_time:
+            stats.max_time = elapsed
+
+    def _failed(self, stats, event, error):
+        stats.errors += 1
+        # Calls are counted when they start, so the previous call failed too if it ended the streak
+        stats._streak = stats._streak + 1 if stats._streak_call == stats.calls - 1 else 1
+        stats._streak_call = stats.calls
+        stats.last_error = error
+
+        now = time.monotonic()
+        if now - stats._window_start >= self.report_interval:
+            stats._window_start = now
+            stats._window_reports = 0
+        if stats._window_reports < self.report_limit:
+            stats._window_reports += 1
+            suppressed = f" ({stats.suppressed} similar errors suppressed)" if stats.suppressed else ""
+            stats.suppressed = 0
+            log.error(f"Handler {stats.name} failed on {event.command}{suppressed}", exc_info=error)
+        else:
+            stats.suppressed += 1
+
+        if self.max_failures and stats._streak >= self.max_failures:
+            stats.disabled = True
+            log.error(f"Handler {stats.name} disabled after {stats._streak} failures in a row")
+
+    def enable(self, handler):
+        """
+            Re-enable a handler that was disabled for failing too often
+        """
+        stats = self._get_stats(handler)
+        stats.disabled = False
+        stats._streak = 0
+
+    def handler_stats(self):
+        """
+            Get the counters of every handler that has run, by handler name
+        """
+        return {stats.name: stats.as_dict() for stats in self.stats.values()}
+
+    def shutdown(self, wait=True):
+        """
+            Stop the threads of synchronous handlers. They start again if another one runs
+        """
+        self.executor.shutdown(wait)
@@ -5,7 +5,7 @@
 import enum
 
 
-__all__ = ("ReplyCode", "EventType")
+__all__ = ("ReplyCode", "EventType", "Backpressure", "Priority", "BucketType")
 
 
 class ReplyCode(enum.IntEnum):
@@ -203,3 +203,25 @@ class EventType(enum.Enum):
     PROTOCOL = "PROT"  # Non-numeric code
     UNKNOWN = "UNK"  # Unrecognized numeric code
     CLIENT = "CLNT"  # Client-side event
+
+
+class Backpressure(enum.Enum):
+
+    BLOCK = "block"  # Wait for room in the queue
+    DROP_OLDEST = "drop_oldest"  # Drop the oldest queued event to make room
+    SPILL = "spill"  # Keep overflowing events in an unbounded spill queue
+
+
+class Priority(enum.IntEnum):
+
+    HIGH = 0  # Keepalives, quits and moderation, sent ahead of everything else
+    NORMAL = 1
+    LOW = 2
+
+
+class BucketType(enum.Enum):
+
+    GLOBAL = "global"  # One cooldown shared by everyone
+    USER = "user"  # One per user, across channels
+    CHANNEL = "channel"  # One per channel, shared by its users
+    MEMBER = "member"  # One per user in each channel
@@ -19,3 +19,39 @@ class CheckFailure(AIRCError):
     """
         Raised when a command can't run due to checks failing
     """
+
+
+class LineTooLong(AIRCError):
+    """
+        Raised when a received line is longer than the line buffer allows
+    """
+
+
+class ConnectionLost(AIRCError):
+    """
+        Raised when the connection to a server is closed while reading from it
+    """
+
+
+class InvalidLine(AIRCError):
+    """
+        Raised when an outgoing line can't be sent, because it contains a line break or is too long
+    """
+
+
+class ExecutorBusy(AIRCError):
+    """
+        Raised when a call is submitted to an executor pool that already has as many pending as it allows
+    """
+
+
+class ArgumentError(AIRCError):
+    """
+        Raised when a command's arguments are missing, or can't be converted to the types it asks for
+    """
+
+
+class MaxConcurrencyReached(AIRCError):
+    """
+        Raised when a command is invoked while as many copies of it are running as it allows
+    """
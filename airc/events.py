@@ -2,6 +2,11 @@
     Event data object, used for events within the module
 """
 
+from .parser import parse_tags, parse_params, first_param
+
+
+__all__ = ("Event", "LazyEvent")
+
 
 class Event:
 
@@ -21,3 +26,73 @@ class Event:
     def __str__(self):
         result = f"Event(server: {self.server}, type: {self.type}, command: '{self.command}', target: '{self.target}', arguments: {self.arguments}, prefix: '{self.prefix}', tags: {self.tags})"
         return result
+
+
+_unset = object()
+
+
+class LazyEvent(Event):
+    """
+        Event built straight from a raw line. Only the type and command are decoded up front, the
+        tags, prefix, target and arguments are decoded from the line the first time they're accessed
+    """
+
+    __slots__ = ("line", "spans", "_target", "_arguments", "_prefix", "_tags")
+
+    def __init__(self, server, type, command, line, spans):
+        self.server = server
+        self.type = type
+        self.command = command
+        self.line = line
+        self.spans = spans
+        self._target = _unset
+        self._arguments = _unset
+        self._prefix = _unset
+        self._tags = _unset
+
+    def _params(self):
+        params = parse_params(self.line[self.spans[5]:])
+        if self._target is _unset:
+            self._target = params[0] if params else None
+        self._arguments = params[1:]
+
+    @property
+    def target(self):
+        if self._target is _unset:
+            self._target = first_param(self.line[self.spans[5]:])
+        return self._target
+
+    @target.setter
+    def target(self, value):
+        self._target = value
+
+    @property
+    def arguments(self):
+        if self._arguments is _unset:
+            self._params()
+        return self._arguments
+
+    @arguments.setter
+    def arguments(self, value):
+        self._arguments = value
+
+    @property
+    def prefix(self):
+        if self._prefix is _unset:
+            start = self.spans[1]
+            self._prefix = self.server.prefix_cache(self.line[start:self.spans[2]]) if start else None
+        return self._prefix
+
+    @prefix.setter
+    def prefix(self, value):
+        self._prefix = value
+
+    @property
+    def tags(self):
+        if self._tags is _unset:
+            self._tags = parse_tags(self.line[1:self.spans[0]])
+        return self._tags
+
+    @tags.setter
+    def tags(self, value):
+        self._tags = value
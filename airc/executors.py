@@ -0,0 +1,178 @@
+"""
+    Executor pools for the AIRC. Runs blocking or CPU heavy callbacks in threads or processes, so they
+    don't hold up the event loop, and counts how long calls wait and run.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import time
+
+from .errors import ExecutorBusy
+
+
+__all__ = ("ExecutorStats", "ExecutorPool")
+
+
+log = logging.getLogger("airc.executors")
+
+
+_kinds = ("thread", "process")
+
+
+def _timed(func, args, kwargs):
+    # Runs in the executor. time.monotonic is system wide, so the start can be compared with the
+    # time the call was submitted even from another process
+    start = time.monotonic()
+    result = func(*args, **kwargs)
+    return start, time.monotonic() - start, result
+
+
+class ExecutorStats:
+    """
+        Queue and timing counters for one executor pool. Wait time is from submitting a call to it
+        starting to run
+    """
+
+    __slots__ = ("submitted", "completed", "failed", "timed_out", "rejected", "pending", "peak_pending",
+                 "total_wait", "max_wait", "total_run", "max_run")
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.pending = 0
+        self.peak_pending = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    @property
+    def mean_wait(self):
+        return self.total_wait / self.completed if self.completed else 0.0
+
+    @property
+    def mean_run(self):
+        return self.total_run / self.completed if self.completed else 0.0
+
+    def as_dict(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "mean_wait": self.mean_wait,
+            "max_wait": self.max_wait,
+            "mean_run": self.mean_run,
+            "max_run": self.max_run
+        }
+
+
+class ExecutorPool:
+    """
+        A thread or process pool of max_workers workers, started on first use. Calls taking longer
+        than timeout seconds raise asyncio.TimeoutError, though a call already running in a process
+        carries on until it's done. At most max_pending calls are queued or running at once, more
+        raise ExecutorBusy. A call that timed out counts as pending until it really finishes.
+        Functions and arguments sent to a process pool have to be picklable.
+    """
+
+    __slots__ = ("kind", "max_workers", "timeout", "max_pending", "stats", "_executor")
+
+    def __init__(self, kind="thread", *, max_workers=None, timeout=None, max_pending=None):
+        if kind not in _kinds:
+            raise ValueError(f"Executor kind must be one of {', '.join(_kinds)}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.stats = ExecutorStats()
+        self._executor = None
+
+    def __repr__(self):
+        return f"ExecutorPool({self.kind!r}, max_workers={self.max_workers}, pending={self.stats.pending})"
+
+    def _start(self):
+        if self.kind == "process":
+            self._executor = concurrent.futures.ProcessPoolExecutor(self.max_workers)
+        else:
+            self._executor = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix="airc")
+        return self._executor
+
+    async def run(self, func, args=(), kwargs=None, *, timeout=None):
+        """
+            Run func with args and kwargs in the pool, and return its result. timeout overrides the
+            pool's timeout for this call
+        """
+        wait, elapsed, result = await self.run_timed(func, args, kwargs, timeout=timeout)
+        return result
+
+    async def run_timed(self, func, args=(), kwargs=None, *, timeout=None):
+        """
+            Like run, but return how long the call waited to start and how long it ran along with its
+            result
+        """
+        stats = self.stats
+        if self.max_pending is not None and stats.pending >= self.max_pending:
+            stats.rejected += 1
+            raise ExecutorBusy(f"{self.kind.capitalize()} pool already has {stats.pending} calls pending")
+
+        executor = self._executor or self._start()
+        timeout = timeout if timeout is not None else self.timeout
+        call = functools.partial(_timed, func, args, kwargs or {})
+
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        try:
+            call_future = executor.submit(call)
+        except Exception:
+            stats.failed += 1
+            raise
+        stats.submitted += 1
+        stats.pending += 1
+        stats.peak_pending = max(stats.peak_pending, stats.pending)
+        # Timing out only stops waiting, the call keeps its place until it's done. Added before wrapping,
+        # so the count has dropped by the time the result is awaited
+        call_future.add_done_callback(functools.partial(self._call_done, loop))
+        try:
+            started, elapsed, result = await asyncio.wait_for(asyncio.wrap_future(call_future, loop=loop), timeout)
+        except asyncio.TimeoutError:
+            stats.timed_out += 1
+            raise
+        except Exception:
+            stats.failed += 1
+            raise
+
+        wait = max(started - submitted, 0.0)
+        stats.completed += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        stats.total_run += elapsed
+        stats.max_run = max(stats.max_run, elapsed)
+        return wait, elapsed, result
+
+    def _call_done(self, loop, future):
+        # Runs in whichever thread finished the call
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The loop is closed, nothing is left to read the count
+            pass
+
+    def _release(self):
+        self.stats.pending -= 1
+
+    def shutdown(self, wait=True):
+        """
+            Stop the pool's workers, dropping calls that haven't started. It starts again if used
+        """
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
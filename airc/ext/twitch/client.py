@@ -9,19 +9,12 @@ import logging
 import asyncio
 import abc
 
-from airc.errors import HandlerError
 from airc.enums import UserType
 from airc.client import DefaultClient
 
 log = logging.getLogger("airc.twitch_client")
 
 
-async def empty_handler(event): pass
-
-
-def empty_handler_sync(event): pass
-
-
 class TwitchClient(DefaultClient):
     # This thing needs to have event handlers for users joining, leaving, channel joins, etc.
     # Keep track of what caps we have, and more.
@@ -55,18 +48,6 @@ class TwitchClient(DefaultClient):
         self.channels.append(channel)
         return channel
 
-    async def _dispatch(self, event):
-        handler = getattr(self, "handle_" + event.type, empty_handler_sync)
-        try:
-            handler(event)
-        except Exception as e:
-            raise HandlerError(e)
-        handler = getattr(self, "on_" + event.type, empty_handler)
-        try:
-            await handler(event)
-        except Exception as e:
-            raise HandlerError(e)
-
     def handle_cap(self, event):
         if event.arguments[0] == "ACK":
             if event.arguments[1].endswith("commands"):
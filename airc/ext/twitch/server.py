@@ -1,10 +1,14 @@
 
-import asyncio
-import websockets
-
 from airc.server import DefaultServer
-from airc.enums import UserType
-from airc.utils import LineBuffer, Cooldown
+from airc.enums import UserType, Priority
+from airc.utils import LineBuffer, RateLimiter
+
+
+_moderation_commands = (b"/timeout ", b"/untimeout ", b"/ban ", b"/unban ", b"/delete ", b"/clear")
+
+
+def _is_moderation(data):
+    return data.startswith(b"PRIVMSG ") and data.partition(b" :")[2].startswith(_moderation_commands)
 
 
 class TwitchServer(DefaultServer):
@@ -13,22 +17,22 @@ class TwitchServer(DefaultServer):
         any possible message that Twitch understands.
     """
 
-    __slots__ = ("user_type", "cooldown", "buffer", "uri", "username", "password")
+    __slots__ = ("user_type", "join_limiter", "buffer", "uri", "username", "password")
 
-    mod_cooldown = Cooldown(100, 30)
-    join_cooldown = Cooldown(50, 15)
+    mod_limiter = RateLimiter(100, 30)
 
     def __init__(self, master=None, user_type=UserType.normal_user, loop=None):
         super().__init__(master, loop=loop)
         self.user_type = user_type
         if user_type == UserType.normal_user:
-            self.cooldown = Cooldown(20, 30)
+            self.limiter = RateLimiter(20, 30)
         elif user_type == UserType.known_bot:
-            self.cooldown = Cooldown(50, 30)
+            self.limiter = RateLimiter(50, 30)
         elif user_type == UserType.verified_bot:
-            self.cooldown = Cooldown(7500, 30)
+            self.limiter = RateLimiter(7500, 30)
         else:
-            self.cooldown = Cooldown(20, 30)
+            self.limiter = RateLimiter(20, 30)
+        self.join_limiter = RateLimiter(50, 15)
 
         self.buffer = LineBuffer()
         self.uri = None
@@ -40,12 +44,17 @@ class TwitchServer(DefaultServer):
                f": '{self.uri}', name: '{self.username}')"
 
     async def reconnect(self):
-        self.socket = await websockets.connect(self.uri, ssl=None)
-        self.connected = True
-
-        await self.pass_(self.password)
-        await self.nick(self.username)
-        await self.user(self.username, self.username)
+        """
+            Reconnect with the same login, through the client's reconnect manager if it has one, so
+            capabilities are requested and channels joined again. Twitch sends RECONNECT before it
+            restarts a server, which the manager handles by itself
+        """
+        reconnector = getattr(self.master, "reconnector", None)
+        if reconnector is not None:
+            await reconnector.reconnect(self)
+            return
+        await self.disconnect()
+        await self.connect(self.username, self.password)
 
     async def req_commands(self):
         await self.cap("REQ", "twitch.tv/commands")
@@ -56,15 +65,15 @@ class TwitchServer(DefaultServer):
     async def req_tags(self):
         await self.cap("REQ", "twitch.tv/tags")
 
-    async def send_raw(self, data):
-        if data.startswith("JOIN "):
-            wait = self.join_cooldown.can_run()
-            while wait:
-                await asyncio.sleep(wait)
-                wait = self.join_cooldown.can_run()
-        else:
-            wait = self.cooldown.can_run()
-            while wait:
-                await asyncio.sleep(wait)
-                wait = self.cooldown.can_run()
-        await self.socket.send(data)
\ No newline at end of file
+    def _priority(self, data):
+        if _is_moderation(data):
+            return Priority.HIGH
+        return super()._priority(data)
+
+    def _limiter_for(self, data):
+        if data.startswith(b"JOIN "):
+            return self.join_limiter
+        # Moderators get a bigger budget, so moderation doesn't wait behind the chat limit
+        if _is_moderation(data):
+            return self.mod_limiter
+        return super()._limiter_for(data)
@@ -0,0 +1,84 @@
+"""
+    Server feature tracking for the AIRC. Holds the tokens a server advertises in its RPL_ISUPPORT
+    replies, and answers how many targets a command may address at once.
+"""
+
+from .parser import parse_isupport
+
+
+__all__ = ("ISupport",)
+
+
+# Targets per command when the server doesn't advertise TARGMAX. JOIN and PART have taken comma
+# lists since RFC 1459, and are limited only by the line length
+_default_targmax = {
+    "JOIN": None,
+    "PART": None,
+}
+
+
+class ISupport:
+    """
+        The ISUPPORT tokens of one server. Tokens without a value map to an empty string. Replies are
+        added with update as they arrive, and tokens the server negates are removed
+    """
+
+    __slots__ = ("tokens", "_targmax")
+
+    def __init__(self):
+        self.tokens = {}
+        self._targmax = None
+
+    def __repr__(self):
+        return f"ISupport({self.tokens!r})"
+
+    def __contains__(self, name):
+        return name in self.tokens
+
+    def __getitem__(self, name):
+        return self.tokens[name]
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def get(self, name, default=None):
+        return self.tokens.get(name, default)
+
+    def update(self, tokens):
+        """
+            Add the tokens of one RPL_ISUPPORT reply, without its target or trailing text
+        """
+        for name, value in parse_isupport(tokens):
+            if value is None:
+                self.tokens.pop(name, None)
+            else:
+                self.tokens[name] = value
+        self._targmax = None
+
+    def clear(self):
+        self.tokens.clear()
+        self._targmax = None
+
+    def _parse_targmax(self):
+        targmax = {}
+        for item in self.tokens.get("TARGMAX", "").split(","):
+            command, _, limit = item.partition(":")
+            if command:
+                targmax[command.upper()] = int(limit) if limit.isdigit() else None
+        return targmax
+
+    def targmax(self, command):
+        """
+            How many targets one command line may have, or None if there's no limit beyond the length
+            of the line. Uses TARGMAX if it lists the command, otherwise MAXTARGETS for PRIVMSG and
+            NOTICE. Commands the server says nothing about take a single target, except JOIN and PART
+        """
+        if self._targmax is None:
+            self._targmax = self._parse_targmax()
+        command = command.upper()
+        if command in self._targmax:
+            return self._targmax[command]
+        if command in ("PRIVMSG", "NOTICE") and "TARGMAX" not in self.tokens:
+            limit = self.tokens.get("MAXTARGETS", "")
+            return int(limit) if limit.isdigit() else 1
+        return _default_targmax.get(command, 1)
@@ -0,0 +1,136 @@
+"""
+    Line parser for the AIRC. Splits a raw IRC line into its tags, prefix, command and parameters
+    in a single pass, using only string searching and slicing.
+"""
+
+import re
+
+
+__all__ = ("scan_line", "parse_line", "parse_tags", "parse_params", "first_param", "parse_isupport")
+
+
+def parse_tags(tags):
+    """
+        Convert the raw tag section of a line, without the leading '@', into a dict. Tags without a
+        value, or with an empty value, map to None
+    """
+    out = {}
+    if not tags:
+        return out
+    for raw_tag in tags.split(";"):
+        name, _, val = raw_tag.partition("=")
+        out[name] = val or None
+    return out
+
+
+def first_param(params):
+    """
+        Get only the first parameter out of the raw parameter section of a line, or None if there
+        are no parameters
+    """
+    params = params.lstrip(" ")
+    if not params:
+        return None
+    if params[0] == ":":
+        return params[1:]
+    end = params.find(" ")
+    return params if end == -1 else params[:end]
+
+
+def parse_params(params):
+    """
+        Convert the raw parameter section of a line into a list of parameters. The trailing
+        parameter, if any, is the last item of the list
+    """
+    params = params.lstrip(" ")
+    if not params:
+        return []
+    if params[0] == ":":
+        return [params[1:]]
+    index = params.find(" :")
+    if index == -1:
+        return params.split()
+    out = params[:index].split()
+    out.append(params[index + 2:])
+    return out
+
+
+def scan_line(line):
+    """
+        Find the sections of a single IRC line, without its line ending, without copying any of them.
+        Returns a tuple of offsets (tags_end, prefix_start, prefix_end, command_start, command_end,
+        params_start). tags_end and prefix_start are 0 if the line has no tags or prefix, and
+        params_start is the length of the line if it has no parameters.
+    """
+    start = 0
+    tags_end = 0
+    prefix_start = prefix_end = 0
+
+    if line[:1] == "@":
+        tags_end = line.find(" ")
+        if tags_end == -1:
+            raise ValueError(f"Line has no command: {line!r}")
+        start = tags_end + 1
+        while line[start:start + 1] == " ":
+            start += 1
+
+    if line[start:start + 1] == ":":
+        prefix_start = start + 1
+        prefix_end = line.find(" ", start)
+        if prefix_end == -1:
+            raise ValueError(f"Line has no command: {line!r}")
+        start = prefix_end + 1
+        while line[start:start + 1] == " ":
+            start += 1
+
+    end = line.find(" ", start)
+    if end == -1:
+        end = params_start = len(line)
+    else:
+        params_start = end + 1
+
+    if end == start:
+        raise ValueError(f"Line has no command: {line!r}")
+
+    return tags_end, prefix_start, prefix_end, start, end, params_start
+
+
+def parse_line(line):
+    """
+        Parse a single IRC line, without its line ending, into a tuple of
+        (tags, prefix, command, params). Tags is always a dict, prefix is None if the line
+        had none, and params is a list of strings.
+    """
+    tags_end, prefix_start, prefix_end, command_start, command_end, params_start = scan_line(line)
+    return (
+        parse_tags(line[1:tags_end]),
+        line[prefix_start:prefix_end] if prefix_start else None,
+        line[command_start:command_end],
+        parse_params(line[params_start:])
+    )
+
+
+# Values escape bytes as \xHH, in practice only spaces, backslashes and '='
+_isupport_escape = re.compile(r"\\x([0-9A-Fa-f]{2})")
+
+
+def _unescape(match):
+    return chr(int(match.group(1), 16))
+
+
+def parse_isupport(tokens):
+    """
+        Convert the tokens of an RPL_ISUPPORT reply, without the target or the trailing text, into a
+        list of (name, value) pairs. Tokens without a value have an empty string as their value, and
+        tokens negated with a leading '-' have None
+    """
+    out = []
+    for token in tokens:
+        if token[:1] == "-":
+            out.append((token[1:], None))
+            continue
+        name, _, value = token.partition("=")
+        if "\\x" in value:
+            value = _isupport_escape.sub(_unescape, value)
+        out.append((name, value))
+    return out
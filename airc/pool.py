@@ -0,0 +1,191 @@
+"""
+    Connection pool for the AIRC. Spreads the channels of one network over as many connections as
+    needed, so a client can sit in thousands of channels without any single connection holding more
+    than a set number.
+"""
+
+import asyncio
+import logging
+
+from .errors import AIRCError
+
+
+__all__ = ("ConnectionPool",)
+
+
+log = logging.getLogger("airc.pool")
+
+
+class ConnectionPool:
+    """
+        A set of connections to one network, sharing its channels. Each connection, or shard, holds at
+        most max_channels channels, and new shards are opened when the existing ones are full. Shards
+        are servers of the client's server_type with the client as their master, so events from all
+        of them go through the client's dispatch, and messages to a channel are sent through the shard
+        that joined it. A new shard's channels are joined once it's registered and has sent its ISUPPORT.
+        The network has to allow several connections with the same login, as Twitch does.
+    """
+
+    __slots__ = ("client", "uri", "username", "password", "max_channels", "server_kwargs", "shards", "_owners",
+                 "_ready", "_registered", "_limit")
+
+    def __init__(self, client, uri, username, password="", *, max_channels=100, **server_kwargs):
+        if max_channels < 1:
+            raise ValueError("Shards must be able to hold at least one channel")
+        self.client = client
+        self.uri = uri
+        self.username = username
+        self.password = password
+        self.max_channels = max_channels
+        self.server_kwargs = server_kwargs
+
+        self.shards = {}
+        self._owners = {}
+        self._ready = {}
+        self._registered = {}
+        self._limit = asyncio.Semaphore(client.max_connecting)
+        # The end of the MOTD comes after 001 and every 005, so TARGMAX is known by then
+        client.add_global_handler("endofmotd", self._on_registered)
+        client.add_global_handler("nomotd", self._on_registered)
+
+    def __len__(self):
+        return len(self.shards)
+
+    def __iter__(self):
+        return iter(self.shards)
+
+    def __contains__(self, channel):
+        return channel.lower() in self._owners
+
+    @property
+    def channels(self):
+        return list(self._owners)
+
+    def shard_for(self, target):
+        """
+            Get the shard that joined a channel. Targets that aren't channels of the pool, such as
+            users, go to the shard with the fewest channels
+        """
+        shard = self._owners.get(target.lower())
+        if shard is None:
+            if not self.shards:
+                raise AIRCError("Pool has no connections")
+            shard = min(self.shards, key=lambda s: len(self.shards[s]))
+        return shard
+
+    def _open_shard(self):
+        # Not added to the client's connections, the pool connects its own shards
+        client = self.client
+        shard = client.server_type(self.uri, client, loop=client.loop, **self.server_kwargs)
+        self.shards[shard] = set()
+        self._registered[shard] = client.loop.create_future()
+        connect = client._connect(shard, self.username, self.password, self._limit)
+        self._ready[shard] = client.loop.create_task(connect)
+        log.debug(f"Opening shard {len(self.shards)} to {self.uri}")
+        return shard
+
+    def _assign(self, channels):
+        # Give every new channel a shard, filling the open shards before opening more
+        assigned = {}
+        open_shards = [shard for shard, owned in self.shards.items() if len(owned) < self.max_channels]
+        for channel in channels:
+            name = channel.lower()
+            if name in self._owners:
+                continue
+            while open_shards and len(self.shards[open_shards[0]]) >= self.max_channels:
+                open_shards.pop(0)
+            if not open_shards:
+                open_shards.append(self._open_shard())
+            shard = open_shards[0]
+            self.shards[shard].add(name)
+            self._owners[name] = shard
+            assigned.setdefault(shard, []).append(channel)
+        return assigned
+
+    def _drop_shard(self, shard):
+        for name in self.shards.pop(shard, ()):
+            del self._owners[name]
+        self._ready.pop(shard, None)
+        registered = self._registered.pop(shard, None)
+        if registered is not None and not registered.done():
+            registered.cancel()
+
+    async def _on_registered(self, event):
+        registered = self._registered.get(event.server)
+        if registered is not None and not registered.done():
+            registered.set_result(None)
+
+    async def _join_shard(self, shard, ready, channels):
+        if not await ready:
+            self._drop_shard(shard)
+            raise AIRCError(f"Couldn't open a connection to {self.uri} for {len(channels)} channels")
+        # Joining before registration gets 451 ERR_NOTREGISTERED, and before ISUPPORT can't be packed
+        registered = self._registered.get(shard)
+        if registered is not None and not registered.done():
+            timeout = self.client.connect_timeout
+            try:
+                await asyncio.wait_for(asyncio.shield(registered), timeout)
+            except asyncio.CancelledError:
+                if not registered.cancelled():
+                    raise
+                raise AIRCError(f"Connection to {self.uri} closed before it registered") from None
+            except asyncio.TimeoutError:
+                self._drop_shard(shard)
+                if shard.connected:
+                    await shard.disconnect()
+                raise AIRCError(f"Connection to {self.uri} didn't register within {timeout} seconds") from None
+        await shard.join(channels)
+
+    async def join(self, channels):
+        """
+            Join channels, opening as many new shards as they need. Channels the pool is already in are
+            skipped. Raises AIRCError if a shard can't connect, its channels are given up
+        """
+        if isinstance(channels, str):
+            channels = [channels]
+        assigned = self._assign(channels)
+        joins = (self._join_shard(shard, self._ready[shard], chans) for shard, chans in assigned.items())
+        results = await asyncio.gather(*joins, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    async def part(self, channels, message=None):
+        """
+            Leave channels, freeing their place on their shards
+        """
+        if isinstance(channels, str):
+            channels = [channels]
+        parted = {}
+        for channel in channels:
+            shard = self._owners.pop(channel.lower(), None)
+            if shard is not None:
+                self.shards[shard].discard(channel.lower())
+                parted.setdefault(shard, []).append(channel)
+        await asyncio.gather(*(shard.part(chans, message) for shard, chans in parted.items()))
+
+    async def privmsg(self, target, text):
+        await self.shard_for(target).privmsg(target, text)
+
+    async def notice(self, target, text):
+        await self.shard_for(target).notice(target, text)
+
+    async def broadcast(self, targets, text, *, notice=False):
+        """
+            Send text to every target, with each shard packing the targets it owns into as few lines as
+            it can
+        """
+        routed = {}
+        for target in targets:
+            routed.setdefault(self.shard_for(target), []).append(target)
+        await asyncio.gather(*(shard.broadcast(group, text, notice=notice) for shard, group in routed.items()))
+
+    async def close(self, message=None):
+        """
+            Quit every shard and forget their channels
+        """
+        await asyncio.gather(*self._ready.values(), return_exceptions=True)
+        shards = [shard for shard in self.shards if shard.connected]
+        await asyncio.gather(*(shard.quit(message) for shard in shards), return_exceptions=True)
+        for shard in list(self.shards):
+            self._drop_shard(shard)
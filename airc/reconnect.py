@@ -0,0 +1,207 @@
+"""
+    Automatic reconnects for the AIRC. Watches for dropped connections and servers asking clients to
+    reconnect, then connects again with backoff, and restores the capabilities and channels the
+    connection had.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import collections
+
+from .enums import EventType
+from .events import Event
+
+
+__all__ = ("Backoff", "Incident", "ReconnectManager")
+
+
+log = logging.getLogger("airc.reconnect")
+
+
+class Backoff:
+    """
+        Exponential backoff with full jitter. The delay after failed attempt n is random between 0 and
+        base * factor ** n seconds, capped at cap seconds, so many clients dropped at once don't all
+        come back at the same moment
+    """
+
+    __slots__ = ("base", "factor", "cap")
+
+    def __init__(self, base=1, factor=2, cap=60):
+        self.base = base
+        self.factor = factor
+        self.cap = cap
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * self.factor ** min(attempt, 64)))
+
+
+class Incident:
+    """
+        One time a connection was lost, and what it took to recover. Downtime is from noticing the drop
+        to having requested the capabilities and channels again, or until now if not recovered yet
+    """
+
+    __slots__ = ("server", "reason", "started", "detected", "recovered", "attempts", "caps", "channels")
+
+    def __init__(self, server, reason, caps, channels):
+        self.server = server
+        self.reason = reason
+        self.started = time.time()
+        self.detected = time.monotonic()
+        self.recovered = None
+        self.attempts = 0
+        self.caps = caps
+        self.channels = channels
+
+    def __repr__(self):
+        return f"Incident(server: '{self.server._uri}', reason: '{self.reason}', downtime: {self.downtime:.2f})"
+
+    @property
+    def downtime(self):
+        end = self.recovered if self.recovered is not None else time.monotonic()
+        return end - self.detected
+
+    def as_dict(self):
+        return {
+            "uri": self.server._uri,
+            "reason": str(self.reason),
+            "started": self.started,
+            "downtime": self.downtime,
+            "recovered": self.recovered is not None,
+            "attempts": self.attempts,
+            "channels": len(self.channels)
+        }
+
+
+class ReconnectManager:
+    """
+        Reconnects the servers of a client when their connection drops, or the server sends RECONNECT.
+        Failed attempts are retried after a delay from backoff, up to max_attempts times, or forever if
+        that's None. Each attempt has attempt_timeout seconds to connect and be welcomed. Once
+        connected, the capabilities the server had acknowledged are requested again, and its channels
+        are joined again rejoin_batch at a time, through the server's rate limiter.
+
+        The last history incidents are kept. Recovering dispatches a reconnected event, and giving up a
+        reconnect_failed event, both with the Incident.
+    """
+
+    __slots__ = ("backoff", "max_attempts", "attempt_timeout", "rejoin_batch", "incidents", "client", "_tasks",
+                 "_welcomed")
+
+    def __init__(self, *, backoff=None, max_attempts=None, attempt_timeout=30, rejoin_batch=None, history=100):
+        self.backoff = backoff if backoff is not None else Backoff()
+        self.max_attempts = max_attempts
+        self.attempt_timeout = attempt_timeout
+        self.rejoin_batch = rejoin_batch
+        self.incidents = collections.deque(maxlen=history)
+        self.client = None
+        self._tasks = {}
+        self._welcomed = {}
+
+    def attach(self, client):
+        self.client = client
+        client.add_global_handler("reconnect", self._on_reconnect)
+        client.add_global_handler("welcome", self._on_welcome)
+
+    def running(self):
+        """
+            Get the reconnects in progress, as tasks
+        """
+        return tuple(self._tasks.values())
+
+    def schedule(self, server, reason):
+        """
+            Start reconnecting server, unless it's already reconnecting. Returns the reconnect's task
+        """
+        task = self._tasks.get(server)
+        if task is None or task.done():
+            task = self._tasks[server] = server.loop.create_task(self._recover(server, reason))
+        return task
+
+    async def reconnect(self, server, reason="requested"):
+        """
+            Reconnect server, and wait until it's recovered
+        """
+        await self.schedule(server, reason)
+
+    def dropped(self, server, reason):
+        self.schedule(server, reason)
+
+    async def _on_reconnect(self, event):
+        log.info(f"{event.server._uri} asked to reconnect")
+        self.schedule(event.server, "server requested reconnect")
+
+    async def _on_welcome(self, event):
+        waiter = self._welcomed.get(event.server)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def _recover(self, server, reason):
+        incident = Incident(server, reason, set(server.caps), set(server.channels))
+        self.incidents.append(incident)
+        if server.connected:
+            await server.disconnect()
+
+        try:
+            while True:
+                incident.attempts += 1
+                try:
+                    await asyncio.wait_for(self._connect(server), self.attempt_timeout)
+                    await self._restore(server, incident)
+                    break
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        e = asyncio.TimeoutError(f"Reconnecting took longer than {self.attempt_timeout} seconds")
+                    log.warning(f"Reconnect attempt {incident.attempts} to {server._uri} failed: {e!r}")
+                    if server.connected:
+                        await server.disconnect()
+                    if self.max_attempts is not None and incident.attempts >= self.max_attempts:
+                        log.error(f"Gave up reconnecting to {server._uri} after {incident.attempts} attempts")
+                        self._tasks.pop(server, None)
+                        await self._dispatch(server, "reconnect_failed", incident)
+                        return
+                    await asyncio.sleep(self.backoff.delay(incident.attempts - 1))
+        except asyncio.CancelledError:
+            self._tasks.pop(server, None)
+            raise
+
+        incident.recovered = time.monotonic()
+        # A drop from here on is a new incident
+        self._tasks.pop(server, None)
+        log.info(f"Reconnected to {server._uri} after {incident.downtime:.2f} seconds, {incident.attempts} "
+                 f"attempts, rejoined {len(incident.channels)} channels")
+        await self._dispatch(server, "reconnected", incident)
+
+    async def _connect(self, server):
+        welcomed = self._welcomed[server] = server.loop.create_future()
+        try:
+            await server.connect(server.username, server.password)
+            self.client.supervise(server)
+            await welcomed
+        finally:
+            self._welcomed.pop(server, None)
+
+    async def _restore(self, server, incident):
+        if incident.caps:
+            await server.request_caps(incident.caps)
+        if incident.channels:
+            await server.rejoin(incident.channels, self.rejoin_batch)
+
+    async def _dispatch(self, server, name, incident):
+        await self.client._dispatch(Event(server, EventType.CLIENT, name, [None, incident]))
+
+    def report(self):
+        """
+            Get every kept incident, oldest first
+        """
+        return [incident.as_dict() for incident in self.incidents]
+
+    def cancel(self):
+        """
+            Stop every reconnect in progress
+        """
+        for task in self._tasks.values():
+            task.cancel()
@@ -0,0 +1,243 @@
+"""
+    Outgoing line serializer for the AIRC. Commands are encoded by templates compiled once per verb,
+    which validate and encode a line in one pass, so what reaches the transport is always a single
+    valid IRC line.
+"""
+
+from .errors import InvalidLine
+
+
+__all__ = ("MAX_LINE_LENGTH", "encode_line", "compile_template", "compile_message", "template", "split_utf8",
+           "pack_params", "pack_words", "pack_message")
+
+
+# Longest line a server has to accept, including the trailing CRLF
+MAX_LINE_LENGTH = 512
+
+
+_max_length = MAX_LINE_LENGTH - 2
+
+
+def _invalid_param(verb, param):
+    return InvalidLine(f"Invalid middle parameter for {verb}: {param!r}")
+
+
+def _invalid_line(line):
+    return InvalidLine(f"Line contains a line break or NUL: {line!r}")
+
+
+def _too_long(data):
+    return InvalidLine(f"Line is {len(data) + 2} bytes long, longer than the {MAX_LINE_LENGTH} allowed")
+
+
+def encode_line(line):
+    """
+        Encode a complete IRC line, without its line ending, into bytes. Raises InvalidLine if it
+        contains a line break or is too long to send
+    """
+    if "\r" in line or "\n" in line or "\0" in line:
+        raise _invalid_line(line)
+    data = bytes(line, 'utf-8')
+    if len(data) > _max_length:
+        raise _too_long(data)
+    return data
+
+
+def compile_template(verb):
+    """
+        Build the encoder for one IRC command. It takes any number of middle parameters and an
+        optional trailing parameter, and returns the encoded line. Middle parameters that are None or
+        empty are left out, like optional arguments. The encoder raises InvalidLine if a middle
+        parameter contains a space or starts with ':', if anything contains a line break, or if the
+        line is too long
+    """
+    head = verb + " "
+
+    def encode(*params, trailing=None):
+        if None in params or "" in params:
+            params = tuple(param for param in params if param)
+        for param in params:
+            if " " in param or param[0] == ":":
+                raise _invalid_param(verb, param)
+
+        if trailing is not None:
+            line = f"{head}{' '.join(params)} :{trailing}" if params else f"{head}:{trailing}"
+        elif params:
+            line = head + " ".join(params)
+        else:
+            line = verb
+
+        # Inlined from encode_line, this is on the path of every line sent
+        if "\r" in line or "\n" in line or "\0" in line:
+            raise _invalid_line(line)
+        data = bytes(line, 'utf-8')
+        if len(data) > _max_length:
+            raise _too_long(data)
+        return data
+
+    encode.__qualname__ = encode.__name__ = f"encode_{verb.lower()}"
+    return encode
+
+
+def compile_message(verb):
+    """
+        Build the encoder for a command shaped like PRIVMSG, taking exactly a target and a text. This is
+        the shape of nearly every line a client sends, so it skips the handling of optional parameters
+    """
+    head = verb + " "
+
+    def encode(target, text):
+        if " " in target or target[:1] == ":":
+            raise _invalid_param(verb, target)
+        line = f"{head}{target} :{text}"
+        if "\r" in line or "\n" in line or "\0" in line:
+            raise _invalid_line(line)
+        data = bytes(line, 'utf-8')
+        if len(data) > _max_length:
+            raise _too_long(data)
+        return data
+
+    encode.__qualname__ = encode.__name__ = f"encode_{verb.lower()}"
+    return encode
+
+
+_templates = {}
+
+
+def template(verb):
+    """
+        Get the shared compiled template for a verb, compiling it the first time it's used
+    """
+    try:
+        return _templates[verb]
+    except KeyError:
+        result = _templates[verb] = compile_template(verb)
+        return result
+
+
+def split_utf8(data, size):
+    """
+        Split encoded text into chunks of at most size bytes, never inside a UTF-8 character
+    """
+    if size < 4 and len(data) > size:
+        raise ValueError("Chunks must have room for at least one character")
+    chunks = []
+    start = 0
+    while len(data) - start > size:
+        end = start + size
+        # Back up to the start of the character the chunk would cut through
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        chunks.append(data[start:end])
+        start = end
+    chunks.append(data[start:])
+    return chunks
+
+
+def _pack(sizes, limit, room, sep=1):
+    # Greedily group items of the given sizes, joined by sep bytes, into runs of at most limit items
+    # and room bytes. Returns the (start, end) index of each run
+    runs = []
+    start = 0
+    used = -sep
+    for index, size in enumerate(sizes):
+        if size > room:
+            raise InvalidLine(f"Target is {size} bytes long, but only {room} fit on the line")
+        used += sep + size
+        if used > room or index - start == limit:
+            runs.append((start, index))
+            start = index
+            used = size
+    if start < len(sizes):
+        runs.append((start, len(sizes)))
+    return runs
+
+
+def pack_params(verb, targets, limit, *, keys=None, before=(), after=(), trailing=None):
+    """
+        Encode a command taking a comma separated list, such as JOIN or WHOIS, in as few lines as
+        possible. Each line gets at most limit targets, or as many as fit if limit is None. keys, if
+        given, are matched to the targets and sent in a list after them. before and after are the
+        middle parameters around the list
+    """
+    encode = template(verb)
+    room = _max_length - len(encode(*before, *after, trailing=trailing)) - 1
+    if keys is None:
+        sizes = [len(bytes(target, 'utf-8')) for target in targets]
+        sep = 1
+    else:
+        if len(keys) != len(targets):
+            raise ValueError("Every target must have a key")
+        sizes = [len(bytes(target, 'utf-8')) + len(bytes(key, 'utf-8')) for target, key in zip(targets, keys)]
+        sep = 2
+        room -= 1
+
+    lines = []
+    for start, end in _pack(sizes, limit, room, sep):
+        params = [",".join(targets[start:end])]
+        if keys is not None:
+            params.append(",".join(keys[start:end]))
+        lines.append(encode(*before, *params, *after, trailing=trailing))
+    return lines
+
+
+def pack_words(verb, words, *, before=()):
+    """
+        Encode a command whose trailing parameter is a space separated list, such as CAP REQ, in as few
+        lines as possible. before are the middle parameters
+    """
+    encode = template(verb)
+    # The trailing parameter adds a space and a colon
+    room = _max_length - len(encode(*before)) - 2
+    sizes = [len(bytes(word, 'utf-8')) for word in words]
+    return [encode(*before, trailing=" ".join(words[start:end])) for start, end in _pack(sizes, None, room)]
+
+
+def pack_message(verb, targets, text, limit):
+    """
+        Encode a message to many targets, such as a PRIVMSG, in as few lines as possible. Targets are
+        packed into comma separated lists of at most limit targets, or as many as fit if limit is None,
+        and text too long to fit is split into several lines between UTF-8 characters. Every target
+        gets every chunk of the text, in order
+    """
+    if "\r" in text or "\n" in text or "\0" in text:
+        raise _invalid_line(text)
+    for target in targets:
+        if not target or " " in target or target[0] == ":":
+            raise _invalid_param(verb, target)
+    if not targets:
+        return []
+
+    head = bytes(verb + " ", 'ascii')
+    data = bytes(text, 'utf-8')
+    sizes = [len(bytes(target, 'utf-8')) for target in targets]
+    room = _max_length - len(head) - 2
+    longest = max(sizes)
+    fewest_runs = -(-len(sizes) // limit) if limit else 1
+
+    # More chunks of text leave more room for targets on each line, try chunk counts until adding
+    # chunks can't make up for it anymore
+    best = None
+    count = 1
+    while True:
+        size = len(data) if count == 1 else -(-len(data) // count) + 3
+        if best is not None and count * fewest_runs >= len(best[0]) * len(best[1]):
+            break
+        if room - size >= longest:
+            chunks = split_utf8(data, size) if data else [data]
+            runs = _pack(sizes, limit, room - size)
+            if best is None or len(chunks) * len(runs) < len(best[0]) * len(best[1]):
+                best = chunks, runs
+        if size <= 4 or count >= len(data):
+            break
+        count += 1
+    if best is None:
+        raise InvalidLine(f"Target is {longest} bytes long, leaving no room for the text")
+
+    chunks, runs = best
+    lines = []
+    for start, end in runs:
+        prefix = head + bytes(",".join(targets[start:end]), 'utf-8') + b" :"
+        for chunk in chunks:
+            lines.append(prefix + chunk)
+    return lines
@@ -3,16 +3,21 @@
 """
 
 
-import re
 import abc
 import asyncio
 import logging
-import websockets
 
-from .enums import ReplyCode, EventType
+from .enums import ReplyCode, EventType, Priority
 from .errors import *
-from .events import Event
-from .utils import insort, LineBuffer, SortedHandler, IRCPrefix
+from .events import Event, LazyEvent
+from .dispatch import Dispatcher, Supervisor
+from .parser import scan_line
+from .serializer import encode_line, compile_message, template, pack_params, pack_words, pack_message
+from .isupport import ISupport
+from .transports import open_transport
+from .writer import WriteQueue
+from . import utils
+from .utils import insort, LineBuffer, SortedHandler
 
 
 __all__ = ("Server", "DefaultServer")
@@ -21,70 +26,59 @@ __all__ = ("Server", "DefaultServer")
 log = logging.getLogger("airc.server")
 _cap_subcommands = set('LS LIST REQ ACK NAK CLEAR END'.split())
 _client_subcommands = set(_cap_subcommands) - {'NAK'}
-_rfc_pattern = r"^(@(?P<tags>[^ ]*) )?(:(?P<prefix>[^ ]+) +)?(?P<command>[^ ]+)( *(?P<argument> .+))?"
-_regexp_rfc = re.compile(_rfc_pattern)
-
-
-# TODO: Move some of this to utils
-def _handle_tags(tags):
-    if tags is None:
-        return {}
-    tags = tags.lstrip("@")
-    raw_tags = tags.split(";")
-    tags = {}
-    for raw_tag in raw_tags:
-        name, val = raw_tag.split("=")
-        if val == "":
-            val = None
-        tags[name] = val
-    return tags
-
-
-def _handle_args(args):
-    args = args.lstrip()
-    out_args = []
-    rest = False
-    tmp = ""
-    for char in args:
-        if rest:
-            tmp += char
-        elif char == " ":
-            out_args.append(tmp)
-            tmp = ""
-        elif char == ":" and tmp == "":
-            rest = True
-        else:
-            tmp += char
-    if tmp:
-        out_args.append(tmp)
-    return out_args
+_priority_commands = (b"PONG", b"QUIT")
+# Events that change what a reconnect has to restore
+_session_commands = frozenset(("isupport", "cap", "join", "part", "kick"))
 
 
-def _handle_command(command):
-    if not command.isnumeric():
-        return EventType.PROTOCOL, command
+_protocol_commands = (
+    "PASS NICK USER OPER MODE SERVICE QUIT SQUIT JOIN PART TOPIC NAMES LIST INVITE KICK PRIVMSG NOTICE MOTD "
+    "LUSERS VERSION STATS LINKS TIME CONNECT TRACE ADMIN INFO SERVLIST SQUERY WHO WHOIS WHOWAS KILL PING PONG "
+    "ERROR AWAY REHASH DIE RESTART SUMMON USERS WALLOPS USERHOST ISON CAP WHISPER CLEARCHAT CLEARMSG "
+    "GLOBALUSERSTATE ROOMSTATE USERNOTICE USERSTATE HOSTTARGET RECONNECT"
+).split()
 
-    try:
-        com = int(command)
-        code = ReplyCode(com)
 
-        if 0 <= com <= 399:
+def _build_command_table():
+    table = {}
+    for com in range(1000):
+        command = f"{com:03}"
+        try:
+            code = ReplyCode(com)
+        except ValueError:
+            table[command] = (EventType.UNKNOWN, command)
+            continue
+
+        if com <= 399:
             type = EventType.REPLY
-        elif 400 <= com <= 599:
+        elif com <= 599:
             type = EventType.ERROR
         else:
             type = EventType.UNKNOWN
+        table[command] = (type, code.name.lower())
 
-    except ValueError:
-        return EventType.UNKNOWN, command
+    for command in _protocol_commands:
+        table[command] = (EventType.PROTOCOL, command.lower())
+    return table
 
-    return type, code.name
 
+# Raw command to (EventType, event name), so classifying a known command is one lookup
+_command_table = _build_command_table()
 
-def _handle_prefix(prefix):
-    if prefix is None:
-        return None
-    return IRCPrefix(prefix)
+
+def _handle_command(command):
+    try:
+        return _command_table[command]
+    except KeyError:
+        pass
+
+    if command.isnumeric():
+        return EventType.UNKNOWN, command
+    return EventType.PROTOCOL, command.lower()
+
+
+_privmsg = compile_message("PRIVMSG")
+_notice = compile_message("NOTICE")
 
 
 class Server:
@@ -92,13 +86,18 @@ class Server:
         Generic IRC connection. Subclassed by specific kinds of servers.
     """
 
-    __slots__ = ("loop", "master", "handlers", "socket", "connected", "_uri")
+    __slots__ = ("loop", "master", "handlers", "socket", "connected", "prefix_cache", "dispatcher", "supervisor",
+                 "_uri", "_master_tasks")
 
-    def __init__(self, uri, master=None, *, loop=None):
+    def __init__(self, uri, master=None, *, loop=None, prefix_cache=None, dispatcher=None, supervisor=None):
         self.loop = loop or asyncio.get_event_loop()
         self.master = master
+        self.dispatcher = dispatcher if dispatcher is not None else Dispatcher()
+        self.supervisor = supervisor if supervisor is not None else Supervisor()
+        self._master_tasks = set()
 
         self._uri = uri
+        self.prefix_cache = prefix_cache if prefix_cache is not None else utils.prefix_cache
 
         self.handlers = {}
         self.socket = None
@@ -125,18 +124,21 @@ class Server:
                 break
 
     async def _dispatch(self, event):
+        await self.dispatcher.submit(event, self._handle_event)
+
+    async def _handle_event(self, event):
         if self.master:
-            self.loop.create_task(self.master._dispatch(event))
+            if self.dispatcher.inline:
+                # The master's handlers may wait on rate limited writes, which mustn't hold up reading
+                task = self.loop.create_task(self.master._dispatch(event))
+                self._master_tasks.add(task)
+                task.add_done_callback(self._master_tasks.discard)
+            else:
+                await self.master._dispatch(event)
         for handler in self.handlers.get("all_events", ()):
-            try:
-                await handler(event)
-            except Exception as e:
-                raise HandlerError(e)
+            await self.supervisor.run(handler, event)
         for handler in self.handlers.get(event.command, ()):
-            try:
-                await handler(event)
-            except Exception as e:
-                raise HandlerError(e)
+            await self.supervisor.run(handler, event)
 
     @abc.abstractmethod
     async def connect(self, name, password=""):
@@ -161,11 +163,18 @@ class DefaultServer(Server):
         IRC specification
     """
 
-    __slots__ = ("buffer", "_uri", "username", "password")
+    __slots__ = ("buffer", "writer", "limiter", "isupport", "caps", "channels", "_uri", "username", "password")
 
-    def __init__(self, uri, master=None, *, loop=None):
-        super().__init__(uri, master, loop=loop)
+    def __init__(self, uri, master=None, *, loop=None, prefix_cache=None, dispatcher=None, supervisor=None):
+        super().__init__(uri, master, loop=loop, prefix_cache=prefix_cache, dispatcher=dispatcher,
+                         supervisor=supervisor)
         self.buffer = LineBuffer()
+        self.limiter = None
+        self.isupport = ISupport()
+        self.caps = set()
+        self.channels = set()
+        self.writer = WriteQueue(self._send_lines, limiter_for=self._limiter_for, cost_for=self._line_cost,
+                                 loop=self.loop)
         self.username = None
         self.password = None
 
@@ -173,8 +182,12 @@ class DefaultServer(Server):
         self.username = username
         self.password = password
 
-        self.socket = await websockets.connect(self._uri, ssl=None)
+        self.buffer.clear()
+        self.socket = await open_transport(self._uri, self.buffer, loop=self.loop)
         self.connected = True
+        self.isupport.clear()
+        self.caps.clear()
+        self.channels.clear()
 
         if self.password:
             await self.pass_(self.password)
@@ -182,29 +195,33 @@ class DefaultServer(Server):
         await self.user(self.username, self.username)
 
     async def disconnect(self):
-        await self.socket.close()
-        self.socket = None
+        socket, self.socket = self.socket, None
         self.connected = False
+        # Lines still waiting were meant for this connection, a new one would get them before registering
+        await self.writer.close()
+        if socket is not None:
+            await socket.close()
 
     # Methods for receiving data
 
     async def process_data(self):
+        socket = self.socket
         try:
-            data = await self.socket.recv()
-        except websockets.ConnectionClosed:
+            await socket.read()
+        except ConnectionLost:
+            if socket is not self.socket:
+                # Closed on our end, by disconnect
+                return self
             await self.disconnect()
             raise
-        if isinstance(data, str):
-            data = bytes(data, 'utf-8')
-        if chr(data[-1]) != "\n":
-            data += b'\n'
-
-        self.buffer.feed(data)
 
-        for line in self.buffer:
-            if not line:
-                continue
-            await self._process_line(line)
+        try:
+            for line in self.buffer:
+                if not line:
+                    continue
+                await self._process_line(line)
+        except LineTooLong as e:
+            log.warning(e)
 
         return self
 
@@ -212,64 +229,129 @@ class DefaultServer(Server):
         event = Event(self, EventType.CLIENT, "all_raw_events", [None, line])
         await self._dispatch(event)
 
-        match = _regexp_rfc.match(line)
-
-        type, command = _handle_command(match.group('command'))
-        command = command.lower()
-
-        args = _handle_args(match.group('argument'))
-
-        tags = _handle_tags(match.group('tags'))
+        try:
+            spans = scan_line(line)
+        except ValueError as e:
+            log.warning(e)
+            return
 
-        prefix = _handle_prefix(match.group('prefix'))
+        type, command = _handle_command(line[spans[3]:spans[4]])
 
-        # Dispatch the actual specific event
-        event = Event(self, type, command, args, prefix, tags)
+        # Dispatch the actual specific event, everything past the command is decoded on access
+        event = LazyEvent(self, type, command, line, spans)
         log.debug(event)
+        if command in _session_commands:
+            # Update before dispatching, so handlers already see the new state
+            self._track(command, event)
         await self._dispatch(event)
 
+    def _track(self, command, event):
+        """
+            Keep the server's ISUPPORT tokens, acknowledged capabilities and joined channels up to date
+        """
+        if command == "isupport":
+            self.isupport.update(event.arguments[:-1])
+        elif command == "cap":
+            if len(event.arguments) < 2:
+                return
+            subcommand, caps = event.arguments[0], event.arguments[-1].split()
+            if subcommand == "ACK":
+                for cap in caps:
+                    if cap.startswith("-"):
+                        self.caps.discard(cap[1:])
+                    else:
+                        self.caps.add(cap)
+            elif subcommand == "DEL":
+                self.caps.difference_update(caps)
+        elif command == "kick":
+            if event.arguments and self._is_me(event.arguments[0]):
+                self.channels.discard(event.target)
+        elif event.prefix is not None and self._is_me(event.prefix.nick):
+            if command == "join":
+                self.channels.add(event.target)
+            else:
+                self.channels.discard(event.target)
+
+    def _is_me(self, nick):
+        return nick is not None and self.username is not None and nick.lower() == self.username.lower()
+
     # Methods for sending data
 
-    async def send_raw(self, data):
-        await self.socket.send(data)
+    async def send_raw(self, data, priority=None):
+        if isinstance(data, str):
+            data = encode_line(data)
+        if priority is None:
+            priority = self._priority(data)
+        await self.writer.write(data, priority)
+
+    def _priority(self, data):
+        if data.startswith(_priority_commands):
+            return Priority.HIGH
+        return Priority.NORMAL
+
+    def _limiter_for(self, data):
+        # Keepalives and quits mustn't wait on the chat budget, or a busy bot misses PINGs
+        if data.startswith(_priority_commands):
+            return None
+        return self.limiter
+
+    def _line_cost(self, data):
+        # Join limits count channels, not lines, and one JOIN line can carry many
+        if data.startswith(b"JOIN "):
+            return data.split(b" ", 2)[1].count(b",") + 1
+        return 1
+
+    async def _send_lines(self, lines):
+        if self.socket is None:
+            raise AIRCError("Server isn't connected")
+        await self.socket.send_many(lines)
 
     async def send_items(self, *items):
         await self.send_raw(' '.join(filter(None, items)))
 
+    async def send_command(self, verb, *params, trailing=None):
+        """
+            Send one command. Middle parameters that are None are left out, trailing is sent as the
+            final parameter if given
+        """
+        await self.send_raw(template(verb)(*params, trailing=trailing))
+
+    async def send_lines(self, lines):
+        """
+            Send several encoded lines, queued together so they go out in as few writes as possible
+        """
+        await asyncio.gather(*(self.send_raw(line) for line in lines))
+
     # Handlers to send individual commands
 
     # Server management
 
     async def pass_(self, password):
-        await self.send_items("PASS", password)
+        await self.send_command("PASS", password)
 
     async def nick(self, nick):
-        await self.send_items("NICK", nick)
+        await self.send_command("NICK", nick)
 
     async def user(self, user, realname, mode=None):
         if mode is None:
             mode = "0"
-        await self.send_items("USER", user, mode, "*", f":{realname}")
+        await self.send_command("USER", user, mode, "*", trailing=realname)
 
     async def oper(self, name, password):
-        await self.send_items("OPER", name, password)
+        await self.send_command("OPER", name, password)
 
     async def mode(self, nick, mode, param=None):
-        await self.send_items("MODE", nick, mode, param)
+        await self.send_command("MODE", nick, mode, param)
 
     async def service(self, nick, distribution, type, info):
-        await self.send_items("SERVICE", nick, "*", distribution, type, "*", f":{info}")
+        await self.send_command("SERVICE", nick, "*", distribution, type, "*", trailing=info)
 
     async def quit(self, message=None):
-        if message is not None:
-            message = f":{message}"
-        await self.send_items("QUIT", message)
+        await self.send_command("QUIT", trailing=message)
         await self.disconnect()
 
     async def squit(self, server, comment=None):
-        if comment is not None:
-            comment = f":{comment}"
-        await self.send_items("SQUIT", server, comment)
+        await self.send_command("SQUIT", server, trailing=comment)
 
     # Channel management
 
@@ -277,169 +359,184 @@ class DefaultServer(Server):
         if isinstance(channel, list):
             if key is not None and not isinstance(key, list):
                 raise TypeError("List of channels must use list of keys, if keys are provided")
-            channel = ",".join(channel)
-            if key is not None:
-                key = ",".join(key)
-        await self.send_items("JOIN", channel, key)
+            lines = pack_params("JOIN", channel, self.isupport.targmax("JOIN"), keys=key)
+            await self.send_lines(lines)
+            return
+        await self.send_command("JOIN", channel, key)
+
+    async def rejoin(self, channels, batch=None):
+        """
+            Join channels again after a reconnect, at most batch channels per JOIN line, or as many as
+            TARGMAX allows. Lines go out one at a time, and each takes a use of the JOIN rate limiter per
+            channel, so no line carries more channels than the limiter allows at once
+        """
+        channels = sorted(channels)
+        limit = self.isupport.targmax("JOIN")
+        limiter = self._limiter_for(b"JOIN ")
+        for cap in (batch, limiter.rate if limiter is not None else None):
+            if cap is not None:
+                limit = cap if limit is None else min(cap, limit)
+        for line in pack_params("JOIN", channels, limit):
+            await self.send_raw(line)
 
     async def part(self, channel, message=None):
         if isinstance(channel, list):
-            channel = ",".join(channel)
-        if message is not None:
-            message = f":{message}"
-        await self.send_items("PART", channel, message)
+            lines = pack_params("PART", channel, self.isupport.targmax("PART"), trailing=message)
+            await self.send_lines(lines)
+            return
+        await self.send_command("PART", channel, trailing=message)
 
     async def topic(self, channel, topic=None):
-        if topic is not None:
-            topic = f":{topic}"
-        await self.send_items("TOPIC", channel, topic)
+        await self.send_command("TOPIC", channel, trailing=topic)
 
     async def names(self, channel=None, target=None):
         if isinstance(channel, list):
-            channel = ",".join(channel)
-        await self.send_items("NAMES", channel, target)
+            lines = pack_params("NAMES", channel, self.isupport.targmax("NAMES"), after=(target,))
+            await self.send_lines(lines)
+            return
+        await self.send_command("NAMES", channel, target)
 
     async def list(self, channel=None, target=None):
         if isinstance(channel, list):
             channel = ",".join(channel)
-        await self.send_items("LIST", channel, target)
+        await self.send_command("LIST", channel, target)
 
     async def invite(self, nick, channel):
-        await self.send_items("INVITE", nick, channel)
+        await self.send_command("INVITE", nick, channel)
 
     async def kick(self, channel, user, comment=None):
         if isinstance(channel, list):
             channel = ",".join(channel)
         if isinstance(user, list):
             user = ",".join(user)
-        if comment is not None:
-            comment = f":{comment}"
-        await self.send_items("KICK", channel, user, comment)
+        await self.send_command("KICK", channel, user, trailing=comment)
 
     # Sending messages
 
     async def privmsg(self, target, text):
-        text = f":{text}"
-        await self.send_items("PRIVMSG", target, text)
+        await self.send_raw(_privmsg(target, text))
 
     async def notice(self, target, text):
-        text = f":{text}"
-        await self.send_items("NOTICE", target, text)
+        await self.send_raw(_notice(target, text))
+
+    async def broadcast(self, targets, text, *, notice=False):
+        """
+            Send text to every target in as few lines as the server allows. Targets share lines up to the
+            server's TARGMAX or MAXTARGETS, and text too long for one line is split between characters
+        """
+        verb = "NOTICE" if notice else "PRIVMSG"
+        await self.send_lines(pack_message(verb, targets, text, self.isupport.targmax(verb)))
 
     # Server queries
 
     async def motd(self, target=None):
-        await self.send_items("MOTD", target)
+        await self.send_command("MOTD", target)
 
     async def lusers(self, mask=None, target=None):
-        await self.send_items("LUSERS", mask, target)
+        await self.send_command("LUSERS", mask, target)
 
     async def version(self, target=None):
-        await self.send_items("VERSION", target)
+        await self.send_command("VERSION", target)
 
     async def stats(self, query=None, target=None):
-        await self.send_items("STATS", query, target)
+        await self.send_command("STATS", query, target)
 
     async def links(self, mask=None, remote=None):
-        await self.send_items("LINKS", remote, mask)
+        await self.send_command("LINKS", remote, mask)
 
     async def time(self, target=None):
-        await self.send_items("TIME", target)
+        await self.send_command("TIME", target)
 
     async def connect_(self, target, port, remote=None):
-        await self.send_items("CONNECT", target, port, remote)
+        await self.send_command("CONNECT", target, str(port), remote)
 
     async def trace(self, target=None):
-        await self.send_items("TRACE", target)
+        await self.send_command("TRACE", target)
 
     async def admin(self, target=None):
-        await self.send_items("ADMIN", target)
+        await self.send_command("ADMIN", target)
 
     async def info(self, target=None):
-        await self.send_items("INFO", target)
+        await self.send_command("INFO", target)
 
     # Service queries
 
     async def servlist(self, mask=None, type=None):
-        await self.send_items("SERVLIST", mask, type)
+        await self.send_command("SERVLIST", mask, type)
 
     async def squery(self, name, text):
-        text = f":{text}"
-        await self.send_items(name, text)
+        await self.send_command("SQUERY", name, trailing=text)
 
     # User queries
 
     async def who(self, mask=None, ops_only=False):
         if mask is None:
             mask = "0"
-        if ops_only is True:
-            mask += " o"
-        await self.send_items("WHO", mask)
+        await self.send_command("WHO", mask, "o" if ops_only is True else None)
 
     async def whois(self, mask, target=None):
         if isinstance(mask, list):
-            mask = ",".join(mask)
-        await self.send_items("WHOIS", target, mask)
+            lines = pack_params("WHOIS", mask, self.isupport.targmax("WHOIS"), before=(target,))
+            await self.send_lines(lines)
+            return
+        await self.send_command("WHOIS", target, mask)
 
     async def whowas(self, nick, count=None, target=None):
         if isinstance(nick, list):
             nick = ",".join(nick)
-        await self.send_items("WHOWAS", nick, count, target)
+        if count is not None:
+            count = str(count)
+        await self.send_command("WHOWAS", nick, count, target)
 
     # Miscellaneous messages
 
     async def kill(self, nick, comment):
-        comment = f":{comment}"
-        await self.send_items("KILL", nick, comment)
+        await self.send_command("KILL", nick, trailing=comment)
 
     async def ping(self, serv1, serv2=None):
-        await self.send_items("PING", serv1, serv2)
+        await self.send_command("PING", serv1, serv2)
 
     async def pong(self, serv1, serv2=None):
-        await self.send_items("PONG", serv1, serv2)
+        await self.send_command("PONG", serv1, serv2)
 
     async def error(self, message):
-        message = f":{message}"
-        await self.send_items("ERROR", message)
+        await self.send_command("ERROR", trailing=message)
 
     # Optional messages bellow
 
     async def away(self, message=None):
-        if message is not None:
-            message = f":{message}"
-        await self.send_items("AWAY", message)
+        await self.send_command("AWAY", trailing=message)
 
     async def rehash(self):
-        await self.send_items("REHASH")
+        await self.send_command("REHASH")
 
     async def die(self):
-        await self.send_items("DIE")
+        await self.send_command("DIE")
 
     async def restart(self):
-        await self.send_items("RESTART")
+        await self.send_command("RESTART")
 
     async def summon(self, user, target=None, channel=None):
-        await self.send_items("SUMMON", user, target, channel)
+        await self.send_command("SUMMON", user, target, channel)
 
     async def users(self, target=None):
-        await self.send_items("USERS", target)
+        await self.send_command("USERS", target)
 
     async def wallops(self, message=None):
-        if message is not None:
-            message = f":{message}"
-        await self.send_items("WALLOPS", message)
+        await self.send_command("WALLOPS", trailing=message)
 
     async def userhost(self, nick):
         if isinstance(nick, list):
             if len(nick) > 5:
                 raise AttributeError("Userhost command can only get up to 5 users at once")
-            nick = " ".join(nick)
-        await self.send_items("USERHOST", nick)
+        else:
+            nick = [nick]
+        await self.send_command("USERHOST", *nick)
 
     async def ison(self, nick):
-        if isinstance(nick, list):
-            nick = " ".join(nick)
-        await self.send_items("ISON", nick)
+        if not isinstance(nick, list):
+            nick = [nick]
+        await self.send_command("ISON", *nick)
 
     # IRC v3 addons
 
@@ -448,5 +545,12 @@ class DefaultServer(Server):
             raise AttributeError
         if isinstance(args, list):
             args = " ".join(args)
-        args = f":{args}"
-        await self.send_items("CAP", subcom, args)
+        await self.send_command("CAP", subcom, trailing=args)
+
+    async def request_caps(self, caps):
+        """
+            Request several capabilities, in as few CAP REQ lines as fit
+        """
+        caps = sorted(caps)
+        if caps:
+            await self.send_lines(pack_words("CAP", caps, before=("REQ",)))
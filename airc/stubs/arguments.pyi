@@ -0,0 +1,78 @@
+"""
+    AIRC command argument stubs
+"""
+
+import inspect
+import logging
+
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Pattern, Tuple, Union
+from .bot import Context
+from .client import User, Channel
+from .errors import ArgumentError
+
+
+log: logging.Logger
+
+_word: Pattern
+_escape: Pattern
+_empty: type
+
+_true: FrozenSet[str]
+_false: FrozenSet[str]
+
+_converters: Dict[Any, Tuple[Optional[Callable], bool]]
+
+
+def _unescape(text: str) -> str: ...
+
+def _escaped_quote(piece: str) -> int: ...
+
+def split_args(content: str) -> List[str]: ...
+
+def _to_bool(argument: str) -> bool: ...
+
+def _to_user(ctx: Context, argument: str) -> User: ...
+
+def _to_channel(ctx: Context, argument: str) -> Channel: ...
+
+def register_converter(annotation: Any, converter: Callable, *, context: bool = ...) -> None: ...
+
+def _converter_for(annotation: Any) -> Tuple[Optional[Callable], bool]: ...
+
+
+class _Param:
+
+    __slots__ = ("name", "type_name", "converter", "context", "is_async", "direct", "default")
+
+    name: str
+    type_name: str
+    converter: Optional[Callable]
+    context: bool
+    is_async: bool
+    direct: bool
+    default: Any
+
+    def __init__(self, param: inspect.Parameter, annotation: Any) -> None: ...
+
+    def _failed(self, argument: str) -> ArgumentError: ...
+
+    def convert(self, ctx: Context, argument: str) -> Union[Any, Awaitable[Any]]: ...
+
+    async def _convert_async(self, ctx: Context, argument: str) -> Any: ...
+
+
+class Binder:
+
+    __slots__ = ("positional", "varargs", "rest", "is_async", "plain")
+
+    positional: Tuple[_Param, ...]
+    varargs: Optional[_Param]
+    rest: Optional[_Param]
+    is_async: bool
+    plain: bool
+
+    def __init__(self, callback: Callable) -> None: ...
+
+    def bind(self, ctx: Context, tokens: List[str]) -> Tuple[List[Any], Dict[str, Any]]: ...
+
+    async def bind_async(self, ctx: Context, tokens: List[str]) -> Tuple[List[Any], Dict[str, Any]]: ...
@@ -1,12 +1,16 @@
 
-from typing import List, Callable, Dict, Coroutine, Any, Union, Tuple
+from typing import List, Callable, Dict, Coroutine, Any, Optional, Union, Tuple, Hashable
 import logging
 import asyncio
 import inspect
 from airc.events import Event
 from airc.client import TwitchClient, TwitchChannel, TwitchUser, Messageable
 from airc.server import TwitchServer, Cooldown
-from airc.enums import UserType
+from airc.utils import PrefixMatcher, CooldownMapping, ConcurrencyLimit, LatencyHistogram
+from airc.enums import UserType, BucketType
+from airc.arguments import Binder
+from airc.cache import ResponseCache
+from airc.executors import ExecutorPool
 
 log: logging.Logger
 
@@ -15,17 +19,20 @@ async def empty_handler(*args) -> None: ...
 
 def empty_handler_sync(*args) -> None: ...
 
-def _split_args(content: str) -> List[str]: ...
-
 class TwitchBot(TwitchClient):
 
     prefix: str
     all_commands: Dict[Command]
     cogs: Dict
     _checks: List[Union[Coroutine, Callable]]
+    executors: Dict[str, ExecutorPool]
+    _prefixes: Optional[PrefixMatcher]
+    _channel_prefixes: Dict[str, PrefixMatcher]
+    command_timeout: Optional[float]
 
 
-    def __init__(self, prefix: str, user_type: UserType = ..., loop: asyncio.AbstractEventLoop = ...) -> None: ...
+    def __init__(self, prefix: str, user_type: UserType = ..., loop: asyncio.AbstractEventLoop = ...,
+                 command_timeout: Optional[float] = ...) -> None: ...
 
     def add_check(self, predicate: Coroutine) -> None: ...
 
@@ -41,12 +48,26 @@ class TwitchBot(TwitchClient):
 
     def remove_cog(self, name: str) -> None: ...
 
+    def add_executor(self, name: str, pool: ExecutorPool) -> None: ...
+
+    def get_executor(self, name: str) -> ExecutorPool: ...
+
+    def executor_stats(self) -> Dict[str, Dict[str, float]]: ...
+
+    def command_stats(self) -> Dict[str, Dict[str, Any]]: ...
+
+    def shutdown_executors(self, wait: bool = ...) -> None: ...
+
     def load_extension(self, name: str) -> None: ...
 
     def unload_extension(self, name: str) -> None: ...
 
+    def invalidate_prefix(self, channel: Optional[str] = ...) -> None: ...
+
     async def get_prefix(self, message: TwitchMessage) -> str: ...
 
+    async def prefix_matcher(self, message: TwitchMessage) -> PrefixMatcher: ...
+
     async def _dispatch(self, event: Event) -> None: ...
 
     async def _handle_command(self, event: Event) -> None: ...
@@ -75,7 +96,7 @@ class TwitchMessage:
 
 class Context(Messageable):
 
-    __slots__ = ("bot", "message", "invoked_prefix", "args", "invoker", "command")
+    __slots__ = ("bot", "message", "invoked_prefix", "args", "invoker", "command", "replies")
 
     bot: TwitchBot
     message: TwitchMessage
@@ -83,6 +104,7 @@ class Context(Messageable):
     args: List[str]
     invoker: str
     command: Command
+    replies: Optional[List[str]]
 
     @property
     def channel(self) -> TwitchChannel: ...
@@ -98,9 +120,60 @@ class Context(Messageable):
 
     async def send(self, message: str) -> None: ...
 
+class ContextData:
+
+    __slots__ = ("command", "invoker", "prefix", "args", "content", "channel", "author")
+
+    command: str
+    invoker: str
+    prefix: str
+    args: List[str]
+    content: str
+    channel: str
+    author: str
+
+    def __init__(self, ctx: Context) -> None: ...
+
+class _CallbackRef:
+
+    __slots__ = ("module", "qualname")
+
+    module: str
+    qualname: str
+
+    def __init__(self, func: Callable) -> None: ...
+
+    def __call__(self, *args, **kwargs) -> Any: ...
+
+class CommandStats:
+
+    __slots__ = ("name", "succeeded", "failed", "timed_out", "rejected", "running", "peak_running", "queued",
+                 "total_wait", "max_wait", "latency", "last_error")
+
+    name: str
+    succeeded: int
+    failed: int
+    timed_out: int
+    rejected: int
+    running: int
+    peak_running: int
+    queued: int
+    total_wait: float
+    max_wait: float
+    latency: LatencyHistogram
+    last_error: Optional[str]
+
+    def __init__(self, name: str) -> None: ...
+
+    @property
+    def mean_wait(self) -> float: ...
+
+    def as_dict(self) -> Dict[str, Any]: ...
+
 class Command:
 
-    __slots__ = ("name", "callback", "active", "hidden", "aliases", "help", "params", "checks", "cooldowns")
+    __slots__ = ("name", "callback", "active", "hidden", "aliases", "help", "params", "binder", "checks",
+                 "cooldowns", "executor", "timeout", "cache", "concurrency", "stats")
 
     name: str
     callback: Coroutine
@@ -109,8 +182,14 @@ class Command:
     aliases: List[str]
     help: str
     params: Dict[str, inspect.Parameter]
+    binder: Binder
     checks: List[Union[Callable, Coroutine]]
-    cooldowns: List[Cooldown]
+    cooldowns: List[Union[Cooldown, CooldownMapping]]
+    executor: str
+    timeout: float
+    cache: Optional[ResponseCache]
+    concurrency: Optional[ConcurrencyLimit]
+    stats: CommandStats
 
     def __init__(self, name: str, callback: Coroutine, **options) -> None: ...
 
@@ -118,6 +197,14 @@ class Command:
 
     async def invoke(self, ctx: Context) -> None: ...
 
+    async def _acquire(self, ctx: Context, limit: ConcurrencyLimit) -> Hashable: ...
+
+    def get_timeout(self, ctx: Context) -> Optional[float]: ...
+
+    async def _invoke_callback(self, ctx: Context, args: List[Any], kwargs: Dict[str, Any]) -> None: ...
+
+    async def _invoke_in_executor(self, ctx: Context, args: List[str], kwargs: Dict[str, Any]) -> None: ...
+
     async def can_run(self, ctx: Context) -> bool: ...
 
 def command(name: str = ..., cls: type = ..., **attrs) -> Callable[[...], Command]: ...
@@ -130,4 +217,11 @@ def mod_only() -> Callable: ...
 
 def subscriber_only() -> Callable: ...
 
-def cooldown(per: int, time: int, target: str = ...) -> Callable: ...
\ No newline at end of file
+def cooldown(per: int, time: int, target: Union[str, BucketType, Callable[[Context], Any]] = ...,
+             *, max_buckets: Optional[int] = ...) -> Callable: ...
+
+def cached(ttl: float, key: Optional[Callable[[Context], Hashable]] = ..., *, maxsize: Optional[int] = ...,
+           collapse: bool = ...) -> Callable: ...
+
+def max_concurrency(number: int, per: Union[BucketType, Callable[[Context], Hashable]] = ..., *,
+                    wait: bool = ...) -> Callable: ...
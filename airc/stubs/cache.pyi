@@ -0,0 +1,65 @@
+"""
+    AIRC response cache stubs
+"""
+
+import asyncio
+import logging
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+from airc.bot import Context
+
+
+log: logging.Logger
+
+
+def _args_key(ctx: Context) -> Tuple[str, ...]: ...
+
+
+class CacheStats:
+
+    __slots__ = ("hits", "misses", "joined", "collapsed", "failed", "evicted")
+
+    hits: int
+    misses: int
+    joined: int
+    collapsed: int
+    failed: int
+    evicted: int
+
+    def __init__(self) -> None: ...
+
+    def as_dict(self) -> Dict[str, int]: ...
+
+
+class ResponseCache:
+
+    __slots__ = ("ttl", "maxsize", "collapse", "stats", "_key", "_entries", "_inflight")
+
+    ttl: float
+    maxsize: Optional[int]
+    collapse: bool
+    stats: CacheStats
+    _key: Callable[[Context], Hashable]
+    _entries: OrderedDict[Tuple[Optional[str], Hashable], Tuple[float, Tuple[str, ...]]]
+    _inflight: Dict[Tuple[Optional[str], Hashable], asyncio.Future]
+
+    def __init__(self, ttl: float, key: Optional[Callable[[Context], Hashable]] = ..., *,
+                 maxsize: Optional[int] = ..., collapse: bool = ...) -> None: ...
+
+    def __len__(self) -> int: ...
+
+    def get_key(self, ctx: Context) -> Tuple[Optional[str], Hashable]: ...
+
+    def get(self, key: Tuple[Optional[str], Hashable], now: Optional[float] = ...) -> Optional[Tuple[str, ...]]: ...
+
+    def put(self, key: Tuple[Optional[str], Hashable], replies: Sequence[str], now: Optional[float] = ...) -> None: ...
+
+    def expire(self, now: Optional[float] = ...) -> None: ...
+
+    def invalidate(self, channel: Optional[str] = ...) -> None: ...
+
+    async def invoke(self, ctx: Context, run: Callable[[Context], Awaitable[None]]) -> None: ...
+
+    async def _replay(self, ctx: Context, replies: Sequence[str]) -> None: ...
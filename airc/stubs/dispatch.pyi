@@ -0,0 +1,113 @@
+"""
+    AIRC dispatcher stubs
+"""
+
+import asyncio
+
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+from .enums import Backpressure
+from .events import Event
+from .executors import ExecutorPool
+
+
+def _target_key(event: Event) -> Any: ...
+
+class Dispatcher:
+
+    __slots__ = ()
+
+    inline: bool
+
+    async def submit(self, event: Event, callback: Callable[[Event], Awaitable[None]]) -> None: ...
+
+    async def join(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+class _Lane:
+
+    __slots__ = ("queue", "spill", "task")
+
+    queue: asyncio.Queue
+    spill: Deque[Tuple[Event, Callable[[Event], Awaitable[None]]]]
+    task: Optional[asyncio.Task]
+
+class ConcurrentDispatcher(Dispatcher):
+
+    __slots__ = ("workers", "key", "maxsize", "policy", "dropped", "spilled", "_lanes")
+
+    workers: int
+    key: Callable[[Event], Any]
+    maxsize: int
+    policy: Backpressure
+    dropped: int
+    spilled: int
+    _lanes: Optional[List[_Lane]]
+
+    def __init__(self, workers: int = ..., *, key: Callable[[Event], Any] = ..., maxsize: int = ..., policy: Union[Backpressure, str] = ...) -> None: ...
+
+    def pending(self) -> int: ...
+
+def _handler_key(handler: Callable) -> Callable: ...
+
+def _handler_name(handler: Callable) -> str: ...
+
+class HandlerStats:
+
+    __slots__ = ("name", "calls", "errors", "timed", "total_time", "max_time", "threaded", "total_wait", "max_wait",
+                 "last_error", "disabled", "suppressed", "_streak", "_streak_call", "_window_start",
+                 "_window_reports")
+
+    name: str
+    calls: int
+    errors: int
+    timed: int
+    total_time: float
+    max_time: float
+    threaded: int
+    total_wait: float
+    max_wait: float
+    last_error: Optional[Exception]
+    disabled: bool
+    suppressed: int
+
+    def __init__(self, name: str) -> None: ...
+
+    @property
+    def consecutive_errors(self) -> int: ...
+
+    @property
+    def mean_time(self) -> float: ...
+
+    @property
+    def mean_wait(self) -> float: ...
+
+    def as_dict(self) -> Dict[str, Any]: ...
+
+class Supervisor:
+
+    __slots__ = ("max_failures", "report_limit", "report_interval", "executor", "timing", "stats")
+
+    max_failures: int
+    report_limit: int
+    report_interval: float
+    executor: ExecutorPool
+    timing: bool
+    stats: Dict[Callable, HandlerStats]
+
+    def __init__(self, *, max_failures: int = ..., report_limit: int = ..., report_interval: float = ...,
+                 executor: Optional[ExecutorPool] = ..., max_threads: int = ...,
+                 timing: bool = ...) -> None: ...
+
+    def resolve(self, handler: Callable) -> Tuple[Callable, HandlerStats, bool]: ...
+
+    async def run(self, handler: Callable[[Event], Awaitable[None]], event: Event) -> None: ...
+
+    async def run_all(self, handlers: Sequence[Tuple[Callable[[Event], Awaitable[None]], HandlerStats, bool]],
+                      event: Event) -> None: ...
+
+    def enable(self, handler: Callable) -> None: ...
+
+    def handler_stats(self) -> Dict[str, Dict[str, Any]]: ...
+
+    def shutdown(self, wait: bool = ...) -> None: ...
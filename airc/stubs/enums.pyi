@@ -9,4 +9,25 @@ class UserType(enum.Enum):
 
     normal_user: str
     known_bot: str
-    verified_bot: str
\ No newline at end of file
+    verified_bot: str
+
+class Backpressure(enum.Enum):
+
+    BLOCK: str
+    DROP_OLDEST: str
+    SPILL: str
+
+
+class Priority(enum.IntEnum):
+
+    HIGH: int
+    NORMAL: int
+    LOW: int
+
+
+class BucketType(enum.Enum):
+
+    GLOBAL: str
+    USER: str
+    CHANNEL: str
+    MEMBER: str
@@ -9,3 +9,26 @@ class AIRCError(Exception):
 
 class HandlerError(AIRCError):
     pass
+
+
+class LineTooLong(AIRCError):
+    pass
+
+
+class ConnectionLost(AIRCError):
+    pass
+
+
+class InvalidLine(AIRCError):
+    pass
+
+
+class ExecutorBusy(AIRCError):
+    pass
+
+
+class ArgumentError(AIRCError):
+    pass
+
+class MaxConcurrencyReached(AIRCError):
+    pass
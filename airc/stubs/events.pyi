@@ -2,7 +2,7 @@
     Events stubs for the AIRC module
 """
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from .server import TwitchServer
 from .utils import IRCPrefix
 
@@ -31,4 +31,13 @@ class Event:
 
     def __init__(self, server: TwitchServer, type: str, arguments: List[str], prefix: str = ..., tags: Dict[str, str] = ...) -> None: ...
 
-    def __str__(self) -> str: ...
\ No newline at end of file
+    def __str__(self) -> str: ...
+
+class LazyEvent(Event):
+
+    __slots__ = ("line", "spans", "_target", "_arguments", "_prefix", "_tags")
+
+    line: str
+    spans: Tuple[int, int, int, int, int, int]
+
+    def __init__(self, server: TwitchServer, type: str, command: str, line: str, spans: Tuple[int, int, int, int, int, int]) -> None: ...
@@ -0,0 +1,77 @@
+"""
+    AIRC executor pool stubs
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+log: logging.Logger
+
+_kinds: Tuple[str, ...]
+
+
+def _timed(func: Callable[..., T], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[float, float, T]: ...
+
+
+class ExecutorStats:
+
+    __slots__ = ("submitted", "completed", "failed", "timed_out", "rejected", "pending", "peak_pending",
+                 "total_wait", "max_wait", "total_run", "max_run")
+
+    submitted: int
+    completed: int
+    failed: int
+    timed_out: int
+    rejected: int
+    pending: int
+    peak_pending: int
+    total_wait: float
+    max_wait: float
+    total_run: float
+    max_run: float
+
+    def __init__(self) -> None: ...
+
+    @property
+    def mean_wait(self) -> float: ...
+
+    @property
+    def mean_run(self) -> float: ...
+
+    def as_dict(self) -> Dict[str, float]: ...
+
+
+class ExecutorPool:
+
+    __slots__ = ("kind", "max_workers", "timeout", "max_pending", "stats", "_executor")
+
+    kind: str
+    max_workers: Optional[int]
+    timeout: Optional[float]
+    max_pending: Optional[int]
+    stats: ExecutorStats
+    _executor: Optional[concurrent.futures.Executor]
+
+    def __init__(self, kind: str = ..., *, max_workers: Optional[int] = ..., timeout: Optional[float] = ...,
+                 max_pending: Optional[int] = ...) -> None: ...
+
+    def _start(self) -> concurrent.futures.Executor: ...
+
+    async def run(self, func: Callable[..., T], args: Tuple[Any, ...] = ..., kwargs: Optional[Dict[str, Any]] = ...,
+                  *, timeout: Optional[float] = ...) -> T: ...
+
+    async def run_timed(self, func: Callable[..., T], args: Tuple[Any, ...] = ...,
+                        kwargs: Optional[Dict[str, Any]] = ..., *, timeout: Optional[float] = ...
+                        ) -> Tuple[float, float, T]: ...
+
+    def _call_done(self, loop: asyncio.AbstractEventLoop, future: concurrent.futures.Future) -> None: ...
+
+    def _release(self) -> None: ...
+
+    def shutdown(self, wait: bool = ...) -> None: ...
@@ -0,0 +1,36 @@
+"""
+    AIRC ISUPPORT stubs
+"""
+
+from typing import Dict, List, Optional
+
+
+_default_targmax: Dict[str, Optional[int]] = ...
+
+
+class ISupport:
+
+    __slots__ = ("tokens", "_targmax")
+
+    tokens: Dict[str, str]
+    _targmax: Optional[Dict[str, Optional[int]]]
+
+    def __init__(self) -> None: ...
+
+    def __repr__(self) -> str: ...
+
+    def __contains__(self, name: str) -> bool: ...
+
+    def __getitem__(self, name: str) -> str: ...
+
+    def __len__(self) -> int: ...
+
+    def get(self, name: str, default: Optional[str] = ...) -> Optional[str]: ...
+
+    def update(self, tokens: List[str]) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def _parse_targmax(self) -> Dict[str, Optional[int]]: ...
+
+    def targmax(self, command: str) -> Optional[int]: ...
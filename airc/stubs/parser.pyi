@@ -0,0 +1,22 @@
+"""
+    AIRC parser stubs
+"""
+
+from typing import Dict, List, Match, Optional, Pattern, Tuple
+
+
+def parse_tags(tags: Optional[str]) -> Dict[str, Optional[str]]: ...
+
+def first_param(params: str) -> Optional[str]: ...
+
+def parse_params(params: str) -> List[str]: ...
+
+def scan_line(line: str) -> Tuple[int, int, int, int, int, int]: ...
+
+def parse_line(line: str) -> Tuple[Dict[str, Optional[str]], Optional[str], str, List[str]]: ...
+
+_isupport_escape: Pattern[str] = ...
+
+def _unescape(match: Match[str]) -> str: ...
+
+def parse_isupport(tokens: List[str]) -> List[Tuple[str, Optional[str]]]: ...
@@ -0,0 +1,64 @@
+"""
+    AIRC connection pool stubs
+"""
+
+import asyncio
+
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+from .client import DefaultClient
+from .server import DefaultServer
+from .events import Event
+
+
+class ConnectionPool:
+
+    __slots__ = ("client", "uri", "username", "password", "max_channels", "server_kwargs", "shards", "_owners",
+                 "_ready", "_registered", "_limit")
+
+    client: DefaultClient
+    uri: str
+    username: str
+    password: str
+    max_channels: int
+    server_kwargs: Dict[str, Any]
+    shards: Dict[DefaultServer, Set[str]]
+    _owners: Dict[str, DefaultServer]
+    _ready: Dict[DefaultServer, asyncio.Task]
+    _registered: Dict[DefaultServer, asyncio.Future]
+    _limit: asyncio.Semaphore
+
+    def __init__(self, client: DefaultClient, uri: str, username: str, password: str = ..., *,
+                 max_channels: int = ..., **server_kwargs: Any) -> None: ...
+
+    def __len__(self) -> int: ...
+
+    def __iter__(self) -> Iterator[DefaultServer]: ...
+
+    def __contains__(self, channel: str) -> bool: ...
+
+    @property
+    def channels(self) -> List[str]: ...
+
+    def shard_for(self, target: str) -> DefaultServer: ...
+
+    def _open_shard(self) -> DefaultServer: ...
+
+    def _assign(self, channels: List[str]) -> Dict[DefaultServer, List[str]]: ...
+
+    def _drop_shard(self, shard: DefaultServer) -> None: ...
+
+    async def _on_registered(self, event: Event) -> None: ...
+
+    async def _join_shard(self, shard: DefaultServer, ready: asyncio.Task, channels: List[str]) -> None: ...
+
+    async def join(self, channels: Union[str, List[str]]) -> None: ...
+
+    async def part(self, channels: Union[str, List[str]], message: Optional[str] = ...) -> None: ...
+
+    async def privmsg(self, target: str, text: str) -> None: ...
+
+    async def notice(self, target: str, text: str) -> None: ...
+
+    async def broadcast(self, targets: List[str], text: str, *, notice: bool = ...) -> None: ...
+
+    async def close(self, message: Optional[str] = ...) -> None: ...
@@ -0,0 +1,92 @@
+"""
+    AIRC reconnect manager stubs
+"""
+
+import asyncio
+import logging
+
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from .client import DefaultClient
+from .events import Event
+from .server import DefaultServer
+
+
+log: logging.Logger
+
+
+class Backoff:
+
+    __slots__ = ("base", "factor", "cap")
+
+    base: float
+    factor: float
+    cap: float
+
+    def __init__(self, base: float = ..., factor: float = ..., cap: float = ...) -> None: ...
+
+    def delay(self, attempt: int) -> float: ...
+
+
+class Incident:
+
+    __slots__ = ("server", "reason", "started", "detected", "recovered", "attempts", "caps", "channels")
+
+    server: DefaultServer
+    reason: Any
+    started: float
+    detected: float
+    recovered: Optional[float]
+    attempts: int
+    caps: Set[str]
+    channels: Set[str]
+
+    def __init__(self, server: DefaultServer, reason: Any, caps: Set[str], channels: Set[str]) -> None: ...
+
+    @property
+    def downtime(self) -> float: ...
+
+    def as_dict(self) -> Dict[str, Any]: ...
+
+
+class ReconnectManager:
+
+    __slots__ = ("backoff", "max_attempts", "attempt_timeout", "rejoin_batch", "incidents", "client", "_tasks",
+                 "_welcomed")
+
+    backoff: Backoff
+    max_attempts: Optional[int]
+    attempt_timeout: float
+    rejoin_batch: Optional[int]
+    incidents: Deque[Incident]
+    client: Optional[DefaultClient]
+    _tasks: Dict[DefaultServer, asyncio.Task]
+    _welcomed: Dict[DefaultServer, asyncio.Future]
+
+    def __init__(self, *, backoff: Optional[Backoff] = ..., max_attempts: Optional[int] = ...,
+                 attempt_timeout: float = ..., rejoin_batch: Optional[int] = ..., history: int = ...) -> None: ...
+
+    def attach(self, client: DefaultClient) -> None: ...
+
+    def running(self) -> Tuple[asyncio.Task, ...]: ...
+
+    def schedule(self, server: DefaultServer, reason: Any) -> asyncio.Task: ...
+
+    async def reconnect(self, server: DefaultServer, reason: Any = ...) -> None: ...
+
+    def dropped(self, server: DefaultServer, reason: Any) -> None: ...
+
+    async def _on_reconnect(self, event: Event) -> None: ...
+
+    async def _on_welcome(self, event: Event) -> None: ...
+
+    async def _recover(self, server: DefaultServer, reason: Any) -> None: ...
+
+    async def _connect(self, server: DefaultServer) -> None: ...
+
+    async def _restore(self, server: DefaultServer, incident: Incident) -> None: ...
+
+    async def _dispatch(self, server: DefaultServer, name: str, incident: Incident) -> None: ...
+
+    def report(self) -> List[Dict[str, Any]]: ...
+
+    def cancel(self) -> None: ...
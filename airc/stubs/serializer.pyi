@@ -0,0 +1,39 @@
+"""
+    AIRC serializer stubs
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .errors import InvalidLine
+
+
+MAX_LINE_LENGTH: int = ...
+_max_length: int = ...
+
+_templates: Dict[str, Callable[..., bytes]] = ...
+
+
+def _invalid_param(verb: str, param: str) -> InvalidLine: ...
+
+def _invalid_line(line: str) -> InvalidLine: ...
+
+def _too_long(data: bytes) -> InvalidLine: ...
+
+def encode_line(line: str) -> bytes: ...
+
+def compile_template(verb: str) -> Callable[..., bytes]: ...
+
+def compile_message(verb: str) -> Callable[[str, str], bytes]: ...
+
+def template(verb: str) -> Callable[..., bytes]: ...
+
+def split_utf8(data: bytes, size: int) -> List[bytes]: ...
+
+def _pack(sizes: List[int], limit: Optional[int], room: int, sep: int = ...) -> List[Tuple[int, int]]: ...
+
+def pack_params(verb: str, targets: List[str], limit: Optional[int], *, keys: Optional[List[str]] = ...,
+                before: Sequence[Optional[str]] = ..., after: Sequence[Optional[str]] = ...,
+                trailing: Optional[str] = ...) -> List[bytes]: ...
+
+def pack_words(verb: str, words: List[str], *, before: Sequence[Optional[str]] = ...) -> List[bytes]: ...
+
+def pack_message(verb: str, targets: List[str], text: str, limit: Optional[int]) -> List[bytes]: ...
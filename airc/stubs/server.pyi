@@ -5,7 +5,8 @@
 import asyncio
 import websockets
 
-from typing import Pattern, Dict, List, Coroutine
+from typing import Pattern, Dict, List, Coroutine, Tuple
+from .enums import EventType
 from .events import Event
 from .master import ServerMaster
 from .utils import SortedHandler, Cooldown, LineBuffer, IRCPrefix
@@ -13,16 +14,14 @@ from .utils import SortedHandler, Cooldown, LineBuffer, IRCPrefix
 
 _cap_subcommands: set = ...
 _client_subcommands: set = ...
-_rfc_pattern: str = ...
-_regexp_rfc: Pattern = ...
 
-def _handle_tags(tags: str) -> Dict[str, str]: ...
+_protocol_commands: List[str] = ...
+_command_table: Dict[str, Tuple[EventType, str]] = ...
 
-def _handle_args(args: str) -> List[str]: ...
+def _build_command_table() -> Dict[str, Tuple[EventType, str]]: ...
 
-def _handle_command(command: str) -> str: ...
+def _handle_command(command: str) -> Tuple[EventType, str]: ...
 
-def _handle_prefix(prefix: str) -> IRCPrefix: ...
 
 class Server:
 
@@ -0,0 +1,48 @@
+"""
+    AIRC transport stubs
+"""
+
+import abc
+import ssl as _ssl
+import asyncio
+import websockets
+
+from typing import Dict, Optional, Union, Type
+from .utils import LineBuffer
+
+
+class Transport(abc.ABC):
+
+    __slots__ = ("buffer",)
+
+    buffer: LineBuffer
+
+    def __init__(self, buffer: LineBuffer) -> None: ...
+
+    @classmethod
+    async def open(cls, uri: str, buffer: LineBuffer, *, loop: asyncio.AbstractEventLoop, ssl: Optional[_ssl.SSLContext] = ...) -> Transport: ...
+
+    async def read(self) -> None: ...
+
+    async def send(self, data: Union[str, bytes]) -> None: ...
+
+    async def close(self) -> None: ...
+
+class StreamTransport(Transport):
+
+    __slots__ = ("transport", "protocol")
+
+    default_ports: Dict[str, int] = ...
+
+    transport: asyncio.Transport
+    protocol: asyncio.BufferedProtocol
+
+class WebSocketTransport(Transport):
+
+    __slots__ = ("socket",)
+
+    socket: websockets.WebSocketClientProtocol
+
+def register_transport(scheme: str, cls: Type[Transport]) -> None: ...
+
+async def open_transport(uri: str, buffer: LineBuffer, *, loop: asyncio.AbstractEventLoop = ..., ssl: Optional[_ssl.SSLContext] = ...) -> Transport: ...
@@ -2,8 +2,11 @@
     AIRC utils stub file
 """
 
-from typing import Pattern, Union, Callable, List, Any
+from typing import Pattern, Union, Callable, Dict, List, Any, Iterator, Optional, Sequence, Tuple, Hashable, Deque
+import asyncio
+from collections import OrderedDict
 from .events import Event
+from .enums import BucketType
 
 
 class Cooldown:
@@ -22,34 +25,147 @@ class Cooldown:
 
     def set_time(self, time: int) -> None: ...
 
-    def can_run(self) -> bool: ...
+    def can_run(self) -> float: ...
+
+class CooldownMapping:
+
+    __slots__ = ("per", "time", "bucket", "max_buckets", "_key", "_buckets", "_next_expiry")
+
+    per: int
+    time: float
+    bucket: Union[BucketType, Callable[[Any], Hashable]]
+    max_buckets: Optional[int]
+    _key: Callable[[Any], Hashable]
+    _buckets: OrderedDict[Hashable, List[float]]
+    _next_expiry: float
+
+    def __init__(self, per: int, time: float, bucket: Union[BucketType, Callable[[Any], Hashable]] = ...,
+                 *, max_buckets: Optional[int] = ...) -> None: ...
+
+    def __len__(self) -> int: ...
+
+    def get_key(self, ctx: Any) -> Hashable: ...
+
+    def can_run(self, ctx: Any) -> float: ...
+
+    def hit(self, key: Hashable, now: Optional[float] = ...) -> float: ...
+
+    def expire(self, now: Optional[float] = ...) -> None: ...
+
+    def reset(self, key: Optional[Hashable] = ...) -> None: ...
+
+class ConcurrencyLimit:
+
+    __slots__ = ("number", "per", "wait", "_key", "_active", "_waiters")
+
+    number: int
+    per: Union[BucketType, Callable[[Any], Hashable]]
+    wait: bool
+    _key: Callable[[Any], Hashable]
+    _active: Dict[Hashable, int]
+    _waiters: Dict[Hashable, Deque[asyncio.Future]]
+
+    def __init__(self, number: int, per: Union[BucketType, Callable[[Any], Hashable]] = ..., *,
+                 wait: bool = ...) -> None: ...
+
+    def __len__(self) -> int: ...
+
+    def running(self, key: Hashable) -> int: ...
+
+    def waiting(self, key: Hashable) -> int: ...
+
+    async def acquire(self, ctx: Any) -> Hashable: ...
+
+    def release(self, key: Hashable) -> None: ...
+
+_latency_bounds: Tuple[float, ...]
+
+class LatencyHistogram:
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    bounds: Tuple[float, ...]
+    counts: List[int]
+    count: int
+    total: float
+    max: float
+
+    def __init__(self, bounds: Tuple[float, ...] = ...) -> None: ...
+
+    @property
+    def mean(self) -> float: ...
+
+    def record(self, seconds: float) -> None: ...
+
+    def percentile(self, percent: float) -> float: ...
+
+    def reset(self) -> None: ...
+
+    def as_dict(self) -> Dict[str, Any]: ...
+
+class RateLimiter:
+
+    __slots__ = ("rate", "per", "_uses")
+
+    rate: int
+    per: float
+    _uses: Deque[float]
+
+    def __init__(self, rate: int, per: float) -> None: ...
+
+    def delay(self, now: Optional[float] = ..., cost: int = ...) -> float: ...
+
+    def acquire(self, now: Optional[float] = ..., cost: int = ...) -> float: ...
+
+    def reset(self) -> None: ...
 
 class LineBuffer:
 
-    __slots__ = ("data",)
+    __slots__ = ("data", "max_line_length", "_start", "_scan", "_end", "_discard")
 
-    _line_sep: Pattern = ...
+    _read_size: int = ...
 
-    data: bytes
+    data: bytearray
+    max_line_length: int
 
-    def __init__(self) -> None: ...
+    def __init__(self, max_line_length: int = ...) -> None: ...
 
-    def feed(self, line: Union[bytes, str]) -> None: ...
+    def _reserve(self, size: int) -> None: ...
 
-    def lines(self) -> iter: ...
+    def feed(self, line: Union[bytes, bytearray, memoryview, str]) -> None: ...
 
-    def __iter__(self) -> iter: ...
+    def get_buffer(self, sizehint: int = ...) -> memoryview: ...
+
+    def buffer_updated(self, size: int) -> None: ...
+
+    def _complete(self) -> int: ...
+
+    def lines(self) -> Iterator[str]: ...
+
+    def _decode_each(self, start: int, last: int) -> List[str]: ...
+
+    def views(self) -> Iterator[memoryview]: ...
+
+    def __iter__(self) -> Iterator[str]: ...
 
     def __len__(self) -> int: ...
 
+    def clear(self) -> None: ...
+
+def inline(func: Callable[[Event], None]) -> Callable[[Event], None]: ...
+
+def is_async(handler: Callable) -> bool: ...
+
 class SortedHandler:
 
-    __slots__ = ("handler", "priority")
+    __slots__ = ("handler", "priority", "sync", "inline")
 
     handler: Callable[[Event], None]
     priority: int
+    sync: bool
+    inline: bool
 
-    def __init__(self, handler: Callable[[Event], None], priority: int = ...) -> None: ...
+    def __init__(self, handler: Callable[[Event], None], priority: int = ..., *, inline: bool = ...) -> None: ...
 
     async def __call__(self, event: Event) -> None: ...
 
@@ -57,6 +173,17 @@ class SortedHandler:
 
     def __gt__(self, other: SortedHandler) -> bool: ...
 
+class PrefixMatcher:
+
+    __slots__ = ("prefixes", "_index")
+
+    prefixes: Tuple[str, ...]
+    _index: Dict[str, Tuple[str, ...]]
+
+    def __init__(self, prefixes: Union[str, Sequence[str]]) -> None: ...
+
+    def match(self, text: str) -> Optional[str]: ...
+
 class IRCPrefix(str):
 
     __slots__ = ("nick", "user", "host")
@@ -67,6 +194,24 @@ class IRCPrefix(str):
 
     def __new__(cls, prefix: Any) -> IRCPrefix: ...
 
-    def __init__(self,prefix: str) -> None: ...
+class PrefixCache:
+
+    __slots__ = ("maxsize", "hits", "misses", "_cache")
+
+    maxsize: int
+    hits: int
+    misses: int
+
+    def __init__(self, maxsize: int = ...) -> None: ...
+
+    def __call__(self, prefix: str) -> IRCPrefix: ...
+
+    def __len__(self) -> int: ...
+
+    def resize(self, maxsize: int) -> None: ...
+
+    def clear(self) -> None: ...
+
+prefix_cache: PrefixCache
 
 def insort(li: List, o: Any, lo: int = ..., hi: int = ...) -> None: ...
@@ -0,0 +1,126 @@
+"""
+    AIRC worker mode stubs
+"""
+
+import asyncio
+import multiprocessing
+
+from typing import AsyncIterator, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type, Union
+from .client import DefaultClient
+from .events import Event
+from .reconnect import ReconnectManager
+from .server import DefaultServer
+from .transports import Transport
+from .utils import LineBuffer, SortedHandler
+
+
+_chantypes: FrozenSet[int] = ...
+_private_commands: Tuple[bytes, ...] = ...
+_broadcast_commands: Tuple[bytes, ...] = ...
+_hub_commands: FrozenSet[bytes] = ...
+
+
+def _route(line: bytes) -> Tuple[bytes, Optional[bytes]]: ...
+
+
+class _Link:
+
+    __slots__ = ("reader", "writer", "pending", "closed")
+
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    pending: List[bytes]
+    closed: bool
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None: ...
+
+    def queue(self, conn: int, line: bytes) -> None: ...
+
+    async def flush(self) -> None: ...
+
+    def frames(self) -> AsyncIterator[Dict[int, List[bytes]]]: ...
+
+    async def close(self) -> None: ...
+
+
+class IPCTransport(Transport):
+
+    __slots__ = ("link", "conn", "loop", "_received", "_closed", "_waiter")
+
+    link: _Link
+    conn: int
+    loop: asyncio.AbstractEventLoop
+    _received: bool
+    _closed: bool
+    _waiter: Optional[asyncio.Future]
+
+    def __init__(self, buffer: LineBuffer, link: _Link, conn: int, loop: asyncio.AbstractEventLoop) -> None: ...
+
+    def feed(self, lines: List[bytes]) -> None: ...
+
+    def _wake(self) -> None: ...
+
+    async def read(self) -> None: ...
+
+    async def send(self, data: Union[str, bytes]) -> None: ...
+
+    async def send_many(self, lines: Iterable[Union[str, bytes]]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+async def _run_worker(factory: Callable[[], DefaultClient], path: str, index: int,
+                      servers: List[Tuple[str, str]]) -> None: ...
+
+def _worker_process(factory: Callable[[], DefaultClient], path: str, index: int,
+                    servers: List[Tuple[str, str]]) -> None: ...
+
+
+class WorkerHub:
+
+    __slots__ = ("factory", "uris", "workers", "server_type", "loop", "context", "startup_timeout", "connections",
+                 "processes", "handlers", "reconnector", "_links", "_path", "_server", "_hello", "_readers")
+
+    factory: Callable[[], DefaultClient]
+    uris: List[str]
+    workers: int
+    server_type: Type[DefaultServer]
+    loop: asyncio.AbstractEventLoop
+    context: multiprocessing.context.BaseContext
+    startup_timeout: float
+    connections: List[DefaultServer]
+    processes: List[multiprocessing.Process]
+    handlers: Dict[str, List[SortedHandler]]
+    reconnector: Optional[ReconnectManager]
+    _links: List[Optional[_Link]]
+    _path: Optional[str]
+    _server: Optional[asyncio.AbstractServer]
+    _hello: Optional[asyncio.Event]
+    _readers: Dict[DefaultServer, asyncio.Task]
+
+    def __init__(self, factory: Callable[[], DefaultClient], uris: Union[str, List[str]], *,
+                 workers: Optional[int] = ..., server_type: Type[DefaultServer] = ...,
+                 loop: asyncio.AbstractEventLoop = ..., context: str = ..., startup_timeout: float = ...,
+                 reconnect: Union[ReconnectManager, bool, None] = ...) -> None: ...
+
+    def run(self, *args, **kwargs) -> None: ...
+
+    async def start(self, *, names: List[str], passwds: Optional[List[str]] = ...) -> None: ...
+
+    async def open(self, *, names: List[str], passwds: Optional[List[str]] = ...) -> None: ...
+
+    def supervise(self, server: DefaultServer) -> asyncio.Task: ...
+
+    def add_global_handler(self, event: str, handler: Callable, priority: int = ...) -> None: ...
+
+    def remove_global_handler(self, event: str, handler: Callable) -> None: ...
+
+    async def _dispatch(self, event: Event) -> None: ...
+
+    async def _observe(self, server: DefaultServer, line: bytes) -> None: ...
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None: ...
+
+    async def _read_connection(self, conn: int, server: DefaultServer) -> None: ...
+
+    async def close(self) -> None: ...
@@ -0,0 +1,46 @@
+"""
+    AIRC write queue stubs
+"""
+
+import asyncio
+
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple, Union
+from .enums import Priority
+from .utils import RateLimiter
+
+
+class WriteQueue:
+
+    __slots__ = ("send_many", "max_batch", "max_delay", "limiter_for", "cost_for", "loop", "batches", "lines",
+                 "_lanes", "_flusher", "_wakeup")
+
+    send_many: Callable[[List[Union[str, bytes]]], Awaitable[None]]
+    max_batch: int
+    max_delay: float
+    limiter_for: Optional[Callable[[Union[str, bytes]], Optional[RateLimiter]]]
+    cost_for: Optional[Callable[[Union[str, bytes]], int]]
+    loop: asyncio.AbstractEventLoop
+    batches: int
+    lines: int
+    _lanes: Tuple[Deque[Tuple[Union[str, bytes], asyncio.Future]], ...]
+    _flusher: Optional[asyncio.Task]
+    _wakeup: Optional[asyncio.Event]
+
+    def __init__(self, send_many: Callable[[List[Union[str, bytes]]], Awaitable[None]], *, max_batch: int = ..., max_delay: float = ..., limiter_for: Optional[Callable[[Union[str, bytes]], Optional[RateLimiter]]] = ..., cost_for: Optional[Callable[[Union[str, bytes]], int]] = ..., loop: asyncio.AbstractEventLoop = ...) -> None: ...
+
+    def __len__(self) -> int: ...
+
+    async def write(self, line: Union[str, bytes], priority: Priority = ...) -> None: ...
+
+    def write_nowait(self, line: Union[str, bytes], priority: Priority = ...) -> asyncio.Future: ...
+
+    def _take(self) -> Tuple[List[Tuple[Union[str, bytes], asyncio.Future]], float]: ...
+
+    def _take_unlimited(self, lane: Deque[Tuple[Union[str, bytes], asyncio.Future]],
+                        batch: List[Tuple[Union[str, bytes], asyncio.Future]]) -> None: ...
+
+    async def _flush(self) -> None: ...
+
+    async def _send(self, batch: List[Tuple[Union[str, bytes], asyncio.Future]]) -> None: ...
+
+    async def close(self) -> None: ...
@@ -0,0 +1,265 @@
+"""
+    Transports for the AIRC. A transport carries IRC lines between a server object and the remote
+    server, reading received data into the server's LineBuffer. The transport used for a connection
+    is picked by the scheme of its URI.
+"""
+
+import abc
+import ssl as _ssl
+import asyncio
+import logging
+import urllib.parse
+import websockets
+
+from .errors import ConnectionLost
+
+
+__all__ = ("Transport", "StreamTransport", "WebSocketTransport", "register_transport", "open_transport")
+
+
+log = logging.getLogger("airc.transports")
+
+
+class Transport(abc.ABC):
+    """
+        A connection to a remote server. Received data is put into buffer, lines are sent without their
+        line endings.
+    """
+
+    __slots__ = ("buffer",)
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    @classmethod
+    @abc.abstractmethod
+    async def open(cls, uri, buffer, *, loop, ssl=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def read(self):
+        """
+            Wait until more data has been put into the buffer. Raises ConnectionLost if the connection
+            closes instead
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def send(self, data):
+        raise NotImplementedError
+
+    async def send_many(self, lines):
+        """
+            Send several lines at once. Transports should override this to send them in a single write
+        """
+        for line in lines:
+            await self.send(line)
+
+    @abc.abstractmethod
+    async def close(self):
+        raise NotImplementedError
+
+
+class _StreamProtocol(asyncio.BufferedProtocol):
+    """
+        Protocol receiving straight into a LineBuffer. Reading is paused while more than high_water bytes
+        are waiting to be processed
+    """
+
+    high_water = 1 << 20
+
+    def __init__(self, buffer, loop):
+        self.buffer = buffer
+        self.loop = loop
+        self.transport = None
+        self.closed = False
+        self.exception = None
+        self.received = False
+        self.paused = False
+        self._read_waiter = None
+        self._drain_waiter = None
+        self._writing_paused = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        return self.buffer.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self.buffer.buffer_updated(nbytes)
+        self.received = True
+        if len(self.buffer) > self.high_water and not self.paused:
+            self.paused = True
+            self.transport.pause_reading()
+        self._wake_reader()
+
+    def eof_received(self):
+        self.closed = True
+        self._wake_reader()
+        return False
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self.exception = exc
+        self._wake_reader()
+        self._wake_writer()
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        self._wake_writer()
+
+    def _wake_reader(self):
+        waiter = self._read_waiter
+        self._read_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _wake_writer(self):
+        waiter = self._drain_waiter
+        self._drain_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def wait_received(self):
+        if self.paused and len(self.buffer) < self.high_water:
+            self.paused = False
+            self.transport.resume_reading()
+        while not self.received:
+            if self.closed:
+                raise ConnectionLost("Connection closed by server") from self.exception
+            self._read_waiter = self.loop.create_future()
+            await self._read_waiter
+        self.received = False
+
+    async def drain(self):
+        if self.closed:
+            raise ConnectionLost("Connection closed by server") from self.exception
+        if self._writing_paused:
+            self._drain_waiter = self.loop.create_future()
+            await self._drain_waiter
+
+
+class StreamTransport(Transport):
+    """
+        Plain TCP or TLS connection to a classic IRC server, for irc:// and ircs:// URIs. Received data
+        is read directly into the buffer, with no intermediate copies.
+    """
+
+    __slots__ = ("transport", "protocol")
+
+    default_ports = {"irc": 6667, "ircs": 6697}
+
+    def __init__(self, buffer, transport, protocol):
+        super().__init__(buffer)
+        self.transport = transport
+        self.protocol = protocol
+
+    @classmethod
+    async def open(cls, uri, buffer, *, loop, ssl=None):
+        parts = urllib.parse.urlsplit(uri)
+        if ssl is None and parts.scheme == "ircs":
+            ssl = _ssl.create_default_context()
+        port = parts.port or cls.default_ports.get(parts.scheme, 6667)
+        transport, protocol = await loop.create_connection(
+            lambda: _StreamProtocol(buffer, loop), parts.hostname, port, ssl=ssl
+        )
+        return cls(buffer, transport, protocol)
+
+    async def read(self):
+        await self.protocol.wait_received()
+
+    async def send(self, data):
+        if isinstance(data, str):
+            data = bytes(data, 'utf-8')
+        self.transport.write(data + b"\r\n")
+        await self.protocol.drain()
+
+    async def send_many(self, lines):
+        data = bytearray()
+        for line in lines:
+            data += bytes(line, 'utf-8') if isinstance(line, str) else line
+            data += b"\r\n"
+        self.transport.write(data)
+        await self.protocol.drain()
+
+    async def close(self):
+        self.transport.close()
+
+
+class WebSocketTransport(Transport):
+    """
+        IRC over websockets, for ws:// and wss:// URIs, as used by Twitch. Each frame holds one or more
+        lines.
+    """
+
+    __slots__ = ("socket",)
+
+    def __init__(self, buffer, socket):
+        super().__init__(buffer)
+        self.socket = socket
+
+    @classmethod
+    async def open(cls, uri, buffer, *, loop, ssl=None):
+        if ssl is None:
+            socket = await websockets.connect(uri)
+        else:
+            socket = await websockets.connect(uri, ssl=ssl)
+        return cls(buffer, socket)
+
+    async def read(self):
+        try:
+            data = await self.socket.recv()
+        except websockets.ConnectionClosed as e:
+            raise ConnectionLost("Connection closed by server") from e
+        if isinstance(data, str):
+            data = bytes(data, 'utf-8')
+        self.buffer.feed(data)
+        if data[-1:] != b"\n":
+            self.buffer.feed(b"\n")
+
+    async def send(self, data):
+        # Always send text frames, which is what IRC servers on websockets expect
+        if isinstance(data, bytes):
+            data = str(data, 'utf-8')
+        await self.socket.send(data)
+
+    async def send_many(self, lines):
+        lines = (str(line, 'utf-8') if isinstance(line, bytes) else line for line in lines)
+        await self.socket.send("\r\n".join(lines))
+
+    async def close(self):
+        await self.socket.close()
+
+
+_transports = {
+    "irc": StreamTransport,
+    "ircs": StreamTransport,
+    "ws": WebSocketTransport,
+    "wss": WebSocketTransport
+}
+
+
+def register_transport(scheme, cls):
+    """
+        Use a Transport subclass for all URIs with the given scheme
+    """
+    if not (isinstance(cls, type) and issubclass(cls, Transport)):
+        raise TypeError("Transport must subclass Transport")
+    _transports[scheme.lower()] = cls
+
+
+async def open_transport(uri, buffer, *, loop=None, ssl=None):
+    """
+        Open a connection to uri with the transport registered for its scheme
+    """
+    loop = loop or asyncio.get_event_loop()
+    scheme = urllib.parse.urlsplit(uri).scheme.lower()
+    try:
+        cls = _transports[scheme]
+    except KeyError:
+        raise ValueError(f"No transport for URI scheme '{scheme}'")
+    return await cls.open(uri, buffer, loop=loop, ssl=ssl)
@@ -4,12 +4,17 @@
 
 import re
 import time
+import bisect
+import asyncio
 import logging
+import collections
 
+from .enums import BucketType
 from .errors import *
 
 
-__all__ = ("Cooldown", "LineBuffer", "SortedHandler", "IRCPrefix", "insort")
+__all__ = ("Cooldown", "CooldownMapping", "ConcurrencyLimit", "LatencyHistogram", "RateLimiter", "LineBuffer",
+           "SortedHandler", "IRCPrefix", "PrefixCache", "PrefixMatcher", "insort", "inline")
 
 
 log = logging.getLogger("airc.utils")
@@ -33,7 +38,7 @@ class Cooldown:
         self.time = time
 
     def can_run(self):
-        now = time.time()
+        now = time.monotonic()
         if self.start is None:
             self.start = now
             self.count = 1
@@ -46,51 +51,513 @@ class Cooldown:
             self.count += 1
             return 0
         else:
-            remaining = (self.time + self.start) - self.start
+            remaining = (self.start + self.time) - now
             log.info(f"Overran cooldown, {remaining} seconds till it's over.")
             return remaining
 
 
-class LineBuffer:
+def _member_key(ctx):
+    return ctx.channel.name, ctx.author.name
+
+
+_bucket_keys = {
+    BucketType.GLOBAL: lambda ctx: None,
+    BucketType.USER: lambda ctx: ctx.author.name,
+    BucketType.CHANNEL: lambda ctx: ctx.channel.name,
+    BucketType.MEMBER: _member_key
+}
+
+
+class CooldownMapping:
+    """
+        Separate cooldowns of per uses every time seconds, one for each key. bucket is a BucketType, or
+        a function taking a Context and returning its key. Buckets are made when a key is first used,
+        and kept in order of when their window started, so ones whose window has passed are dropped
+        from the front as time goes on. At most max_buckets are kept if it's set, dropping the oldest
+        first, otherwise only keys used in the last time seconds are kept.
+    """
+
+    __slots__ = ("per", "time", "bucket", "max_buckets", "_key", "_buckets", "_next_expiry")
+
+    def __init__(self, per, time, bucket=BucketType.USER, *, max_buckets=None):
+        self.per = per
+        self.time = time
+        self.bucket = bucket
+        self.max_buckets = max_buckets
+        self._key = _bucket_keys[bucket] if isinstance(bucket, BucketType) else bucket
+        # Key to [window start, uses], oldest window first
+        self._buckets = collections.OrderedDict()
+        self._next_expiry = float("inf")
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def get_key(self, ctx):
+        return self._key(ctx)
+
+    def can_run(self, ctx):
+        """
+            Use the cooldown of ctx's bucket. Returns 0 if it could be used, otherwise the seconds until
+            it can be
+        """
+        return self.hit(self._key(ctx))
+
+    def hit(self, key, now=None):
+        """
+            Use the cooldown of a key. Returns 0 if it could be used, otherwise the seconds until it can
+            be. now defaults to the monotonic time
+        """
+        if now is None:
+            now = time.monotonic()
+        if now > self._next_expiry:
+            self.expire(now)
+        buckets = self._buckets
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [now, 1]
+            if self.max_buckets is not None and len(buckets) > self.max_buckets:
+                buckets.popitem(last=False)
+            if self._next_expiry == float("inf"):
+                self._next_expiry = now + self.time
+            return 0
+        if now > bucket[0] + self.time:
+            bucket[0] = now
+            bucket[1] = 1
+            buckets.move_to_end(key)
+            return 0
+        if bucket[1] < self.per:
+            bucket[1] += 1
+            return 0
+        return bucket[0] + self.time - now
+
+    def expire(self, now=None):
+        """
+            Drop every bucket whose window has passed
+        """
+        if now is None:
+            now = time.monotonic()
+        buckets = self._buckets
+        start = now - self.time
+        while buckets:
+            key = next(iter(buckets))
+            bucket = buckets[key]
+            if bucket[0] >= start:
+                self._next_expiry = bucket[0] + self.time
+                return
+            del buckets[key]
+        self._next_expiry = float("inf")
+
+    def reset(self, key=None):
+        """
+            Forget the uses of one key, or of every key
+        """
+        if key is None:
+            self._buckets.clear()
+            self._next_expiry = float("inf")
+        else:
+            self._buckets.pop(key, None)
+
 
-    __slots__ = ("data",)
+class ConcurrencyLimit:
+    """
+        Lets at most number copies of a command run at once, for each key. per is a BucketType, or a
+        function taking a Context and returning its key. When a key is full, acquire waits its turn if
+        wait is set, otherwise it raises MaxConcurrencyReached. Keys are only kept while something is
+        running or waiting for them
+    """
 
-    _line_sep = re.compile(b"\r?\n")
+    __slots__ = ("number", "per", "wait", "_key", "_active", "_waiters")
+
+    def __init__(self, number, per=BucketType.GLOBAL, *, wait=False):
+        if number < 1:
+            raise ValueError("Concurrency limit must be at least 1")
+        self.number = number
+        self.per = per
+        self.wait = wait
+        self._key = _bucket_keys[per] if isinstance(per, BucketType) else per
+        self._active = {}
+        self._waiters = {}
+
+    def __len__(self):
+        return len(self._active)
+
+    def running(self, key):
+        return self._active.get(key, 0)
+
+    def waiting(self, key):
+        waiters = self._waiters.get(key)
+        return len(waiters) if waiters else 0
+
+    async def acquire(self, ctx):
+        """
+            Take a slot for ctx's key, and return the key to release it with
+        """
+        key = self._key(ctx)
+        active = self._active.get(key, 0)
+        if active < self.number:
+            self._active[key] = active + 1
+            return key
+        if not self.wait:
+            raise MaxConcurrencyReached(f"Already running {active} at once, the most allowed")
+
+        waiters = self._waiters.get(key)
+        if waiters is None:
+            waiters = self._waiters[key] = collections.deque()
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        try:
+            # A releasing invocation hands its slot straight over, so the count doesn't change
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over before the cancel landed, pass it on instead of leaking it
+                self.release(key)
+            else:
+                try:
+                    waiters.remove(future)
+                except ValueError:
+                    # Already popped by a release that skipped it
+                    pass
+                else:
+                    if not waiters and self._waiters.get(key) is waiters:
+                        del self._waiters[key]
+            raise
+        return key
+
+    def release(self, key):
+        """
+            Give up a slot taken by acquire, to the longest waiting invocation if there is one
+        """
+        waiters = self._waiters.get(key)
+        while waiters:
+            future = waiters.popleft()
+            if not waiters:
+                del self._waiters[key]
+            if not future.done():
+                future.set_result(None)
+                return
+        active = self._active[key] - 1
+        if active:
+            self._active[key] = active
+        else:
+            del self._active[key]
+
+
+# Latency bucket bounds in seconds, doubling from 10 us to about a minute and a half
+_latency_bounds = tuple(0.00001 * 2 ** i for i in range(24))
+
+
+class LatencyHistogram:
+    """
+        Counts of durations in buckets with doubling bounds, cheap enough to always record. Percentiles
+        are the upper bound of the bucket they fall in, so they're within a factor of two
+    """
+
+    __slots__ = ("bounds", "counts", "count", "total", "max")
+
+    def __init__(self, bounds=_latency_bounds):
+        self.bounds = bounds
+        # The last bucket counts everything over the highest bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """
+            Get the duration percent of the recorded durations are at most
+        """
+        if not self.count:
+            return 0.0
+        target = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def as_dict(self):
+        buckets = {f"<={bound * 1000:.3g}ms": count for bound, count in zip(self.bounds, self.counts) if count}
+        if self.counts[-1]:
+            buckets[f">{self.bounds[-1] * 1000:.3g}ms"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": buckets
+        }
+
+
+class RateLimiter:
+    """
+        Sliding window rate limiter, allowing at most rate uses in any per seconds. The times of the
+        last rate uses are kept, and another use has to wait until the oldest of them is per seconds old.
+    """
+
+    __slots__ = ("rate", "per", "_uses")
+
+    def __init__(self, rate, per):
+        if rate <= 0 or per <= 0:
+            raise ValueError("RateLimiter rate and period must be positive")
+        self.rate = rate
+        self.per = per
+        # Times of the last rate uses, oldest first
+        self._uses = collections.deque(maxlen=rate)
+
+    def delay(self, now=None, cost=1):
+        """
+            Get how many seconds until the limiter can be used cost times at once, 0 if it can be now.
+            A cost over rate waits for a whole window. now defaults to the monotonic time
+        """
+        uses = self._uses
+        # How many of the kept uses have to leave the window to make room
+        over = len(uses) + min(cost, self.rate) - self.rate
+        if over <= 0:
+            return 0
+        if now is None:
+            now = time.monotonic()
+        wait = uses[over - 1] + self.per - now
+        return wait if wait > 0 else 0
+
+    def acquire(self, now=None, cost=1):
+        """
+            Use the limiter cost times if it can be used now. Returns 0 if it was used, otherwise the
+            number of seconds until it can be
+        """
+        if now is None:
+            now = time.monotonic()
+        wait = self.delay(now, cost)
+        if wait:
+            return wait
+        # The deque is bounded, so uses that have left the window fall off the front
+        if cost == 1:
+            self._uses.append(now)
+        else:
+            self._uses.extend([now] * min(cost, self.rate))
+        return 0
 
-    def __init__(self):
-        self.data = b''
+    def reset(self):
+        self._uses.clear()
+
+
+class LineBuffer:
+    """
+        Buffer of received bytes, split into lines as they complete. Data is kept in one bytearray that
+        is only compacted when it runs out of room, and only newly received bytes are searched for line
+        endings. Complete lines longer than max_line_length bytes, or that aren't valid UTF-8, are
+        dropped. An unterminated one that's too long raises LineTooLong and is discarded up to its next
+        line ending.
+    """
+
+    __slots__ = ("data", "max_line_length", "_start", "_scan", "_end", "_discard")
+
+    _read_size = 65536
+
+    def __init__(self, max_line_length=8704):
+        self.data = bytearray()
+        self.max_line_length = max_line_length
+        self._start = 0  # Start of the first unread line
+        self._scan = 0  # Everything before this has been searched for line endings
+        self._end = 0  # End of the received data, past this is free space
+        self._discard = False
+
+    def _reserve(self, size):
+        if self._start == self._end:
+            self._start = self._scan = self._end = 0
+        free = len(self.data) - self._end
+        if free >= size:
+            return
+        if self._start:
+            del self.data[:self._start]
+            self._scan -= self._start
+            self._end -= self._start
+            self._start = 0
+            free = len(self.data) - self._end
+            if free >= size:
+                return
+        self.data.extend(bytes(max(size - free, len(self.data))))
 
     def feed(self, line):
         if isinstance(line, str):
             line = bytes(line, 'utf-8')
-        self.data += line
+        size = len(line)
+        self._reserve(size)
+        self.data[self._end:self._end + size] = line
+        self._end += size
+
+    def get_buffer(self, sizehint=-1):
+        """
+            Get a writable view of the free space at the end of the buffer, so data can be received
+            directly into it. Call buffer_updated with the number of bytes written, and release the
+            view before the buffer is fed again.
+        """
+        self._reserve(max(sizehint, self._read_size))
+        return memoryview(self.data)[self._end:]
+
+    def buffer_updated(self, size):
+        self._end += size
+
+    def _complete(self):
+        """
+            Find the end of the last complete line, skipping any line being discarded.
+            Returns -1 if there isn't a complete line.
+        """
+        data = self.data
+        if self._discard:
+            index = data.find(b"\n", self._scan, self._end)
+            if index == -1:
+                self._start = self._scan = self._end
+                return -1
+            self._start = self._scan = index + 1
+            self._discard = False
+
+        last = data.rfind(b"\n", self._scan, self._end)
+        if last == -1:
+            self._scan = self._end
+            if self._end - self._start > self.max_line_length:
+                self._start = self._scan = self._end
+                self._discard = True
+                raise LineTooLong(f"Line exceeded {self.max_line_length} bytes")
+        return last
 
     def lines(self):
-        lines = self._line_sep.split(self.data)
-        self.data = lines.pop()
-        for line in lines:
+        """
+            Yield each complete line as a str, without its line ending
+        """
+        max_length = self.max_line_length
+        # A character is at most 4 bytes, so only lines longer than this need encoding to measure
+        short = max_length // 4
+        while True:
+            last = self._complete()
+            if last == -1:
+                return
+            start = self._start
+            self._start = self._scan = last + 1
             try:
-                yield line.decode('utf-8', 'strict')
+                with memoryview(self.data) as view:
+                    text = str(view[start:last], 'utf-8', 'strict')
             except UnicodeDecodeError:
-                raise AIRCError("Unknown websocket data encoding")
+                # Decode the lines one at a time, so only the bad ones are lost
+                yield from self._decode_each(start, last)
+                continue
+            for line in text.split("\n"):
+                if line[-1:] == "\r":
+                    line = line[:-1]
+                if len(line) > short and len(bytes(line, 'utf-8')) > max_length:
+                    log.warning(f"Dropped line longer than {max_length} bytes")
+                    continue
+                yield line
+
+    def _decode_each(self, start, last):
+        lines = []
+        data = self.data
+        with memoryview(data) as view:
+            while start <= last:
+                end = data.find(b"\n", start, last + 1)
+                stop = end - 1 if end > start and data[end - 1] == 13 else end
+                if stop - start > self.max_line_length:
+                    log.warning(f"Dropped line longer than {self.max_line_length} bytes")
+                else:
+                    try:
+                        lines.append(str(view[start:stop], 'utf-8', 'strict'))
+                    except UnicodeDecodeError as e:
+                        log.warning(f"Dropped line that isn't valid UTF-8: {e}")
+                start = end + 1
+        return lines
+
+    def views(self):
+        """
+            Yield each complete line as a memoryview into the buffer, without its line ending. Views must
+            be released before the buffer is fed again.
+        """
+        while True:
+            last = self._complete()
+            if last == -1:
+                return
+            data = self.data
+            start = self._start
+            while start <= last:
+                end = data.find(b"\n", start, last + 1)
+                self._start = self._scan = end + 1
+                stop = end - 1 if end > start and data[end - 1] == 13 else end
+                if stop - start > self.max_line_length:
+                    log.warning(f"Dropped line longer than {self.max_line_length} bytes")
+                else:
+                    yield memoryview(data)[start:stop]
+                start = end + 1
 
     def __iter__(self):
         return self.lines()
 
     def __len__(self):
-        return len(self.data)
+        return self._end - self._start
+
+    def clear(self):
+        """
+            Drop everything received, such as the partial line left by a lost connection
+        """
+        self._start = self._scan = self._end = 0
+        self._discard = False
+
+
+def inline(func):
+    """
+        Mark a synchronous handler as cheap enough to run on the event loop. Other synchronous handlers
+        are run in the supervisor's thread pool
+    """
+    func.__airc_inline__ = True
+    return func
+
+
+def is_async(handler):
+    """
+        Check whether a handler is a coroutine function, or an object with one as its __call__
+    """
+    return asyncio.iscoroutinefunction(handler) or asyncio.iscoroutinefunction(getattr(handler, "__call__", None))
 
 
 class SortedHandler:
+    """
+        A handler with a priority. Handlers can be coroutine functions or plain functions, plain ones
+        run in a thread unless they're inline
+    """
 
-    __slots__ = ("handler", "priority")
+    __slots__ = ("handler", "priority", "sync", "inline")
 
-    def __init__(self, handler, priority):
+    def __init__(self, handler, priority=0, *, inline=None):
         self.handler = handler
         self.priority = priority
+        self.sync = not is_async(handler)
+        if inline is None:
+            inline = getattr(handler, "__airc_inline__", False)
+        self.inline = inline
 
     async def __call__(self, event):
-        await self.handler(event)
+        if self.sync:
+            self.handler(event)
+        else:
+            await self.handler(event)
 
     def __lt__(self, other):
         return self.priority < other.priority
@@ -99,28 +566,132 @@ class SortedHandler:
         return self.priority > other.priority
 
 
+class PrefixMatcher:
+    """
+        Finds which of a bot's command prefixes a message starts with. Prefixes are indexed by their
+        first character, so most messages that aren't commands are rejected with one dict lookup, and
+        no more than the prefixes sharing a first character are compared. When several prefixes match,
+        the one listed first wins
+    """
+
+    __slots__ = ("prefixes", "_index")
+
+    def __init__(self, prefixes):
+        if isinstance(prefixes, str):
+            prefixes = (prefixes,)
+        self.prefixes = tuple(prefix for prefix in prefixes if prefix)
+        if not self.prefixes:
+            raise ValueError("Invalid Prefix, may be empty string, list, or None.")
+        index = {}
+        # Kept in the order given, so matching tries them in the same order as checking the whole list
+        for prefix in dict.fromkeys(self.prefixes):
+            index.setdefault(prefix[0], []).append(prefix)
+        self._index = {char: tuple(prefixes) for char, prefixes in index.items()}
+
+    def __repr__(self):
+        return f"PrefixMatcher({list(self.prefixes)!r})"
+
+    def match(self, text):
+        """
+            Get the prefix text starts with, or None if it doesn't start with any
+        """
+        if not text:
+            return None
+        candidates = self._index.get(text[0])
+        if candidates is None:
+            return None
+        for prefix in candidates:
+            if text.startswith(prefix):
+                return prefix
+        return None
+
+
 _irc_prefix_pattern = r"^(?:(?P<nick>\w+)!)?(?:(?P<user>\w+)@)?(?P<host>.+)"
 _irc_prefix = re.compile(_irc_prefix_pattern)
 
 
 class IRCPrefix(str):
+    """
+        A message prefix, split into its nick, user and host. Immutable, so one instance can be
+        shared by every event with the same prefix
+    """
 
     __slots__ = ("nick", "user", "host")
 
     def __new__(cls, prefix):
         if not isinstance(prefix, str):
             prefix = ""
-        return super(IRCPrefix, cls).__new__(cls, prefix)
-
-    def __init__(self, prefix):
-        if not isinstance(prefix, str):
-            prefix = ""
-        super().__init__()
+        self = super(IRCPrefix, cls).__new__(cls, prefix)
+        nick = user = host = None
         if prefix != "":
-            match = _irc_prefix.match(prefix)
-            self.nick = match.group("nick")
-            self.user = match.group("user")
-            self.host = match.group("host")
+            nick, user, host = _irc_prefix.match(prefix).group("nick", "user", "host")
+        _setattr(self, "nick", nick)
+        _setattr(self, "user", user)
+        _setattr(self, "host", host)
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("IRCPrefix is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("IRCPrefix is immutable")
+
+    def __reduce__(self):
+        return IRCPrefix, (str(self),)
+
+
+_setattr = object.__setattr__
+
+
+class PrefixCache:
+    """
+        Bounded LRU cache of parsed IRCPrefixes, keyed by the raw prefix. Keeps count of hits and misses,
+        so the size can be tuned. A maxsize of 0 disables caching
+    """
+
+    __slots__ = ("maxsize", "hits", "misses", "_cache")
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = collections.OrderedDict()
+
+    def __call__(self, prefix):
+        cache = self._cache
+        try:
+            result = cache[prefix]
+        except KeyError:
+            pass
+        else:
+            cache.move_to_end(prefix)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = IRCPrefix(prefix)
+        if self.maxsize > 0:
+            cache[prefix] = result
+            if len(cache) > self.maxsize:
+                cache.popitem(last=False)
+        return result
+
+    def __len__(self):
+        return len(self._cache)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self._cache) > max(maxsize, 0):
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Cache shared by all servers that aren't given their own
+prefix_cache = PrefixCache()
 
 
 def insort(li, o, lo=0, hi=None):
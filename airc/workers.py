@@ -0,0 +1,451 @@
+"""
+    Multi-process worker mode for the AIRC. One hub process owns the connections, and forwards every
+    received line over a local unix socket to one of several worker processes, each running its own
+    copy of the client and its handlers. Commands sent by a worker go back through the hub, to the
+    connection they belong to.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+
+from .errors import ConnectionLost, LineTooLong
+from .events import LazyEvent
+from .parser import scan_line
+from .reconnect import ReconnectManager
+from .server import DefaultServer, _handle_command, _session_commands
+from .transports import Transport
+from .utils import SortedHandler, insort
+
+
+__all__ = ("WorkerHub", "IPCTransport")
+
+
+log = logging.getLogger("airc.workers")
+
+
+# First characters of a channel name, as a set of byte values
+_chantypes = frozenset(b"#&!+")
+_private_commands = (b"PRIVMSG", b"NOTICE", b"WHISPER")
+_broadcast_commands = (b"005",)
+# Lines the hub parses itself as well as forwarding. They keep the connection's session state, or are
+# waited on while reconnecting
+_hub_commands = frozenset((b"001", b"005", b"CAP", b"JOIN", b"PART", b"KICK", b"RECONNECT"))
+
+
+def _route(line):
+    """
+        Find a raw line's command, and what the line should be routed by, without decoding it. The key
+        is the channel for lines about a channel, the sender for private messages, and None for
+        anything else. Numerics start with the client's own nick, so they're routed by the first
+        channel among their middle parameters, such as the one after the symbol in RPL_NAMREPLY
+    """
+    start = 0
+    prefix = b""
+    if line[:1] == b"@":
+        start = line.find(b" ") + 1
+    if line[start:start + 1] == b":":
+        end = line.find(b" ", start)
+        prefix = line[start + 1:end]
+        start = end + 1
+    parts = line[start:].split(b" ", 2)
+    command = parts[0]
+    target = parts[1] if len(parts) > 1 else b""
+    if target[:1] == b":":
+        target = target[1:]
+
+    if command in _broadcast_commands:
+        return command, command
+    if target and target[0] in _chantypes:
+        return command, target.lower()
+    if command.isdigit() and len(parts) > 2:
+        for param in parts[2].split(b" "):
+            if param[:1] == b":":
+                break
+            if param and param[0] in _chantypes:
+                return command, param.lower()
+        return command, None
+    if command in _private_commands and prefix:
+        return command, prefix.partition(b"!")[0].lower()
+    return command, None
+
+
+class _Link:
+    """
+        One end of the unix socket between the hub and a worker. Frames are single lines, prefixed by
+        the index of the connection they belong to
+    """
+
+    __slots__ = ("reader", "writer", "pending", "closed")
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.pending = []
+        self.closed = False
+
+    def queue(self, conn, line):
+        self.pending.append(b"%d %s\n" % (conn, line))
+
+    async def flush(self):
+        if not self.pending:
+            return
+        data = b"".join(self.pending)
+        self.pending.clear()
+        if self.closed:
+            return
+        try:
+            self.writer.write(data)
+            await self.writer.drain()
+        except ConnectionError as e:
+            self.closed = True
+            log.error(f"Lost the link to a worker: {e!r}")
+
+    async def frames(self):
+        """
+            Yield each batch of received frames, as a dict of connection index to lines
+        """
+        remainder = b""
+        while True:
+            data = await self.reader.read(65536)
+            if not data:
+                return
+            data = remainder + data
+            end = data.rfind(b"\n") + 1
+            remainder = data[end:]
+            batch = {}
+            for frame in data[:end].split(b"\n")[:-1]:
+                conn, _, line = frame.partition(b" ")
+                batch.setdefault(int(conn), []).append(line)
+            if batch:
+                yield batch
+
+    async def close(self):
+        self.closed = True
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class IPCTransport(Transport):
+    """
+        Transport of a server in a worker process. Received lines are fed to it by the worker's link
+        to the hub, and sent lines are forwarded through the hub to the real connection
+    """
+
+    __slots__ = ("link", "conn", "loop", "_received", "_closed", "_waiter")
+
+    def __init__(self, buffer, link, conn, loop):
+        super().__init__(buffer)
+        self.link = link
+        self.conn = conn
+        self.loop = loop
+        self._received = False
+        self._closed = False
+        self._waiter = None
+
+    @classmethod
+    async def open(cls, uri, buffer, *, loop, ssl=None):
+        raise TypeError("IPC transports are created by worker processes, not opened from a URI")
+
+    def feed(self, lines):
+        self.buffer.feed(b"\n".join(lines) + b"\n")
+        self._received = True
+        self._wake()
+
+    def _wake(self):
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def read(self):
+        while not self._received:
+            if self._closed:
+                raise ConnectionLost("Link to the hub closed")
+            self._waiter = self.loop.create_future()
+            await self._waiter
+        self._received = False
+
+    async def send(self, data):
+        await self.send_many((data,))
+
+    async def send_many(self, lines):
+        if self._closed:
+            raise ConnectionLost("Link to the hub closed")
+        for line in lines:
+            self.link.queue(self.conn, bytes(line, 'utf-8') if isinstance(line, str) else line)
+        await self.link.flush()
+
+    async def close(self):
+        self._closed = True
+        self._wake()
+
+
+async def _run_worker(factory, path, index, servers):
+    loop = asyncio.get_running_loop()
+    client = factory()
+    client.connections.clear()
+
+    reader, writer = await asyncio.open_unix_connection(path, limit=2**20)
+    writer.write(b"%d\n" % index)
+    link = _Link(reader, writer)
+
+    transports = []
+    for conn, (uri, username) in enumerate(servers):
+        server = client.server(uri)
+        server.socket = IPCTransport(server.buffer, link, conn, loop)
+        server.username = username
+        server.connected = True
+        transports.append(server.socket)
+
+    async def receive():
+        try:
+            async for batch in link.frames():
+                for conn, lines in batch.items():
+                    transports[conn].feed(lines)
+        finally:
+            # The hub is shutting down, stop the read loops the same way a disconnect does
+            for server in client.connections:
+                await server.disconnect()
+
+    receiver = loop.create_task(receive())
+    try:
+        await client.start()
+    finally:
+        receiver.cancel()
+        await link.close()
+
+
+def _worker_process(factory, path, index, servers):
+    asyncio.run(_run_worker(factory, path, index, servers))
+
+
+class WorkerHub:
+    """
+        Runs a client's handlers in several processes. The hub connects to every uri, and forwards the
+        lines it receives to workers, each running the client returned by factory. Lines about one
+        channel always go to the same worker, as do private messages from one user, so each worker
+        sees the events of its channels in order. ISUPPORT replies go to every worker, and all other
+        lines, such as the welcome and PING, go to the first worker.
+
+        The hub keeps each connection's ISUPPORT tokens, capabilities and channels like a client does.
+        With reconnect, a ReconnectManager or True for one with the default settings, dropped
+        connections are connected again and their capabilities and channels restored.
+
+        factory is called with no arguments in each worker, and must be picklable, such as a client
+        class defined at the top level of a module. The on_ handlers and commands of the client work
+        as usual, and anything they send goes out through the hub's connection, with its rate limits.
+    """
+
+    __slots__ = ("factory", "uris", "workers", "server_type", "loop", "context", "startup_timeout", "connections",
+                 "processes", "handlers", "reconnector", "_links", "_path", "_server", "_hello", "_readers")
+
+    def __init__(self, factory, uris, *, workers=None, server_type=DefaultServer, loop=None, context="spawn",
+                 startup_timeout=60, reconnect=None):
+        if not isinstance(uris, (list, tuple)):
+            uris = (uris,)
+        self.factory = factory
+        self.uris = list(uris)
+        self.workers = workers or os.cpu_count() or 1
+        self.server_type = server_type
+        self.loop = loop or asyncio.get_event_loop()
+        self.context = multiprocessing.get_context(context)
+        self.startup_timeout = startup_timeout
+
+        self.connections = [server_type(uri, loop=self.loop) for uri in self.uris]
+        self.processes = []
+        self.handlers = {}
+        self._links = [None] * self.workers
+        self._path = None
+        self._server = None
+        self._hello = None
+        self._readers = {}
+
+        if reconnect is True:
+            reconnect = ReconnectManager()
+        self.reconnector = reconnect or None
+        if self.reconnector is not None:
+            self.reconnector.attach(self)
+
+    def run(self, *args, **kwargs):
+        task = self.loop.create_task(self.start(*args, **kwargs))
+        if not self.loop.is_running():
+            self.loop.run_until_complete(task)
+
+    async def start(self, *, names, passwds=None):
+        """
+            Start the workers and connect, then forward lines until every connection is closed
+        """
+        await self.open(names=names, passwds=passwds)
+        try:
+            while True:
+                tasks = tuple(self._readers.values())
+                if self.reconnector is not None:
+                    # A connection that's reconnecting has no read loop for a while
+                    tasks += self.reconnector.running()
+                if not tasks:
+                    break
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            await self.close()
+
+    async def open(self, *, names, passwds=None):
+        """
+            Start the worker processes, wait for all of them to connect to the hub, then connect to every
+            server
+        """
+        passwds = passwds or [""] * len(names)
+        self._path = os.path.join(tempfile.mkdtemp(prefix="airc-"), "hub.sock")
+        self._hello = asyncio.Event()
+        self._server = await asyncio.start_unix_server(self._accept, self._path, limit=2**20)
+
+        servers = list(zip(self.uris, names))
+        for index in range(self.workers):
+            process = self.context.Process(
+                target=_worker_process, args=(self.factory, self._path, index, servers), daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        try:
+            await asyncio.wait_for(self._hello.wait(), self.startup_timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise asyncio.TimeoutError(f"Workers didn't start within {self.startup_timeout} seconds")
+
+        await asyncio.gather(*(server.connect(name, password=passwd)
+                               for server, name, passwd in zip(self.connections, names, passwds)))
+        for server in self.connections:
+            self.supervise(server)
+
+    def supervise(self, server):
+        """
+            Start forwarding the lines of a connected server, if it isn't already being read
+        """
+        task = self._readers.get(server)
+        if task is None or task.done():
+            conn = self.connections.index(server)
+            task = self._readers[server] = self.loop.create_task(self._read_connection(conn, server))
+        return task
+
+    def add_global_handler(self, event, handler, priority=0):
+        """
+            Add a handler run in the hub itself. Only the events of lines the hub parses reach it
+        """
+        handler = SortedHandler(handler, priority)
+        insort(self.handlers.setdefault(event, []), handler)
+
+    def remove_global_handler(self, event, handler):
+        handlers = self.handlers.get(event, [])
+        for h in handlers:
+            if h.handler == handler:
+                handlers.remove(h)
+                break
+
+    async def _dispatch(self, event):
+        for handler in self.handlers.get(event.command, ()):
+            try:
+                await handler(event)
+            except Exception:
+                log.exception(f"Unhandled error in the hub while handling {event.command}")
+
+    async def _observe(self, server, line):
+        try:
+            line = line.decode("utf-8")
+            spans = scan_line(line)
+        except ValueError as e:
+            log.warning(e)
+            return
+        type, command = _handle_command(line[spans[3]:spans[4]])
+        event = LazyEvent(server, type, command, line, spans)
+        if command in _session_commands:
+            server._track(command, event)
+        await self._dispatch(event)
+
+    async def _accept(self, reader, writer):
+        index = int(await reader.readline())
+        link = self._links[index] = _Link(reader, writer)
+        if all(self._links):
+            self._hello.set()
+        try:
+            async for batch in link.frames():
+                sent = []
+                for conn, lines in batch.items():
+                    server = self.connections[conn]
+                    for line in lines:
+                        sent.append(server.writer.write_nowait(line, server._priority(line)))
+                # Wait for the batch to go out before reading more, so a busy worker can't outrun the
+                # connection
+                for result in await asyncio.gather(*sent, return_exceptions=True):
+                    if isinstance(result, Exception):
+                        log.error(f"Couldn't send line from worker {index}: {result!r}")
+        except ConnectionError:
+            pass
+
+    async def _read_connection(self, conn, server):
+        links = self._links
+        workers = self.workers
+        try:
+            while server.connected:
+                socket = server.socket
+                try:
+                    await socket.read()
+                except ConnectionLost:
+                    if socket is server.socket:
+                        await server.disconnect()
+                        raise
+                    return
+                try:
+                    for view in server.buffer.views():
+                        with view:
+                            line = bytes(view)
+                        if not line:
+                            continue
+                        command, key = _route(line)
+                        if command in _hub_commands:
+                            await self._observe(server, line)
+                        if key is None:
+                            links[0].queue(conn, line)
+                        elif key in _broadcast_commands:
+                            for link in links:
+                                link.queue(conn, line)
+                        else:
+                            links[hash(key) % workers].queue(conn, line)
+                except LineTooLong as e:
+                    log.warning(e)
+                await asyncio.gather(*(link.flush() for link in links))
+        except Exception as e:
+            log.error(f"Connection to {server._uri} failed: {e!r}")
+            if self.reconnector is not None:
+                self.reconnector.dropped(server, e)
+        finally:
+            if self._readers.get(server) is asyncio.current_task():
+                del self._readers[server]
+
+    async def close(self):
+        """
+            Disconnect every server, then stop the workers
+        """
+        if self.reconnector is not None:
+            self.reconnector.cancel()
+        for server in self.connections:
+            if server.connected:
+                await server.disconnect()
+        for link in self._links:
+            if link is not None:
+                await link.close()
+        if self._server is not None:
+            self._server.close()
+        for process in self.processes:
+            await self.loop.run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+                os.rmdir(os.path.dirname(self._path))
+            except OSError:
+                pass
@@ -0,0 +1,153 @@
+"""
+    Outgoing line queue for the AIRC. Lines sent close together are coalesced into a single
+    transport write, higher priority lines are sent first, and rate limits are respected.
+"""
+
+import asyncio
+import logging
+import collections
+
+from .enums import Priority
+
+
+__all__ = ("WriteQueue",)
+
+
+log = logging.getLogger("airc.writer")
+
+
+class WriteQueue:
+    """
+        Queue of lines waiting to be sent. Everything queued before the queue flushes is passed to
+        send_many together, up to max_batch lines per call. With a max_delay the queue waits up to that
+        many seconds for a batch to fill before flushing it. Writing a line waits until it's been sent.
+
+        Each Priority has its own lane, and lanes are emptied in priority order. If limiter_for is given,
+        it's called with each line and may return a RateLimiter the line has to wait for. The queue sleeps
+        exactly until the first waiting line may go, waking early if a new line is written. High priority
+        lines that need no limiter, like PONG, are still sent while the line ahead of them waits. If
+        cost_for is given, it's called with each limited line and returns how many uses of the limiter
+        the line takes, otherwise every line takes one.
+    """
+
+    __slots__ = ("send_many", "max_batch", "max_delay", "limiter_for", "cost_for", "loop", "batches", "lines",
+                 "_lanes", "_flusher", "_wakeup")
+
+    def __init__(self, send_many, *, max_batch=64, max_delay=0, limiter_for=None, cost_for=None, loop=None):
+        self.send_many = send_many
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.limiter_for = limiter_for
+        self.cost_for = cost_for
+        self.loop = loop or asyncio.get_event_loop()
+        self.batches = 0
+        self.lines = 0
+        self._lanes = tuple(collections.deque() for _ in Priority)
+        self._flusher = None
+        self._wakeup = None
+
+    def __len__(self):
+        return sum(len(lane) for lane in self._lanes)
+
+    async def write(self, line, priority=Priority.NORMAL):
+        await self.write_nowait(line, priority)
+
+    def write_nowait(self, line, priority=Priority.NORMAL):
+        """
+            Queue a line without waiting for it to be sent. Returns a future that's done once it has been
+        """
+        future = self.loop.create_future()
+        self._lanes[priority].append((line, future))
+        if self._flusher is None:
+            self._flusher = self.loop.create_task(self._flush())
+        elif self._wakeup is not None:
+            self._wakeup.set()
+        return future
+
+    def _take(self):
+        """
+            Take the next batch of lines that may be sent now. Returns the batch and, if a line is waiting
+            on a rate limit, how long until it may be sent
+        """
+        batch = []
+        wait = 0
+        limiter_for = self.limiter_for
+        cost_for = self.cost_for
+        for lane in self._lanes:
+            while lane and len(batch) < self.max_batch:
+                if limiter_for is not None:
+                    line = lane[0][0]
+                    limiter = limiter_for(line)
+                    if limiter is not None:
+                        wait = limiter.acquire(cost=1 if cost_for is None else cost_for(line))
+                        if wait:
+                            break
+                batch.append(lane.popleft())
+            if wait and lane is self._lanes[Priority.HIGH]:
+                self._take_unlimited(lane, batch)
+            if wait or len(batch) >= self.max_batch:
+                break
+        return batch, wait
+
+    def _take_unlimited(self, lane, batch):
+        # The head of the lane is waiting on a limiter, let lines behind it that have none go ahead
+        index = 1
+        while index < len(lane) and len(batch) < self.max_batch:
+            if self.limiter_for(lane[index][0]) is None:
+                batch.append(lane[index])
+                del lane[index]
+            else:
+                index += 1
+
+    async def _flush(self):
+        try:
+            while any(self._lanes):
+                if self.max_delay and len(self) < self.max_batch:
+                    await asyncio.sleep(self.max_delay)
+                batch, wait = self._take()
+                if batch:
+                    await self._send(batch)
+                if wait:
+                    self._wakeup = asyncio.Event()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    finally:
+                        self._wakeup = None
+        finally:
+            self._flusher = None
+
+    async def _send(self, batch):
+        try:
+            await self.send_many([line for line, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        except asyncio.CancelledError:
+            # Closed mid-write, these lines were already taken from the lanes so close won't see them
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ConnectionError("Write queue closed"))
+            raise
+        else:
+            self.batches += 1
+            self.lines += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    async def close(self):
+        """
+            Stop flushing, failing any lines still waiting to be sent
+        """
+        flusher = self._flusher
+        if flusher is not None:
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+        for lane in self._lanes:
+            while lane:
+                _, future = lane.popleft()
+                if not future.done():
+                    future.set_exception(ConnectionError("Write queue closed"))
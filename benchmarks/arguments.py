@@ -0,0 +1,124 @@
+"""
+    Measure the per-command cost of splitting a command's text into arguments and binding them to
+    its callback. Compares the tokenizer and Binder with the character loop and per call signature
+    walk they replaced, which didn't convert anything, for a few callback shapes.
+"""
+
+import inspect
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.arguments import Binder, split_args
+
+
+ROUNDS = 20000
+
+
+# Splitting and binding as they were before the Binder
+
+def legacy_split_args(content):
+    quotes = False
+    escape = False
+    args = []
+    cur = ""
+    for char in content:
+        if escape:
+            cur += char
+            escape = False
+        elif char == "\\":
+            escape = True
+        elif char == "\"":
+            quotes = not quotes
+            args.append(cur)
+            cur = ""
+        elif not quotes and char == " ":
+            args.append(cur)
+            cur = ""
+        else:
+            cur += char
+    if cur != "":
+        args.append(cur)
+    return args
+
+
+def legacy_parse_arguments(params, ctx):
+    args = []
+    kwargs = {}
+    i = 0
+    for param in params:
+        if param == "ctx":
+            continue
+        fparam = params[param]
+        if fparam.kind is inspect.Parameter.POSITIONAL_OR_KEYWORD:
+            try:
+                args.append(ctx.args[i])
+                i += 1
+            except IndexError:
+                if fparam.default == fparam.empty:
+                    raise
+                args.append(fparam.default)
+        if fparam.kind is inspect.Parameter.VAR_POSITIONAL:
+            for arg in ctx.args[i:]:
+                args.append(arg)
+            break
+        if fparam.kind is inspect.Parameter.KEYWORD_ONLY:
+            kwargs[param] = ' '.join(ctx.args[i:])
+            break
+    return args, kwargs
+
+
+class Context:
+
+    def __init__(self):
+        self.args = []
+        self.channel = None
+        self.bot = None
+
+
+def plain(ctx, first, second="default"):
+    pass
+
+
+def typed(ctx, count: int, scale: float, *values: int):
+    pass
+
+
+def rest(ctx, target, *, reason):
+    pass
+
+
+def bench(name, split, bind, content, rounds=ROUNDS, repeat=5):
+    ctx = Context()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            ctx.args = split(content)[1:]
+            bind(ctx)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:>20}: {best / rounds * 1e9:8.1f} ns/command")
+    return best
+
+
+def main():
+    cases = (
+        ("plain", plain, "!greet alice bob"),
+        ("typed", typed, "!roll 3 1.5 10 20 30 40"),
+        ("keyword rest", rest, "!ban spammer posting the same link over and over again"),
+        ("quoted", plain, "!greet \"alice smith\" \"bob jones\""),
+        ("escaped", plain, "!greet \"alice smith\" \"bob \\\"the builder\\\" jones\""),
+    )
+    for name, callback, content in cases:
+        params = inspect.signature(callback).parameters.copy()
+        binder = Binder(callback)
+        print(name)
+        legacy = bench("legacy", legacy_split_args, lambda ctx: legacy_parse_arguments(params, ctx), content)
+        compiled = bench("binder", split_args, lambda ctx: binder.bind(ctx, ctx.args), content)
+        print(f"{'speedup':>20}: {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
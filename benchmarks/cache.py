@@ -0,0 +1,109 @@
+"""
+    Measure @cached on a burst of the same command. 300 viewers in each of 3 channels send !uptime
+    within a second, and the command takes 50 ms to look the answer up. Compares how often the
+    callback runs and how many replies are sent, which Twitch allows 20 of every 30 seconds, without
+    the cache, with it, and with collapsed replies. Then times one invocation answered from the cache
+    against running a callback that does nothing.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.bot import Command, Context, cached
+
+
+CHANNELS = 3
+VIEWERS = 300
+LOOKUP = 0.05
+ROUNDS = 20000
+
+
+class Channel:
+
+    def __init__(self, name):
+        self.name = name
+        self.sent = 0
+
+    async def send(self, message):
+        self.sent += 1
+
+
+class Message:
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.content = "!uptime"
+        self.author = None
+
+
+def make_command(**options):
+    runs = [0]
+
+    async def uptime(ctx):
+        runs[0] += 1
+        await asyncio.sleep(LOOKUP)
+        await ctx.send("Live for 3 hours, 12 minutes")
+
+    command = Command("uptime", uptime)
+    if options:
+        cached(**options)(command)
+    return command, runs
+
+
+def make_context(command, channel):
+    ctx = Context(None, Message(channel))
+    ctx.command = command
+    return ctx
+
+
+async def burst(name, **options):
+    command, runs = make_command(**options)
+    channels = [Channel(f"#channel{i}") for i in range(CHANNELS)]
+    rng = random.Random(7)
+
+    async def viewer(channel):
+        await asyncio.sleep(rng.random())
+        await command.invoke(make_context(command, channel))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(viewer(channel) for channel in channels for _ in range(VIEWERS)))
+    elapsed = time.perf_counter() - start
+    sent = sum(channel.sent for channel in channels)
+    print(f"{name:>10}: {runs[0]:4} callback runs, {sent:4} replies, {sent / 20 * 30:6.0f} s of send budget, "
+          f"{elapsed:.2f} s")
+
+
+async def overhead(name, command, repeat=5):
+    channel = Channel("#channel")
+    contexts = [make_context(command, channel) for _ in range(ROUNDS)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for ctx in contexts:
+            await command.invoke(ctx)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:>10}: {best / ROUNDS * 1e9:8.1f} ns/invocation")
+
+
+async def noop(ctx):
+    await ctx.send("Live for 3 hours, 12 minutes")
+
+
+async def main():
+    await burst("uncached")
+    await burst("cached", ttl=5)
+    await burst("collapsed", ttl=5, collapse=True)
+
+    await overhead("no cache", Command("uptime", noop))
+    hot = Command("uptime", noop)
+    cached(ttl=60)(hot)
+    await overhead("cache hit", hot)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
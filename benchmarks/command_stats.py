@@ -0,0 +1,138 @@
+"""
+    Measure what always-on command stats cost per invocation, against Command.invoke without them.
+    Then runs a mix of commands, one slow, one failing, one that hangs past its timeout and one
+    limited to 2 at once, and prints what command_stats reports for them.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.bot import Command, CommandStats, Context, max_concurrency
+from airc.errors import CheckFailure
+
+
+ROUNDS = 20000
+
+
+class Channel:
+
+    def __init__(self, name):
+        self.name = name
+
+    async def send(self, message):
+        pass
+
+
+class User:
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Message:
+
+    def __init__(self, channel, author):
+        self.channel = channel
+        self.author = author
+        self.content = ""
+
+
+class Bot:
+
+    command_timeout = 0.05
+
+    def __init__(self, commands):
+        self.all_commands = {command.name: command for command in commands}
+
+    def command_stats(self):
+        return {name: command.stats.as_dict() for name, command in self.all_commands.items()}
+
+
+class LegacyCommand(Command):
+
+    async def invoke(self, ctx):
+        # Command.invoke as it was before stats, limits and timeouts
+        if not await self.can_run(ctx):
+            raise CheckFailure("Command check failed")
+        args, kwargs = self.binder.bind(ctx, ctx.args)
+        try:
+            await self._invoke_callback(ctx, args, kwargs)
+        except Exception as e:
+            pass
+
+
+def make_context(command, bot=None, user="viewer"):
+    ctx = Context(bot, Message(Channel("#channel"), User(user)))
+    ctx.command = command
+    return ctx
+
+
+async def noop(ctx):
+    pass
+
+
+async def overhead(name, command, repeat=5):
+    contexts = [make_context(command) for _ in range(ROUNDS)]
+    best = float("inf")
+    for _ in range(repeat):
+        command.stats = CommandStats(command.name)
+        start = time.perf_counter()
+        for ctx in contexts:
+            await command.invoke(ctx)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:>12}: {best / ROUNDS * 1e9:8.1f} ns/invocation")
+    return best
+
+
+async def ping(ctx):
+    pass
+
+
+async def lookup(ctx):
+    await asyncio.sleep(0.01)
+
+
+async def broken(ctx):
+    raise ValueError("upstream returned garbage")
+
+
+async def stuck(ctx):
+    await asyncio.sleep(1)
+
+
+async def render(ctx):
+    await asyncio.sleep(0.02)
+
+
+async def workload():
+    commands = [Command("ping", ping), Command("lookup", lookup), Command("broken", broken),
+                Command("stuck", stuck), max_concurrency(2, wait=True)(Command("render", render))]
+    bot = Bot(commands)
+    invocations = []
+    for i in range(20):
+        for command in commands:
+            invocations.append(command.invoke(make_context(command, bot, f"viewer{i}")))
+    # Failures and timeouts are raised for invoke_command to dispatch, they're only counted here
+    await asyncio.gather(*invocations, return_exceptions=True)
+    for name, stats in bot.command_stats().items():
+        latency = stats["latency"]
+        print(f"{name:>12}: {stats['succeeded']:3} ok, {stats['failed']:3} failed, {stats['timed_out']:3} timed out, "
+              f"p50 {latency['p50'] * 1000:7.2f} ms, p99 {latency['p99'] * 1000:7.2f} ms, "
+              f"queued {stats['queued']:3}, max wait {stats['max_wait'] * 1000:6.1f} ms")
+    print(json.dumps(bot.command_stats()["render"]["latency"]["buckets"]))
+
+
+async def main():
+    legacy = await overhead("legacy", LegacyCommand("ping", noop))
+    tracked = await overhead("with stats", Command("ping", noop))
+    print(f"{'overhead':>12}: {(tracked - legacy) / ROUNDS * 1e9:8.1f} ns/invocation")
+    await workload()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""
+    Compare command classification through the precomputed command table against building a
+    ReplyCode for every line
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.enums import ReplyCode, EventType
+from airc.server import _handle_command
+
+
+# Command classification as it was before the command table
+
+def legacy_handle_command(command):
+    if not command.isnumeric():
+        return EventType.PROTOCOL, command.lower()
+
+    try:
+        com = int(command)
+        code = ReplyCode(com)
+
+        if 0 <= com <= 399:
+            type = EventType.REPLY
+        elif 400 <= com <= 599:
+            type = EventType.ERROR
+        else:
+            type = EventType.UNKNOWN
+
+    except ValueError:
+        return EventType.UNKNOWN, command.lower()
+
+    return type, code.name.lower()
+
+
+def bench(name, func, commands, repeat=5, rounds=200):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for command in commands:
+                func(command)
+        best = min(best, time.perf_counter() - start)
+    rate = len(commands) * rounds / best
+    print(f"{name:>20}: {rate:12,.0f} commands/sec")
+    return best
+
+
+def main():
+    workloads = {
+        "numerics 001-599": [f"{i:03}" for i in range(1, 600)],
+        "protocol commands": ["PRIVMSG", "JOIN", "PART", "PING", "NOTICE", "MODE", "USERSTATE", "CLEARCHAT"] * 75,
+    }
+    for name, commands in workloads.items():
+        for command in commands:
+            assert _handle_command(command) == legacy_handle_command(command), command
+        print(name)
+        legacy = bench("legacy", legacy_handle_command, commands)
+        table = bench("table", _handle_command, commands)
+        print(f"{'speedup':>20}: {legacy / table:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
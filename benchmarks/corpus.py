@@ -0,0 +1,49 @@
+"""
+    Synthetic but realistic IRC traffic for the AIRC benchmarks. Mixes Twitch style tagged chat
+    with classic numerics and protocol messages.
+"""
+
+import random
+
+
+_users = [f"viewer_{i}" for i in range(2000)]
+_channels = [f"#channel_{i}" for i in range(50)]
+_words = ("Kappa PogChamp hello there gg wp what is this song lol LUL nice play "
+          "anyone know the uptime monkaS clip it how long has the stream been going").split()
+
+
+def _tags(rng, user):
+    return (f"@badge-info=subscriber/{rng.randint(1, 40)};badges=subscriber/12,bits/100;color=#1E90FF;"
+            f"display-name={user};emotes=;first-msg=0;flags=;id={rng.getrandbits(64):016x};mod=0;"
+            f"room-id=12345678;subscriber=1;tmi-sent-ts=1565000000000;turbo=0;user-id={rng.randint(1, 10**8)};"
+            f"user-type=")
+
+
+def _privmsg(rng):
+    user = rng.choice(_users)
+    text = " ".join(rng.choice(_words) for _ in range(rng.randint(1, 12)))
+    return f"{_tags(rng, user)} :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG {rng.choice(_channels)} :{text}"
+
+
+def _other(rng):
+    user = rng.choice(_users)
+    channel = rng.choice(_channels)
+    return rng.choice((
+        f":{user}!{user}@{user}.tmi.twitch.tv JOIN {channel}",
+        f":{user}!{user}@{user}.tmi.twitch.tv PART {channel}",
+        "PING :tmi.twitch.tv",
+        f":tmi.twitch.tv 353 {user} = {channel} :{' '.join(rng.sample(_users, 20))}",
+        f":tmi.twitch.tv 366 {user} {channel} :End of /NAMES list",
+        f"@emote-only=0;followers-only=-1;r9k=0;rituals=0;room-id=1;slow=0;subs-only=0 :tmi.twitch.tv ROOMSTATE {channel}",
+        f":irc.example.net 001 {user} :Welcome to the Internet Relay Network {user}",
+        f":irc.example.net 433 * {user} :Nickname is already in use",
+        f":{user}!~{user}@host.example.com NOTICE {channel} :Hello everyone",
+    ))
+
+
+def lines(count=100000, seed=0):
+    """
+        Generate a list of IRC lines, roughly 80% chat and 20% everything else
+    """
+    rng = random.Random(seed)
+    return [_privmsg(rng) if rng.random() < 0.8 else _other(rng) for _ in range(count)]
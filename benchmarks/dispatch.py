@@ -0,0 +1,58 @@
+"""
+    Measure the per-event overhead of DefaultClient._dispatch through the handler table, against the
+    getattr based dispatch it replaced
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from airc.enums import EventType
+
+
+class BenchClient(airc.DefaultClient):
+
+    async def on_all_events(self, event):
+        pass
+
+    async def on_privmsg(self, event):
+        pass
+
+
+class LegacyClient(BenchClient):
+
+    async def _dispatch(self, event):
+        all_handler = getattr(self, "on_all_events", None)
+        if all_handler is not None:
+            await all_handler(event)
+        event_handler = getattr(self, "on_" + event.command, None)
+        if event_handler is not None:
+            await event_handler(event)
+
+
+async def bench(cls, events, repeat=5):
+    client = cls([], loop=asyncio.get_running_loop())
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in events:
+            await client._dispatch(event)
+        best = min(best, time.perf_counter() - start)
+    print(f"{cls.__name__:>12}: {best / len(events) * 1e9:8.1f} ns/event")
+    return best
+
+
+async def main():
+    commands = ["privmsg"] * 8 + ["join", "part", "userstate", "roomstate"]
+    events = [airc.Event(None, EventType.PROTOCOL, command, ["#bench", "text"]) for command in commands] * 20000
+    legacy = await bench(LegacyClient, events)
+    table = await bench(BenchClient, events)
+    print(f"{'speedup':>12}: {legacy / table:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+    Compare building eager Events against LazyEvents, for handlers that only read the command and
+    target and for handlers that read everything
+"""
+
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.events import Event, LazyEvent
+from airc.parser import parse_line, scan_line
+from airc.utils import IRCPrefix, PrefixCache
+import corpus
+
+
+server = types.SimpleNamespace(prefix_cache=PrefixCache())
+
+
+def eager(line):
+    tags, prefix, command, params = parse_line(line)
+    return Event(None, None, command.lower(), params, IRCPrefix(prefix) if prefix else None, tags)
+
+
+def lazy(line):
+    spans = scan_line(line)
+    return LazyEvent(server, None, line[spans[3]:spans[4]].lower(), line, spans)
+
+
+def command_only(event):
+    return event.command, event.target
+
+
+def everything(event):
+    return event.command, event.target, event.arguments, event.prefix, event.tags
+
+
+def bench(name, build, access, lines, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            access(build(line))
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:>24}: {len(lines) / best:12,.0f} events/sec")
+
+
+def main():
+    lines = corpus.lines()
+    for line in lines:
+        assert everything(eager(line)) == everything(lazy(line)), line
+    for access in (command_only, everything):
+        bench(f"eager, {access.__name__}", eager, access, lines)
+        bench(f"lazy, {access.__name__}", lazy, access, lines)
+    cache = server.prefix_cache
+    print(f"prefix cache: {cache.hits:,} hits, {cache.misses:,} misses, {len(cache):,} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+    Measure how much CPU heavy commands delay the event loop. Invokes a burst of commands that each
+    spend about 20ms computing, run inline as before and through the thread and process pools, while
+    a ticker measures how late the loop wakes it up.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from airc.bot import Command, Context
+
+
+CALLS = 20
+WORK = 200000
+
+
+def analyse(ctx, *words):
+    total = 0
+    for i in range(WORK):
+        total += i * i
+    return f"{total % 97}"
+
+
+async def analyse_inline(ctx, *words):
+    await ctx.send(analyse(ctx, *words))
+
+
+class Message:
+
+    content = "!analyse some text"
+    channel = None
+    author = None
+
+
+class BenchContext(Context):
+
+    __slots__ = ("replies",)
+
+    async def send(self, message):
+        self.replies += 1
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def measure(bot, name, command):
+    ctx = BenchContext(bot, Message())
+    ctx.replies = 0
+    ctx.command = command
+    ctx.args = ["some", "text"]
+
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.ensure_future(ticker(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(command.invoke(ctx) for _ in range(CALLS)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    assert ctx.replies == CALLS
+    lags.sort()
+    print(f"{name:>10}: {elapsed:6.2f} s for {CALLS} calls, loop lag median {lags[len(lags) // 2] * 1000:7.2f} ms,"
+          f" max {lags[-1] * 1000:7.2f} ms")
+
+
+async def main():
+    bot = airc.DefaultBot("!")
+    await measure(bot, "inline", Command("analyse", analyse_inline))
+    await measure(bot, "thread", Command("analyse", analyse, executor="thread"))
+    await measure(bot, "process", Command("analyse", analyse, executor="process"))
+    for name, stats in bot.executor_stats().items():
+        print(f"{name:>10}: peak pending {stats['peak_pending']}, mean wait {stats['mean_wait'] * 1000:.1f} ms,"
+              f" mean run {stats['mean_run'] * 1000:.1f} ms")
+    bot.shutdown_executors()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
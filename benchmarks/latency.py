@@ -0,0 +1,75 @@
+"""
+    Measure the time from a frame leaving the stand-in server to its handler running, for the
+    per-connection read loop and for the one second polling loop DefaultClient.start used before it
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from stand_in import StandInServer, stop_all
+
+
+class LatencyClient(airc.DefaultClient):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    async def on_privmsg(self, event):
+        self.latencies.append(time.perf_counter() - float(event.arguments[0]))
+
+
+class PollingClient(LatencyClient):
+
+    async def start(self, *args, **kwargs):
+        # DefaultClient.start as it was before the per-connection read loop
+        tasks = []
+        names = kwargs.get("names", [])
+        passwds = kwargs.get("passwds", [])
+        for server in self.connections:
+            if not server.connected:
+                await server.connect(names.pop(0), password=passwds.pop(0))
+            tasks.append(self.loop.create_task(server.process_data()))
+        while len(tasks) > 0:
+            for task in tasks:
+                if task.done():
+                    tasks.remove(task)
+                    server = await task
+                    tasks.append(self.loop.create_task(server.process_data()))
+                elif task.cancelled():
+                    tasks.remove(task)
+            await asyncio.sleep(1)
+
+
+async def measure(cls, frames, interval):
+    stand_in = await StandInServer().start()
+    client = cls(stand_in.uri, loop=asyncio.get_running_loop())
+    asyncio.get_running_loop().create_task(client.start(names=["bench"], passwds=[""]))
+    while not stand_in.clients:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+
+    for _ in range(frames):
+        stand_in.send(f":bench!bench@stand.in PRIVMSG #bench :{time.perf_counter()!r}")
+        await asyncio.sleep(interval)
+    await asyncio.sleep(1.5)
+
+    await stop_all(stand_in)
+    latencies = sorted(client.latencies)
+    print(f"{cls.__name__:>15}: {len(latencies)} frames, median {statistics.median(latencies) * 1000:8.2f} ms, "
+          f"max {latencies[-1] * 1000:8.2f} ms")
+
+
+async def main():
+    await measure(PollingClient, 20, 0.13)
+    await measure(LatencyClient, 20, 0.13)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
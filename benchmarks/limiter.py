@@ -0,0 +1,68 @@
+"""
+    Check that RateLimiter never allows more than rate uses in any window of per seconds. A sender
+    tries to use RateLimiter(20, 30), Twitch's chat limit, every 10 ms of simulated time for five
+    minutes, and the busiest 30 second window is counted. Then lines are sent through a WriteQueue
+    with a limit of 20 every 0.3 seconds in real time, and the send times are checked the same way.
+"""
+
+import asyncio
+import bisect
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.utils import RateLimiter
+from airc.writer import WriteQueue
+
+
+RATE = 20
+PER = 30
+DURATION = 300
+STEP = 0.01
+
+
+def busiest_window(times, per):
+    # Most uses in any window [t, t + per), which always starts at a use
+    return max(bisect.bisect_left(times, start + per) - index for index, start in enumerate(times))
+
+
+def simulated():
+    limiter = RateLimiter(RATE, PER)
+    times = []
+    for step in range(int(DURATION / STEP)):
+        now = 1000 + step * STEP
+        if not limiter.acquire(now):
+            times.append(now)
+    first = bisect.bisect_left(times, times[0] + PER)
+    busiest = busiest_window(times, PER)
+    print(f"{'simulated':>12}: {len(times)} sends in {DURATION} s, {first} in the first {PER} s, "
+          f"at most {busiest} in any {PER} s")
+    assert busiest <= RATE
+
+
+async def queued(lines=100, per=0.3):
+    limiter = RateLimiter(RATE, per)
+    times = []
+
+    async def send_many(batch):
+        now = time.monotonic()
+        times.extend(now for _ in batch)
+
+    queue = WriteQueue(send_many, limiter_for=lambda line: limiter, loop=asyncio.get_running_loop())
+    start = time.monotonic()
+    await asyncio.gather(*(queue.write(f"PRIVMSG #channel :{i}") for i in range(lines)))
+    elapsed = time.monotonic() - start
+    busiest = busiest_window(times, per)
+    print(f"{'write queue':>12}: {lines} lines in {elapsed:.2f} s, at most {busiest} in any {per} s")
+    assert busiest <= RATE
+
+
+def main():
+    simulated()
+    asyncio.run(queued())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+    Compare the bytearray LineBuffer against the bytes and regex one it replaced, for large frames,
+    heavily fragmented frames and a long line arriving in small pieces
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.utils import LineBuffer
+import corpus
+
+
+class LegacyLineBuffer:
+
+    _line_sep = re.compile(b"\r?\n")
+
+    def __init__(self):
+        self.data = b''
+
+    def feed(self, line):
+        if isinstance(line, str):
+            line = bytes(line, 'utf-8')
+        self.data += line
+
+    def lines(self):
+        lines = self._line_sep.split(self.data)
+        self.data = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8', 'strict')
+
+    def __iter__(self):
+        return self.lines()
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def bench(name, cls, chunks, total, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        buffer = cls()
+        start = time.perf_counter()
+        count = 0
+        for chunk in chunks:
+            buffer.feed(chunk)
+            for _ in buffer:
+                count += 1
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:>10}: {total / best / 2**20:10.1f} MiB/sec, {count / best:12,.0f} lines/sec")
+    return best
+
+
+def main():
+    data = "".join(line + "\r\n" for line in corpus.lines(50000)).encode("utf-8")
+    long_line = b"PRIVMSG #channel :" + b"x" * 8000 + b"\r\n"
+    workloads = {
+        "64 KiB frames": (chunked(data, 65536), len(data)),
+        "7 byte fragments": (chunked(data, 7), len(data)),
+        "8 KB line in 16 byte pieces": (chunked(long_line * 200, 16), len(long_line) * 200),
+    }
+    for name, (chunks, total) in workloads.items():
+        print(name)
+        legacy = bench("legacy", LegacyLineBuffer, chunks, total)
+        new = bench("bytearray", LineBuffer, chunks, total)
+        print(f"{'speedup':>10}: {legacy / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+    Compare the single pass airc.parser against the regex parser it replaced
+"""
+
+import re
+import sys
+import time
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from airc.parser import parse_line
+import corpus
+
+
+# The parser as it was in airc.server before airc.parser existed
+
+_rfc_pattern = r"^(@(?P<tags>[^ ]*) )?(:(?P<prefix>[^ ]+) +)?(?P<command>[^ ]+)( *(?P<argument> .+))?"
+_regexp_rfc = re.compile(_rfc_pattern)
+
+
+def _handle_tags(tags):
+    if tags is None:
+        return {}
+    tags = tags.lstrip("@")
+    raw_tags = tags.split(";")
+    tags = {}
+    for raw_tag in raw_tags:
+        name, val = raw_tag.split("=")
+        if val == "":
+            val = None
+        tags[name] = val
+    return tags
+
+
+def _handle_args(args):
+    args = args.lstrip()
+    out_args = []
+    rest = False
+    tmp = ""
+    for char in args:
+        if rest:
+            tmp += char
+        elif char == " ":
+            out_args.append(tmp)
+            tmp = ""
+        elif char == ":" and tmp == "":
+            rest = True
+        else:
+            tmp += char
+    if tmp:
+        out_args.append(tmp)
+    return out_args
+
+
+def legacy_parse_line(line):
+    match = _regexp_rfc.match(line)
+    args = match.group('argument')
+    return (_handle_tags(match.group('tags')), match.group('prefix'), match.group('command'),
+            _handle_args(args) if args else [])
+
+
+def bench(name, func, lines, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:>10}: {len(lines) / best:12,.0f} lines/sec")
+    return best
+
+
+def main():
+    lines = corpus.lines()
+    for line in lines:
+        assert parse_line(line) == legacy_parse_line(line), line
+    legacy = bench("legacy", legacy_parse_line, lines)
+    new = bench("parser", parse_line, lines)
+    print(f"{'speedup':>10}: {legacy / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+    Load test for ConnectionPool. Joins 10,000 channels on the local stand-in server, spread over
+    shards of 100 channels, and compares that with one connection sending a JOIN per channel, as
+    DefaultServer did. Then messages every channel, one PRIVMSG each and as a broadcast, and checks
+    each message went out through the shard that joined its channel.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from stand_in import StandInServer, stop_all
+
+
+CHANNELS = 10000
+PER_SHARD = 100
+
+
+class JoinCounter(airc.DefaultClient):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.joined = 0
+        self.done = None
+
+    async def on_join(self, event):
+        self.joined += 1
+        if self.joined == CHANNELS:
+            self.done.set()
+
+
+async def wait_for(predicate, timeout=60):
+    end = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > end:
+            raise TimeoutError("Stand-in server didn't receive everything")
+        await asyncio.sleep(0.005)
+
+
+async def single(stand_in, channels):
+    client = JoinCounter(stand_in.uri, loop=asyncio.get_running_loop())
+    client.done = asyncio.Event()
+    server = client.connections[0]
+    await client.connect_all(["bench"], [""])
+    await wait_for(lambda: stand_in.registered)
+    start = time.perf_counter()
+    for channel in channels:
+        await server.join(channel)
+    await asyncio.wait_for(client.done.wait(), 60)
+    elapsed = time.perf_counter() - start
+    print(f"{'single connection':>20}: {elapsed:8.3f} s to join, 1 connection")
+    await server.quit()
+    return elapsed
+
+
+async def pooled(stand_in, channels):
+    client = JoinCounter(loop=asyncio.get_running_loop(), max_connecting=20)
+    client.done = asyncio.Event()
+    pool = client.pool(stand_in.uri, "bench", max_channels=PER_SHARD)
+    start = time.perf_counter()
+    await pool.join(channels)
+    await asyncio.wait_for(client.done.wait(), 60)
+    elapsed = time.perf_counter() - start
+    print(f"{'pool':>20}: {elapsed:8.3f} s to join, {len(pool)} connections")
+
+    base = stand_in.messages
+    start = time.perf_counter()
+    await asyncio.gather(*(pool.privmsg(channel, "hello") for channel in channels))
+    await wait_for(lambda: stand_in.messages - base == CHANNELS)
+    print(f"{'privmsg each':>20}: {time.perf_counter() - start:8.3f} s")
+
+    base, writes = stand_in.messages, stand_in.received
+    start = time.perf_counter()
+    await pool.broadcast(channels, "hello everyone")
+    await wait_for(lambda: stand_in.messages - base == CHANNELS)
+    print(f"{'broadcast':>20}: {time.perf_counter() - start:8.3f} s, {stand_in.received - writes} lines")
+    print(f"{'misrouted':>20}: {stand_in.misrouted}")
+    print(f"{'unregistered joins':>20}: {stand_in.unregistered}")
+    assert stand_in.misrouted == 0
+    assert stand_in.unregistered == 0
+
+    await pool.close()
+    return elapsed
+
+
+async def main():
+    stand_in = await StandInServer(register_delay=0.02, isupport=["TARGMAX=PRIVMSG:20,JOIN:"]).start()
+    channels = [f"#channel{i}" for i in range(CHANNELS)]
+    try:
+        before = await single(stand_in, channels)
+        after = await pooled(stand_in, channels)
+        print(f"{'join speedup':>20}: {before / after:.2f}x")
+    finally:
+        await stop_all(stand_in)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
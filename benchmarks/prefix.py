@@ -0,0 +1,131 @@
+"""
+    Measure command detection in DefaultBot on chat where 3% of messages are commands. Compares the
+    PrefixMatcher pre-check, for a list of prefixes and for a callable prefix cached per channel, with
+    building a Message and Context for every message and scanning the prefixes, as before.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from airc import utils
+from airc.enums import EventType
+from airc.events import LazyEvent
+from airc.arguments import split_args
+from airc.parser import scan_line
+
+
+MESSAGES = 50000
+CHANNELS = 50
+
+
+class Channel:
+
+    def __init__(self, name):
+        self.name = name
+        self.users = {}
+
+    def get_user(self, name):
+        return self.users.get(name)
+
+
+class Source:
+
+    prefix_cache = utils.prefix_cache
+
+
+class BenchBot(airc.DefaultBot):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.channels = {f"#channel{i}": Channel(f"#channel{i}") for i in range(CHANNELS)}
+        self.commands_seen = 0
+
+    def get_channel(self, name):
+        return self.channels[name]
+
+    async def invoke_command(self, ctx):
+        self.commands_seen += 1
+
+
+class LegacyBot(BenchBot):
+
+    async def _handle_command(self, event):
+        ctx = await self.build_context(event)
+        if ctx.command is not None:
+            await self.invoke_command(ctx)
+
+    async def build_context(self, event):
+        channel = self.get_channel(event.target)
+        user = channel.get_user(event.prefix.nick)
+        message = airc.bot.Message(event, channel, user)
+        ctx = airc.Context(self, message)
+
+        prefix = await self.get_prefix(message)
+        if isinstance(prefix, (list, tuple)):
+            for pref in prefix:
+                if message.content.startswith(pref):
+                    ctx.invoked_prefix = pref
+                    break
+        elif message.content.startswith(prefix):
+            ctx.invoked_prefix = prefix
+
+        if ctx.invoked_prefix:
+            raw_list = split_args(message.content)
+            ctx.invoker = raw_list[0][len(ctx.invoked_prefix):]
+            ctx.args = raw_list[1:]
+
+        ctx.command = self.all_commands.get(ctx.invoker)
+        return ctx
+
+
+async def noop(ctx, *args):
+    pass
+
+
+def channel_prefix(bot, message):
+    return ["!", "?"]
+
+
+def make_lines():
+    lines = []
+    for i in range(MESSAGES):
+        text = f"!ping {i}" if i % 33 == 0 else f"just chatting about thing number {i} in here"
+        lines.append(f"@badges=;color=#FF0000 :user{i % 500}!user{i % 500}@tmi PRIVMSG #channel{i % CHANNELS} :{text}")
+    return lines
+
+
+async def bench(cls, prefix, lines, repeat=5):
+    bot = cls(prefix, loop=asyncio.get_running_loop())
+    bot.add_command(airc.Command("ping", noop))
+    source = Source()
+    best = float("inf")
+    for _ in range(repeat):
+        # Events are lazy, so make fresh ones each round, outside the timing
+        events = [LazyEvent(source, EventType.PROTOCOL, "privmsg", line, scan_line(line)) for line in lines]
+        bot.commands_seen = 0
+        start = time.perf_counter()
+        for event in events:
+            await bot._handle_command(event)
+        best = min(best, time.perf_counter() - start)
+    assert bot.commands_seen == len(range(0, MESSAGES, 33))
+    return best
+
+
+async def main():
+    lines = make_lines()
+    for name, prefix in (("prefix list", ["!", "?"]), ("callable prefix", channel_prefix)):
+        legacy = await bench(LegacyBot, prefix, lines)
+        matched = await bench(BenchBot, prefix, lines)
+        print(name)
+        print(f"{'legacy':>20}: {legacy / MESSAGES * 1e9:8.1f} ns/message")
+        print(f"{'pre-check':>20}: {matched / MESSAGES * 1e9:8.1f} ns/message")
+        print(f"{'speedup':>20}: {legacy / matched:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+    Time to recover for ReconnectManager. Connects several servers to the local stand-in, each with
+    capabilities and 500 channels, then drops every connection at once and waits for them all to be
+    back in their channels. Run with JOINs packed to TARGMAX and with one channel per JOIN, then once
+    more with the server sending RECONNECT instead of dropping.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from airc.reconnect import Backoff, ReconnectManager
+from stand_in import StandInServer, stop_all
+
+
+SERVERS = 10
+CHANNELS = 500
+CAPS = ["twitch.tv/membership", "twitch.tv/tags", "twitch.tv/commands"]
+
+
+class Restorer(airc.DefaultClient):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recovered = []
+        self.waiter = None
+
+    async def on_reconnected(self, event):
+        self.recovered.append(event.arguments[0])
+        if len(self.recovered) == SERVERS:
+            self.waiter.set()
+
+
+async def wait_for(predicate, timeout=60):
+    end = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > end:
+            raise TimeoutError("Stand-in server didn't receive everything")
+        await asyncio.sleep(0.005)
+
+
+async def run(stand_in, name, batch, cause):
+    manager = ReconnectManager(backoff=Backoff(base=0.05, cap=1), rejoin_batch=batch)
+    client = Restorer([stand_in.uri] * SERVERS, loop=asyncio.get_running_loop(), reconnect=manager)
+    await client.connect_all([f"bench{i}" for i in range(SERVERS)], [""] * SERVERS)
+    for index, server in enumerate(client.connections):
+        await server.request_caps(CAPS)
+        await server.join([f"#s{index}c{i}" for i in range(CHANNELS)])
+    await wait_for(lambda: all(len(server.channels) == CHANNELS and len(server.caps) == len(CAPS)
+                               for server in client.connections))
+
+    client.waiter = asyncio.Event()
+    stand_in.joins = 0
+    base = stand_in.received
+    start = time.perf_counter()
+    cause(stand_in)
+    await client.waiter.wait()
+    await wait_for(lambda: stand_in.joins == SERVERS * CHANNELS)
+    elapsed = time.perf_counter() - start
+    await wait_for(lambda: all(len(server.channels) == CHANNELS for server in client.connections))
+
+    downtimes = sorted(incident.downtime for incident in client.recovered)
+    print(f"{name:>20}: all back in {elapsed * 1000:7.1f} ms, downtime median "
+          f"{downtimes[len(downtimes) // 2] * 1000:6.1f} ms, max {downtimes[-1] * 1000:6.1f} ms, "
+          f"{stand_in.received - base} lines sent")
+    for server in client.connections:
+        await server.quit()
+
+
+async def main():
+    # Every drop is logged as an error otherwise
+    logging.getLogger("airc.client").setLevel(logging.CRITICAL)
+    stand_in = await StandInServer(isupport=["TARGMAX=JOIN:"]).start()
+    try:
+        await run(stand_in, "dropped, packed", None, lambda s: s.drop())
+        await run(stand_in, "dropped, one each", 1, lambda s: s.drop())
+        await run(stand_in, "RECONNECT, packed", None, lambda s: s.send(":stand.in RECONNECT"))
+    finally:
+        await stop_all(stand_in)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+    Compare serializing PRIVMSGs through the compiled command templates against joining the items
+    into a string and encoding it, as before the templates, both as it was and with the same checks
+    the templates make. Also measures the full DefaultServer.privmsg path, into a transport that
+    discards what it's sent
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from airc.serializer import compile_message
+
+
+MESSAGES = 2000
+
+
+# Serialization as it was before the command templates, unvalidated
+
+def legacy_privmsg(target, text):
+    text = f":{text}"
+    line = ' '.join(filter(None, ("PRIVMSG", target, text)))
+    return bytes(line, 'utf-8')
+
+
+def checked_privmsg(target, text):
+    if " " in target or target[:1] == ":":
+        raise ValueError(target)
+    text = f":{text}"
+    line = ' '.join(filter(None, ("PRIVMSG", target, text)))
+    if "\r" in line or "\n" in line or "\0" in line:
+        raise ValueError(line)
+    data = bytes(line, 'utf-8')
+    if len(data) > 510:
+        raise ValueError(line)
+    return data
+
+
+template_privmsg = compile_message("PRIVMSG")
+
+
+def bench(name, func, messages, repeat=5, rounds=50):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for target, text in messages:
+                func(target, text)
+        best = min(best, time.perf_counter() - start)
+    rate = len(messages) * rounds / best
+    print(f"{name:>20}: {rate:12,.0f} messages/sec")
+    return best
+
+
+class NullTransport:
+
+    async def send_many(self, lines):
+        pass
+
+    async def close(self):
+        pass
+
+
+async def bench_server(messages, repeat=5):
+    server = airc.DefaultServer("irc://localhost")
+    server.socket = NullTransport()
+    server.connected = True
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await asyncio.gather(*(server.privmsg(target, text) for target, text in messages))
+        best = min(best, time.perf_counter() - start)
+    print(f"{'server.privmsg':>20}: {len(messages) / best:12,.0f} messages/sec")
+
+
+def main():
+    rand = random.Random(14)
+    words = ["hello", "chat", "Kappa", "is", "the", "stream", "live", "yet", "naïve", "café", "gg", "🎉"]
+    messages = [
+        (f"#channel{rand.randrange(100)}", " ".join(rand.choice(words) for _ in range(rand.randrange(1, 40))))
+        for _ in range(MESSAGES)
+    ]
+    for target, text in messages:
+        assert template_privmsg(target, text) == legacy_privmsg(target, text)
+
+    legacy = bench("legacy", legacy_privmsg, messages)
+    checked = bench("legacy, validated", checked_privmsg, messages)
+    templated = bench("template", template_privmsg, messages)
+    print(f"{'vs legacy':>20}: {legacy / templated:.2f}x")
+    print(f"{'vs validated':>20}: {checked / templated:.2f}x")
+    asyncio.run(bench_server(messages))
+
+
+if __name__ == "__main__":
+    main()
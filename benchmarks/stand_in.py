@@ -0,0 +1,131 @@
+"""
+    Local stand-in IRC server for the AIRC benchmarks. Accepts any number of plain TCP clients,
+    welcomes them after registration, acknowledges every capability requested, echoes their JOINs and
+    counts what they send. Messages to a channel the sending connection hasn't joined are counted as
+    misrouted, and JOINs before registration are refused with 451 and counted as unregistered. Like a
+    real server looking up the client's host, it can wait register_delay seconds before welcoming.
+"""
+
+import asyncio
+
+
+class StandInServer:
+
+    def __init__(self, *, connect_delay=0, register_delay=0, isupport=()):
+        self.connect_delay = connect_delay
+        self.register_delay = register_delay
+        self.isupport = isupport
+        self.clients = []
+        self.members = {}
+        self.received = 0
+        self.joins = 0
+        self.messages = 0
+        self.misrouted = 0
+        self.unregistered = 0
+        self.writes = 0
+        self.registered = set()
+        self.tasks = set()
+        self._server = None
+        self.port = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, limit=2**20)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    @property
+    def uri(self):
+        return f"irc://127.0.0.1:{self.port}"
+
+    async def close(self):
+        for writer in self.clients:
+            writer.close()
+        self._server.close()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def drop(self, client=None):
+        """
+            Close one client's connection, or every client's, without warning
+        """
+        for writer in list(self.clients) if client is None else (client,):
+            writer.transport.abort()
+
+    def send(self, line, client=None):
+        data = line.encode("utf-8") + b"\r\n"
+        for writer in self.clients if client is None else (client,):
+            writer.write(data)
+
+    async def _handle(self, reader, writer):
+        self.tasks.add(asyncio.current_task())
+        if self.connect_delay:
+            await asyncio.sleep(self.connect_delay)
+        self.clients.append(writer)
+        nick = "*"
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                self.writes += 1
+                for line in data.split(b"\r\n"):
+                    if not line:
+                        continue
+                    self.received += 1
+                    self._reply(writer, nick, line)
+                    if line.startswith(b"NICK "):
+                        nick = line[5:].decode()
+        except ConnectionError:
+            pass
+        finally:
+            if writer in self.clients:
+                self.clients.remove(writer)
+            self.registered.discard(writer)
+            writer.close()
+
+    def _welcome(self, writer, nick):
+        if writer.is_closing():
+            return
+        writer.write(f":stand.in 001 {nick} :Welcome\r\n".encode())
+        if self.isupport:
+            writer.write(f":stand.in 005 {nick} {' '.join(self.isupport)} :are supported\r\n".encode())
+        writer.write(f":stand.in 376 {nick} :End of /MOTD command.\r\n".encode())
+        self.registered.add(writer)
+
+    def _reply(self, writer, nick, line):
+        if line.startswith(b"USER "):
+            if self.register_delay:
+                asyncio.get_running_loop().call_later(self.register_delay, self._welcome, writer, nick)
+            else:
+                self._welcome(writer, nick)
+        elif line.startswith(b"PRIVMSG "):
+            targets = line[8:].split(b" ")[0].split(b",")
+            self.messages += len(targets)
+            joined = self.members.get(writer, ())
+            self.misrouted += sum(1 for target in targets if target[:1] == b"#" and target not in joined)
+        elif line.startswith(b"JOIN ") and writer not in self.registered:
+            self.unregistered += 1
+            writer.write(f":stand.in 451 {nick} :You have not registered\r\n".encode())
+        elif line.startswith(b"JOIN "):
+            channels = line[5:].split(b" ")[0].split(b",")
+            self.joins += len(channels)
+            self.members.setdefault(writer, set()).update(channels)
+            prefix = f":{nick}!{nick}@stand.in JOIN ".encode()
+            writer.write(b"".join(prefix + channel + b"\r\n" for channel in channels))
+        elif line.startswith(b"CAP REQ "):
+            writer.write(b":stand.in CAP " + nick.encode() + b" ACK " + line[8:] + b"\r\n")
+        elif line.startswith(b"PING "):
+            writer.write(b"PONG " + line[5:] + b"\r\n")
+
+
+async def stop_all(*servers):
+    """
+        Cancel every other task on the loop, then close the given stand-in servers
+    """
+    current = asyncio.current_task()
+    owned = set().union(*(server.tasks for server in servers))
+    tasks = [task for task in asyncio.all_tasks() if task is not current and task not in owned]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for server in servers:
+        await server.close()
@@ -0,0 +1,82 @@
+"""
+    Measure how long DefaultClient takes to connect to many servers, concurrently and one after
+    another as it used to. Every connection goes through a transport with a simulated handshake
+    delay, and one endpoint never answers.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from airc.transports import StreamTransport, register_transport
+from stand_in import StandInServer, stop_all
+
+
+HANDSHAKE = 0.05
+SERVERS = 50
+
+
+class SlowTransport(StreamTransport):
+
+    __slots__ = ()
+
+    @classmethod
+    async def open(cls, uri, buffer, *, loop, ssl=None):
+        if "blackhole" in uri:
+            await asyncio.sleep(3600)
+        await asyncio.sleep(HANDSHAKE)
+        return await super().open(uri.replace("slow://", "irc://"), buffer, loop=loop, ssl=ssl)
+
+
+class FailureCounter(airc.DefaultClient):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = 0
+
+    async def on_connect_failed(self, event):
+        self.failures += 1
+
+
+class SequentialClient(FailureCounter):
+
+    async def connect_all(self, names, passwds):
+        # DefaultClient.start connected like this before connections were made concurrently
+        for server in self.connections:
+            if not server.connected:
+                try:
+                    await asyncio.wait_for(server.connect(names.pop(0), password=passwds.pop(0)),
+                                           self.connect_timeout)
+                except asyncio.TimeoutError:
+                    self.failures += 1
+
+
+async def measure(cls, stand_in, **kwargs):
+    uris = [stand_in.uri.replace("irc://", "slow://")] * SERVERS + ["slow://blackhole:6667"]
+    client = cls(uris, loop=asyncio.get_running_loop(), connect_timeout=1, **kwargs)
+    start = time.perf_counter()
+    await client.connect_all(["bench"] * len(uris), [""] * len(uris))
+    elapsed = time.perf_counter() - start
+    connected = sum(server.connected for server in client.connections)
+    print(f"{cls.__name__:>16} {str(kwargs):>24}: {connected} connected, {client.failures} failed "
+          f"in {elapsed:6.2f} s")
+    for server in client.connections:
+        if server.connected:
+            await server.disconnect()
+
+
+async def main():
+    register_transport("slow", SlowTransport)
+    stand_in = await StandInServer().start()
+    await measure(SequentialClient, stand_in)
+    await measure(FailureCounter, stand_in)
+    await measure(FailureCounter, stand_in, max_connecting=100)
+    await stop_all(stand_in)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
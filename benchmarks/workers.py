@@ -0,0 +1,87 @@
+"""
+    Synthetic load for WorkerHub. The stand-in server floods messages over 200 channels, and every
+    message is handled with some CPU work and a reply. Compares one process running the client, as
+    DefaultClient does, with the hub and 1, 2 and 4 workers. Scaling needs as many free cores as
+    workers, cores this machine has are printed first.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from airc.workers import WorkerHub
+from stand_in import StandInServer, stop_all
+
+
+CHANNELS = 200
+MESSAGES = 20000
+WORK = 2000
+
+
+class Handler(airc.DefaultClient):
+
+    async def on_welcome(self, event):
+        await event.server.join([f"#channel{i}" for i in range(CHANNELS)])
+
+    async def on_privmsg(self, event):
+        total = 0
+        for i in range(WORK):
+            total += i * i
+        await event.server.privmsg(event.target, f"{total % 97}")
+
+
+def flood(stand_in):
+    lines = [f":user{i % 50}!u@stand.in PRIVMSG #channel{i % CHANNELS} :message {i}" for i in range(MESSAGES)]
+    for start in range(0, MESSAGES, 1000):
+        stand_in.send("\r\n".join(lines[start:start + 1000]))
+
+
+async def wait_for(predicate, timeout=300):
+    end = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > end:
+            raise TimeoutError("Stand-in server didn't receive every reply")
+        await asyncio.sleep(0.005)
+
+
+async def run(stand_in, name, start, stop):
+    await start()
+    await wait_for(lambda: stand_in.joins >= CHANNELS)
+    base = stand_in.messages
+    began = time.perf_counter()
+    flood(stand_in)
+    await wait_for(lambda: stand_in.messages - base >= MESSAGES)
+    elapsed = time.perf_counter() - began
+    await stop()
+    stand_in.joins = 0
+    print(f"{name:>20}: {MESSAGES / elapsed:10,.0f} messages/sec")
+    return elapsed
+
+
+async def main():
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    print(f"{'cores':>20}: {cores}")
+    stand_in = await StandInServer().start()
+    loop = asyncio.get_running_loop()
+    try:
+        client = Handler(stand_in.uri, loop=loop)
+
+        async def stop_client():
+            await client.connections[0].disconnect()
+
+        single = await run(stand_in, "single process", lambda: client.connect_all(["bench"], [""]), stop_client)
+
+        for workers in (1, 2, 4):
+            hub = WorkerHub(Handler, stand_in.uri, workers=workers, loop=loop)
+            elapsed = await run(stand_in, f"{workers} workers", lambda: hub.open(names=["bench"]), hub.close)
+            print(f"{'speedup':>20}: {single / elapsed:.2f}x")
+    finally:
+        await stop_all(stand_in)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+    Send bursts of 1000 PRIVMSGs, one transport write per line as before the write queue and
+    coalesced through DefaultServer's WriteQueue, over TCP to the stand-in server and over a local
+    websocket
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import airc
+from stand_in import StandInServer, stop_all
+
+
+BURST = 1000
+ROUNDS = 20
+
+
+class WebSocketStandIn:
+
+    def __init__(self):
+        self.received = 0
+        self.writes = 0
+        self._server = None
+        self.tasks = set()
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, "127.0.0.1", 0)
+        return self
+
+    @property
+    def uri(self):
+        return f"ws://127.0.0.1:{list(self._server.sockets)[0].getsockname()[1]}"
+
+    async def _handle(self, socket):
+        async for frame in socket:
+            self.writes += 1
+            self.received += frame.count("\n") + 1
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def per_line(server, lines):
+    await asyncio.gather(*(server.socket.send(line) for line in lines))
+
+
+async def queued(server, lines):
+    await asyncio.gather(*(server.send_raw(line) for line in lines))
+
+
+async def measure(send, stand_in):
+    server = airc.DefaultServer(stand_in.uri, loop=asyncio.get_running_loop())
+    await server.connect("bench")
+    while stand_in.received < 2:
+        await asyncio.sleep(0.01)
+    lines = [f"PRIVMSG #bench :message number {i} in this burst" for i in range(BURST)]
+
+    stand_in.received = stand_in.writes = 0
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await send(server, lines)
+    while stand_in.received < BURST * ROUNDS:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    print(f"{send.__name__:>10}: {BURST * ROUNDS / elapsed:12,.0f} lines/sec, "
+          f"{stand_in.writes:6} reads on the server side")
+    await server.disconnect()
+    return elapsed
+
+
+async def main():
+    for name, cls in (("TCP", StandInServer), ("websocket", WebSocketStandIn)):
+        stand_in = await cls().start()
+        print(name)
+        old = await measure(per_line, stand_in)
+        new = await measure(queued, stand_in)
+        print(f"{'speedup':>10}: {old / new:.2f}x")
+        await stop_all(stand_in)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
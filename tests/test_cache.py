@@ -0,0 +1,201 @@
+"""
+    Tests for ResponseCache
+"""
+
+import asyncio
+
+import pytest
+
+from airc.bot import Context
+from airc.cache import ResponseCache
+
+
+class Channel:
+
+    def __init__(self, name="#channel"):
+        self.name = name
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class Message:
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.content = "!uptime"
+        self.author = None
+
+
+def make_context(channel, *args):
+    ctx = Context(None, Message(channel))
+    ctx.args = list(args)
+    return ctx
+
+
+def test_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        ResponseCache(0)
+    with pytest.raises(ValueError):
+        ResponseCache(5, maxsize=0)
+
+
+def test_hit_replays_replies():
+    async def main():
+        cache = ResponseCache(60)
+        channel = Channel()
+        runs = []
+
+        async def run(ctx):
+            runs.append(ctx)
+            await ctx.send("Live for 3 hours")
+
+        await cache.invoke(make_context(channel), run)
+        await cache.invoke(make_context(channel), run)
+        assert len(runs) == 1
+        assert channel.sent == ["Live for 3 hours", "Live for 3 hours"]
+        assert (cache.stats.misses, cache.stats.hits) == (1, 1)
+
+    asyncio.run(main())
+
+
+def test_keys_by_channel_and_arguments():
+    async def main():
+        cache = ResponseCache(60)
+        runs = []
+
+        async def run(ctx):
+            runs.append(ctx)
+            await ctx.send("reply")
+
+        first, second = Channel("#first"), Channel("#second")
+        await cache.invoke(make_context(first, "a"), run)
+        await cache.invoke(make_context(second, "a"), run)
+        await cache.invoke(make_context(first, "b"), run)
+        assert len(runs) == 3
+        assert len(cache) == 3
+
+    asyncio.run(main())
+
+
+def test_joined_waiters_share_one_run():
+    async def main():
+        cache = ResponseCache(60)
+        channel = Channel()
+        release = asyncio.Event()
+        runs = []
+
+        async def run(ctx):
+            runs.append(ctx)
+            await release.wait()
+            await ctx.send("answer")
+
+        tasks = [asyncio.ensure_future(cache.invoke(make_context(channel), run)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(runs) == 1
+        assert channel.sent == ["answer"] * 3
+        assert (cache.stats.misses, cache.stats.joined) == (1, 2)
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_doesnt_cancel_run():
+    async def main():
+        cache = ResponseCache(60)
+        channel = Channel()
+        release = asyncio.Event()
+
+        async def run(ctx):
+            await release.wait()
+            await ctx.send("answer")
+
+        runner = asyncio.ensure_future(cache.invoke(make_context(channel), run))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.invoke(make_context(channel), run))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await runner
+        assert waiter.cancelled()
+        assert channel.sent == ["answer"]
+
+    asyncio.run(main())
+
+
+def test_failure_reaches_waiters_and_isnt_cached():
+    async def main():
+        cache = ResponseCache(60)
+        channel = Channel()
+        release = asyncio.Event()
+        runs = []
+
+        async def run(ctx):
+            runs.append(ctx)
+            await release.wait()
+            raise LookupError("stream is offline")
+
+        tasks = [asyncio.ensure_future(cache.invoke(make_context(channel), run)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        assert all(isinstance(result, LookupError) for result in results)
+        assert len(cache) == 0
+        assert cache.stats.failed == 1
+
+        # Nothing was kept, so the next invocation runs again
+        with pytest.raises(LookupError):
+            await cache.invoke(make_context(channel), run)
+        assert len(runs) == 2
+
+    asyncio.run(main())
+
+
+def test_expiry():
+    cache = ResponseCache(10)
+    cache.put(("#channel", ()), ["old"], now=100)
+    cache.put(("#other", ()), ["newer"], now=105)
+    assert cache.get(("#channel", ()), now=109) == ("old",)
+    assert cache.get(("#channel", ()), now=110) is None
+    assert len(cache) == 1
+    assert cache.get(("#other", ()), now=110) == ("newer",)
+    cache.expire(now=115)
+    assert len(cache) == 0
+
+
+def test_maxsize_evicts_oldest():
+    cache = ResponseCache(60, maxsize=2)
+    for i in range(3):
+        cache.put(("#channel", (str(i),)), [str(i)], now=100 + i)
+    assert cache.get(("#channel", ("0",)), now=103) is None
+    assert cache.get(("#channel", ("2",)), now=103) == ("2",)
+    assert cache.stats.evicted == 1
+
+
+def test_collapse_sends_nothing_on_hit():
+    async def main():
+        cache = ResponseCache(60, collapse=True)
+        channel = Channel()
+
+        async def run(ctx):
+            await ctx.send("answer")
+
+        await cache.invoke(make_context(channel), run)
+        await cache.invoke(make_context(channel), run)
+        assert channel.sent == ["answer"]
+        assert cache.stats.collapsed == 1
+
+    asyncio.run(main())
+
+
+def test_invalidate_channel():
+    cache = ResponseCache(60)
+    cache.put(("#a", ()), ["a"], now=0)
+    cache.put(("#b", ()), ["b"], now=0)
+    cache.invalidate("#a")
+    assert cache.get(("#a", ()), now=1) is None
+    assert cache.get(("#b", ()), now=1) == ("b",)
+    cache.invalidate()
+    assert len(cache) == 0
@@ -0,0 +1,76 @@
+"""
+    Tests for LineBuffer
+"""
+
+import pytest
+
+from airc.errors import LineTooLong
+from airc.utils import LineBuffer
+
+
+def test_splits_crlf_lines():
+    buffer = LineBuffer()
+    buffer.feed(b"PING :tmi.twitch.tv\r\n:nick!nick@host PRIVMSG #channel :hello\r\n")
+    assert list(buffer) == ["PING :tmi.twitch.tv", ":nick!nick@host PRIVMSG #channel :hello"]
+
+
+def test_splits_bare_lf_lines():
+    buffer = LineBuffer()
+    buffer.feed(b"PING :a\nPING :b\r\n")
+    assert list(buffer) == ["PING :a", "PING :b"]
+
+
+def test_keeps_partial_line():
+    buffer = LineBuffer()
+    buffer.feed(b"PING :a\r\nPRIVMSG #chan")
+    assert list(buffer) == ["PING :a"]
+    assert list(buffer) == []
+    buffer.feed(b"nel :hi\r")
+    assert list(buffer) == []
+    buffer.feed(b"\n")
+    assert list(buffer) == ["PRIVMSG #channel :hi"]
+
+
+def test_keeps_empty_lines():
+    buffer = LineBuffer()
+    buffer.feed(b"\r\nPING :a\r\n")
+    assert list(buffer) == ["", "PING :a"]
+
+
+def test_drops_complete_overlong_line():
+    buffer = LineBuffer(max_line_length=16)
+    buffer.feed(b"x" * 17 + b"\r\n" + b"x" * 16 + b"\r\n")
+    assert list(buffer) == ["x" * 16]
+
+
+def test_measures_overlong_lines_in_bytes():
+    buffer = LineBuffer(max_line_length=16)
+    # Eight two byte characters fit, nine don't
+    buffer.feed("é" * 9 + "\r\n" + "é" * 8 + "\r\n")
+    assert list(buffer) == ["é" * 8]
+
+
+def test_discards_unterminated_overlong_line():
+    buffer = LineBuffer(max_line_length=16)
+    buffer.feed(b"x" * 20)
+    with pytest.raises(LineTooLong):
+        list(buffer)
+    # The rest of the line is dropped when it arrives, the lines after it are kept
+    buffer.feed(b"more of it\r\nPING :a\r\n")
+    assert list(buffer) == ["PING :a"]
+
+
+def test_drops_invalid_utf8_line_only():
+    buffer = LineBuffer()
+    buffer.feed(b"PING :a\r\nPRIVMSG #c :\xff\xfe\r\nPING :b\r\n")
+    assert list(buffer) == ["PING :a", "PING :b"]
+
+
+def test_views():
+    buffer = LineBuffer()
+    buffer.feed(b"PING :a\r\nPING :b\r\n")
+    lines = []
+    for view in buffer.views():
+        with view:
+            lines.append(bytes(view))
+    assert lines == [b"PING :a", b"PING :b"]
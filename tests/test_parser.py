@@ -0,0 +1,65 @@
+"""
+    Tests for the line parser
+"""
+
+import pytest
+
+from airc.parser import parse_line, parse_params, scan_line
+
+
+def test_scan_line_spans():
+    line = "@id=1 :nick!user@host PRIVMSG #channel :hello world"
+    tags_end, prefix_start, prefix_end, command_start, command_end, params_start = scan_line(line)
+    assert line[1:tags_end] == "id=1"
+    assert line[prefix_start:prefix_end] == "nick!user@host"
+    assert line[command_start:command_end] == "PRIVMSG"
+    assert line[params_start:] == "#channel :hello world"
+
+
+def test_scan_line_without_tags_or_prefix():
+    line = "PING :tmi.twitch.tv"
+    tags_end, prefix_start, prefix_end, command_start, command_end, params_start = scan_line(line)
+    assert (tags_end, prefix_start, prefix_end) == (0, 0, 0)
+    assert line[command_start:command_end] == "PING"
+    assert line[params_start:] == ":tmi.twitch.tv"
+
+
+def test_scan_line_without_params():
+    line = ":server QUIT"
+    spans = scan_line(line)
+    assert line[spans[3]:spans[4]] == "QUIT"
+    assert spans[5] == len(line)
+
+
+@pytest.mark.parametrize("line", ["", ":prefix-only", "@tags-only", "@tags :prefix"])
+def test_scan_line_without_command(line):
+    with pytest.raises(ValueError):
+        scan_line(line)
+
+
+def test_parse_line():
+    line = "@badges=;color=#FF0000;mod :nick!nick@nick.tmi.twitch.tv PRIVMSG #channel :hi there :)"
+    tags, prefix, command, params = parse_line(line)
+    assert tags == {"badges": None, "color": "#FF0000", "mod": None}
+    assert prefix == "nick!nick@nick.tmi.twitch.tv"
+    assert command == "PRIVMSG"
+    assert params == ["#channel", "hi there :)"]
+
+
+def test_parse_line_numeric():
+    assert parse_line(":server 001 me :Welcome") == ({}, "server", "001", ["me", "Welcome"])
+
+
+def test_parse_line_without_trailing():
+    assert parse_line("CAP * LS") == ({}, None, "CAP", ["*", "LS"])
+
+
+@pytest.mark.parametrize("params, expected", [
+    ("", []),
+    (":only trailing", ["only trailing"]),
+    ("a b c", ["a", "b", "c"]),
+    ("a  b :c d", ["a", "b", "c d"]),
+    ("a :", ["a", ""]),
+])
+def test_parse_params(params, expected):
+    assert parse_params(params) == expected
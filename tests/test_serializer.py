@@ -0,0 +1,107 @@
+"""
+    Tests for packing outgoing lines
+"""
+
+import pytest
+
+from airc.errors import InvalidLine
+from airc.isupport import ISupport
+from airc.serializer import MAX_LINE_LENGTH, pack_message, pack_params, split_utf8
+
+
+def _targets(line):
+    return line.split(b" ")[1].decode("utf-8").split(",")
+
+
+def test_split_utf8_keeps_characters_whole():
+    data = ("aé€😀" * 50).encode("utf-8")
+    for size in range(4, 12):
+        chunks = split_utf8(data, size)
+        assert all(len(chunk) <= size for chunk in chunks)
+        assert "".join(chunk.decode("utf-8") for chunk in chunks) == "aé€😀" * 50
+
+
+def test_split_utf8_needs_room_for_a_character():
+    with pytest.raises(ValueError):
+        split_utf8("😀😀".encode("utf-8"), 3)
+
+
+def test_pack_params_limit():
+    channels = [f"#channel{i}" for i in range(7)]
+    lines = pack_params("JOIN", channels, 3)
+    assert lines == [b"JOIN #channel0,#channel1,#channel2", b"JOIN #channel3,#channel4,#channel5", b"JOIN #channel6"]
+
+
+def test_pack_params_line_length():
+    channels = [f"#{i:0>40}" for i in range(100)]
+    lines = pack_params("JOIN", channels, None)
+    assert all(len(line) + 2 <= MAX_LINE_LENGTH for line in lines)
+    assert [target for line in lines for target in _targets(line)] == channels
+    assert len(lines) == 9
+
+
+def test_pack_params_multibyte_targets():
+    # Two bytes a character, so the byte length decides where lines split, not the character count
+    channels = ["#" + "é" * 100 for _ in range(10)]
+    lines = pack_params("JOIN", channels, None)
+    assert all(len(line) + 2 <= MAX_LINE_LENGTH for line in lines)
+    assert [target for line in lines for target in _targets(line)] == channels
+
+
+def test_pack_params_keys():
+    lines = pack_params("JOIN", ["#a", "#b", "#c"], 2, keys=["x", "y", "z"])
+    assert lines == [b"JOIN #a,#b x,y", b"JOIN #c z"]
+
+
+def test_pack_params_targmax():
+    isupport = ISupport()
+    isupport.update(["TARGMAX=JOIN:2,PRIVMSG:3,WHOIS:"])
+    assert isupport.targmax("JOIN") == 2
+    assert isupport.targmax("privmsg") == 3
+    assert isupport.targmax("WHOIS") is None
+    lines = pack_params("JOIN", ["#a", "#b", "#c", "#d", "#e"], isupport.targmax("JOIN"))
+    assert [_targets(line) for line in lines] == [["#a", "#b"], ["#c", "#d"], ["#e"]]
+
+
+def test_pack_message_short():
+    assert pack_message("PRIVMSG", ["#a", "#b"], "hello", None) == [b"PRIVMSG #a,#b :hello"]
+
+
+def test_pack_message_targmax():
+    lines = pack_message("PRIVMSG", ["#a", "#b", "#c"], "hello", 2)
+    assert lines == [b"PRIVMSG #a,#b :hello", b"PRIVMSG #c :hello"]
+
+
+def test_pack_message_splits_between_characters():
+    text = "é€😀 " * 200
+    lines = pack_message("PRIVMSG", ["#channel"], text, None)
+    assert len(lines) > 1
+    assert all(len(line) + 2 <= MAX_LINE_LENGTH for line in lines)
+    chunks = [line.partition(b" :")[2] for line in lines]
+    assert "".join(chunk.decode("utf-8") for chunk in chunks) == text
+
+
+def test_pack_message_every_target_gets_every_chunk():
+    targets = [f"#{i:0>30}" for i in range(20)]
+    text = "x" * 900
+    lines = pack_message("PRIVMSG", targets, text, 4)
+    assert all(len(line) + 2 <= MAX_LINE_LENGTH for line in lines)
+    received = {}
+    for line in lines:
+        for target in _targets(line):
+            received.setdefault(target, []).append(line.partition(b" :")[2])
+        assert len(_targets(line)) <= 4
+    assert set(received) == set(targets)
+    assert all(b"".join(chunks) == text.encode() for chunks in received.values())
+
+
+@pytest.mark.parametrize("text", ["two\nlines", "carriage\rreturn", "nul\0byte"])
+def test_pack_message_rejects_line_breaks(text):
+    with pytest.raises(InvalidLine):
+        pack_message("PRIVMSG", ["#channel"], text, None)
+
+
+@pytest.mark.parametrize("target", ["", "#has space", ":colon"])
+def test_pack_message_rejects_bad_targets(target):
+    with pytest.raises(InvalidLine):
+        pack_message("PRIVMSG", [target], "hello", None)
@@ -0,0 +1,122 @@
+"""
+    Tests for WriteQueue
+"""
+
+import asyncio
+
+import pytest
+
+from airc.enums import Priority
+from airc.utils import RateLimiter
+from airc.writer import WriteQueue
+
+
+def test_coalesces_lines():
+    async def main():
+        batches = []
+
+        async def send_many(lines):
+            batches.append(list(lines))
+
+        queue = WriteQueue(send_many, loop=asyncio.get_running_loop())
+        await asyncio.gather(*(queue.write(f"PRIVMSG #channel :{i}") for i in range(5)))
+        assert batches == [[f"PRIVMSG #channel :{i}" for i in range(5)]]
+        assert (queue.batches, queue.lines) == (1, 5)
+
+    asyncio.run(main())
+
+
+def test_high_priority_first():
+    async def main():
+        sent = []
+
+        async def send_many(lines):
+            sent.extend(lines)
+
+        queue = WriteQueue(send_many, loop=asyncio.get_running_loop())
+        first = queue.write_nowait("PRIVMSG #channel :first")
+        pong = queue.write_nowait("PONG :server", Priority.HIGH)
+        await asyncio.gather(first, pong)
+        assert sent == ["PONG :server", "PRIVMSG #channel :first"]
+
+    asyncio.run(main())
+
+
+def test_close_fails_batch_in_flight():
+    async def main():
+        started = asyncio.Event()
+
+        async def send_many(lines):
+            started.set()
+            await asyncio.sleep(10)
+
+        queue = WriteQueue(send_many, loop=asyncio.get_running_loop())
+        in_flight = queue.write_nowait("PRIVMSG #channel :in flight")
+        await started.wait()
+        waiting = queue.write_nowait("PRIVMSG #channel :waiting")
+        await asyncio.wait_for(queue.close(), 1)
+        for future in (in_flight, waiting):
+            assert future.done()
+            assert isinstance(future.exception(), ConnectionError)
+
+    asyncio.run(main())
+
+
+def test_send_failure_fails_batch():
+    async def main():
+        async def send_many(lines):
+            raise ConnectionResetError("gone")
+
+        queue = WriteQueue(send_many, loop=asyncio.get_running_loop())
+        with pytest.raises(ConnectionResetError):
+            await queue.write("PRIVMSG #channel :lost")
+
+    asyncio.run(main())
+
+
+def test_limiter_cost():
+    async def main():
+        sent = []
+        limiter = RateLimiter(3, 60)
+
+        async def send_many(lines):
+            sent.extend(lines)
+
+        # A JOIN line takes one use per channel
+        queue = WriteQueue(send_many, limiter_for=lambda line: limiter,
+                           cost_for=lambda line: line.count(",") + 1, loop=asyncio.get_running_loop())
+        first = queue.write_nowait("JOIN #a,#b")
+        second = queue.write_nowait("JOIN #c,#d")
+        await first
+        await asyncio.sleep(0.05)
+        assert sent == ["JOIN #a,#b"]
+        assert not second.done()
+        # Only one use is left in the window, the second line needs two
+        assert limiter.delay(cost=1) == 0
+        assert limiter.delay(cost=2) > 0
+        await queue.close()
+        assert isinstance(second.exception(), ConnectionError)
+
+    asyncio.run(main())
+
+
+def test_unlimited_high_priority_passes_limited_head():
+    async def main():
+        sent = []
+        limiter = RateLimiter(1, 60)
+        limiter.acquire()
+
+        async def send_many(lines):
+            sent.extend(lines)
+
+        def limiter_for(line):
+            return None if line.startswith("PONG") else limiter
+
+        queue = WriteQueue(send_many, limiter_for=limiter_for, loop=asyncio.get_running_loop())
+        blocked = queue.write_nowait("PRIVMSG #channel :/ban someone", Priority.HIGH)
+        await asyncio.wait_for(queue.write("PONG :server", Priority.HIGH), 1)
+        assert sent == ["PONG :server"]
+        await queue.close()
+        assert isinstance(blocked.exception(), ConnectionError)
+
+    asyncio.run(main())